@@ -9,6 +9,9 @@ This module exports:
 
 from logger import create_logger
 from constants import PROMPT
+from backends import ScanError, get_backend
+from metrics import count, timed
+from netlink import NetlinkMonitor
 from scan import scan
 from shutdown import shutdown
 from terminal_control import Color
@@ -48,27 +51,33 @@ class Network:
 class Addresses:
     """Get information about the interface, gateway and network
 
+        The information is kept until the kernel reports a link, address or route change.
+
         Public methods:
-          - sync        Reassign interface, gateway and network
+          - sync        Reassign interface, gateway and network if they may have changed
     """
-    __slots__ = ('interface', 'gateway', 'network', 'interface_input', 'interactive')
+    __slots__ = ('interface', 'gateway', 'network', 'interface_input', 'interactive', 'engine', '_monitor')
 
-    def __init__(self, interface_name=None, interactive=True):
+    def __init__(self, interface_name=None, interactive=True, engine='nmap'):
         """An Address object that gets information about the interface, gateway and network
 
         :param interface_name: Optionally specify the interface name. Default: None
         :param interactive: Boolean value. If True user prompt is allowed. Default: True
+        :param engine: The discovery engine used to scan this network, one of ENGINES. Default: 'nmap'
         """
         self.interface = Interface('', '')
         self.gateway = Gateway('', '')
         self.network = Network('', '', '')
         self.interface_input = interface_name
         self.interactive = interactive
+        self.engine = engine
+        # Subscribed before resolving anything so a change while resolving isn't missed
+        self._monitor = NetlinkMonitor()
         self.sync()
-        log.debug(f'Addresses created: {self!r}')
+        log.debug('Addresses created: %r', self)
 
     def sync(self):
-        """Reassign interface, gateway and network data
+        """Reassign interface, gateway and network data, unless the kernel reported no change since the last sync
 
         :exception KeyError: If the default gateway is not found
         :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
@@ -76,18 +85,31 @@ class Addresses:
         :exception StopIteration: If the interface name is not found
         :exception IndexError: If the scan's list of hosts is empty because the gateway IP is not active
         """
-        log.debug('Getting gateway ip and interface name')
-        self._gateway_ip_interface_name()
-        log.debug('Getting gateway mac')
-        self._gateway_mac()
-        log.debug('Getting interface mac')
-        self._interface_mac()
-        log.debug('Getting network ip and mask')
-        self._network_ip_mask()
+        if not self._monitor.changed():
+            log.debug('No link, address or route change, keeping addresses')
+            count('address_syncs', result='unchanged')
+            return
+        try:
+            with timed('addresses', 'sync'):
+                log.debug('Getting gateway ip and interface name')
+                self._gateway_ip_interface_name()
+                log.debug('Getting gateway mac')
+                with timed('addresses', 'gateway_mac'):
+                    self._gateway_mac()
+                log.debug('Getting interface mac')
+                self._interface_mac()
+                log.debug('Getting network ip and mask')
+                self._network_ip_mask()
+        except BaseException:
+            # Half resolved addresses are resolved again on the next sync
+            self._monitor.invalidate()
+            count('address_syncs', result='failed')
+            raise
+        count('address_syncs', result='resolved')
 
     def _gateway_ip_interface_name(self):
         if self.interface_input:
-            log.debug(f'Getting from input: {self.interface_input}')
+            log.debug('Getting from input: %s', self.interface_input)
             self.interface.name = self.interface_input
             self._gateway_ip_from_interface_input()
         else:
@@ -127,7 +149,13 @@ class Addresses:
 
     def _gateway_mac(self):
         try:
-            self.gateway.mac = scan(self.gateway.ip)[0].mac
+            # The passive engine can't be asked about a specific host
+            engine = self.engine if get_backend(self.engine).active else 'arp'
+            self.gateway.mac = scan(self.gateway.ip, engine, self.interface.name)[0].mac
+        except ScanError as e:
+            print(f'{Color.B_RED}{e}{Color.OFF}')
+            log.exception(f'ScanError on {__name__} module')
+            shutdown(True)
         except IndexError:
             print(f'{Color.B_RED}No se pudo obtener la MAC del gateway{Color.OFF}')
             log.exception('Could not get gateway MAC')
@@ -138,6 +166,8 @@ class Addresses:
         self.interface.mac = netifaces.ifaddresses(self.interface.name)[netifaces.AF_LINK][0]['addr']
 
     def _network_ip_mask(self):
+        # kamene reads the routing table once when imported
+        conf.route.resync()
         # Routes is network, net mask, gateway, interface, output IP
         interface_routes = [r for r in conf.route.routes if r[3] == self.interface.name and r[1] != 0xFFFFFFFF]
 
@@ -151,5 +181,5 @@ class Addresses:
     def __repr__(self):
         class_name = self.__class__.__name__
         args = [f'{self.interface!r}', f'{self.gateway!r}', f'{self.network!r}',
-                f'{self.interface_input!r}', f'{self.interactive!r}']
+                f'{self.interface_input!r}', f'{self.interactive!r}', f'{self.engine!r}']
         return f'{class_name}({", ".join(args)})'
@@ -0,0 +1,50 @@
+"""arp_scan module
+
+This module exports:
+  - arp_sweep       function that discovers active hosts with a single burst of ARP requests
+"""
+from logger import create_logger
+from constants import ARP_TIMEOUT
+from progress import report
+from shutdown import shutdown
+from kamene.layers.l2 import Ether, ARP
+from kamene.sendrecv import srp
+# noinspection PyUnresolvedReferences
+from kamene import route
+
+log = create_logger(__name__)
+
+BROADCAST = 'ff:ff:ff:ff:ff:ff'
+
+
+def arp_sweep(ip, interface=None, timeout=ARP_TIMEOUT):
+    """Send one burst of ARP who-has requests to `ip` and collect the replies until `timeout`
+
+    The addresses probed are reported with the progress module once the replies are collected.
+
+    :param ip: String specifying the targets. A network in CIDR notation, an IP address or several separated by spaces
+    :param interface: The interface to send packets from. Default: None (kamene's default interface)
+    :param timeout: Seconds to wait for replies after the last request is sent. Default: ARP_TIMEOUT
+    :return: List of (ip, mac, vendor, hostname, latency) tuples of the hosts that replied, vendor being None
+    and hostname 'N/A' since ARP doesn't carry them
+    :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
+    """
+    targets = ip.split()
+    packet = Ether(dst=BROADCAST) / ARP(pdst=targets if len(targets) > 1 else targets[0])
+    log.debug('Sending ARP sweep to %s with a %s second timeout', ip, timeout)
+    try:
+        answered, unanswered = srp(packet, iface=interface, timeout=timeout, verbose=False)
+    except KeyboardInterrupt:
+        log.debug(f'KeyboardInterrupt on {__name__} module')
+        shutdown()
+    # kamene only tells how many requests the targets expanded to once the burst is over
+    probed = len(answered) + len(unanswered)
+    report(total=probed, probed=probed)
+
+    found = {}
+    for sent, received in answered:
+        log.debug('%s is at %s', received.psrc, received.hwsrc)
+        # The first reply wins, hosts answering twice (e.g. proxy ARP) don't get duplicated
+        latency = received.time - sent.sent_time
+        found.setdefault(received.psrc, (received.psrc, received.hwsrc, None, 'N/A', latency))
+    return list(found.values())
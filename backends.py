@@ -0,0 +1,194 @@
+"""backends module
+
+This module exports:
+  - ScanError               exception raised when a backend can't scan
+  - ScannerBackend          abstract base class of the host discovery backends
+  - NmapBackend             ScannerBackend subclass that runs nmap -sn (no port scan) and streams its report
+  - ArpBackend              ScannerBackend subclass that sends one burst of ARP requests
+  - IcmpBackend             ScannerBackend subclass that sends one burst of ICMP echo requests
+  - PassiveCacheBackend     ScannerBackend subclass that reports the hosts seen in sniffed traffic
+  - BACKENDS                dict mapping each engine name to its backend class
+  - get_backend             function that returns the backend of an engine name
+
+Every backend times its phases (spawn, probe, parse) with the metrics module under its own name.
+The heavy dependencies of each backend are only imported when it runs.
+"""
+from logger import create_logger
+from constants import PASSIVE_LISTEN
+from metrics import timed
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+import subprocess
+import time
+
+log = create_logger(__name__)
+
+
+class ScanError(Exception):
+    """Exception raised when a backend can't scan, its message is displayed to the user"""
+
+
+class ScannerBackend(ABC):
+    """Abstract base class of the host discovery backends
+
+        Subclasses set `name` and implement discover.
+
+        Public methods:
+          - discover    return the active hosts of the targets
+          - stream      yield the active hosts of the targets as they are found
+    """
+    __slots__ = ()
+    name = None
+    # False for backends that can't be asked about a specific host
+    active = True
+
+    @abstractmethod
+    def discover(self, ip, interface=None):
+        """Return the active hosts of `ip`
+
+        :param ip: String specifying the targets. A network in CIDR notation, an IP address or several
+        separated by spaces
+        :param interface: The interface to scan from. Default: None
+        :return: List of (ip, mac, vendor, hostname, latency) tuples, vendor and latency being None when unknown
+        :exception ScanError: If the backend can't scan
+        :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
+        """
+
+    def stream(self, ip, interface=None):
+        """Yield the active hosts of `ip` as they are found
+
+        Backends that find the hosts one by one override it, by default the hosts are yielded
+        once discover returns.
+
+        :param ip: String specifying the targets, as in discover
+        :param interface: The interface to scan from. Default: None
+        :return: Generator of (ip, mac, vendor, hostname, latency) tuples
+        :exception ScanError: If the backend can't scan
+        :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
+        """
+        yield from self.discover(ip, interface)
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        return f'{class_name}()'
+
+
+class NmapBackend(ScannerBackend):
+    """ScannerBackend subclass that runs nmap -sn (no port scan) and streams its XML report"""
+    __slots__ = ()
+    name = 'nmap'
+
+    def discover(self, ip, interface=None):
+        """Overridden from ScannerBackend to run nmap -sn"""
+        return list(self.stream(ip, interface))
+
+    def stream(self, ip, interface=None):
+        """Overridden from ScannerBackend to yield each host as soon as nmap reports it"""
+        from nmap_scan import nmap_sweep
+        try:
+            yield from nmap_sweep(ip, interface)
+        except FileNotFoundError:
+            raise ScanError('No se encontró nmap instalado')
+        except subprocess.CalledProcessError as e:
+            raise ScanError(f'nmap terminó con un error: {e.stderr}')
+
+
+class ArpBackend(ScannerBackend):
+    """ScannerBackend subclass that sends one burst of ARP requests with kamene"""
+    __slots__ = ()
+    name = 'arp'
+
+    def discover(self, ip, interface=None):
+        """Overridden from ScannerBackend to send an ARP sweep"""
+        with timed(self.name, 'spawn'):
+            from arp_scan import arp_sweep
+        with timed(self.name, 'probe'):
+            return arp_sweep(ip, interface)
+
+
+class IcmpBackend(ScannerBackend):
+    """ScannerBackend subclass that sends one burst of ICMP echo requests through a raw socket"""
+    __slots__ = ()
+    name = 'icmp'
+
+    def discover(self, ip, interface=None):
+        """Overridden from ScannerBackend to send an ICMP sweep"""
+        from icmp_scan import icmp_sweep
+        try:
+            with timed(self.name, 'probe'):
+                return icmp_sweep(ip, interface)
+        except PermissionError:
+            raise ScanError('El escaneo ICMP necesita privilegios de superusuario')
+
+
+class PassiveCacheBackend(ScannerBackend):
+    """ScannerBackend subclass that reports the hosts seen in sniffed ARP, DHCP and mDNS traffic
+
+        Without a HostStateStore the traffic is sniffed for `listen` seconds on each discover.
+        With one fed by a running PassiveMonitor, its hosts seen within its `stale_after` seconds are reported
+        right away. The monitor is given `listen` seconds first when it hasn't seen any host of the targets yet.
+    """
+    __slots__ = ('store', 'listen')
+    name = 'passive'
+    active = False
+
+    def __init__(self, store=None, listen=PASSIVE_LISTEN):
+        """A PassiveCacheBackend object
+
+        :param store: Optionally the HostStateStore to report the hosts of. Default: None
+        :param listen: Seconds to sniff when there is no store. Default: PASSIVE_LISTEN
+        """
+        self.store = store
+        self.listen = listen
+
+    def discover(self, ip, interface=None):
+        """Overridden from ScannerBackend to report the hosts of `ip` seen in sniffed traffic"""
+        from host_state import HostStateStore, target_networks
+        try:
+            target_networks(ip)
+        except ValueError:
+            raise ScanError(f'Objetivo no válido: {ip}')
+        store = self.store
+        since = None
+        if store is None:
+            with timed(self.name, 'spawn'):
+                from passive import PassiveMonitor
+                store = HostStateStore()
+                # PassiveMonitor only needs the interface name and the targets
+                addresses = SimpleNamespace(interface=SimpleNamespace(name=interface),
+                                            network=SimpleNamespace(cidr=ip))
+                monitor = PassiveMonitor(addresses, store)
+                monitor.start()
+            with timed(self.name, 'probe'):
+                time.sleep(self.listen)
+                monitor.stop()
+        else:
+            if not store.find(ip):
+                with timed(self.name, 'probe'):
+                    time.sleep(self.listen)
+            # Stale hosts can't be asked if they are still there, only reporting the fresh ones lets them be forgotten
+            since = time.time() - store.stale_after
+        with timed(self.name, 'parse'):
+            return [(h.ip, h.mac, h.vendor, h.hostname, None) for h in store.find(ip, since)]
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.store!r}', f'{self.listen!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+BACKENDS = {b.name: b for b in (NmapBackend, ArpBackend, IcmpBackend, PassiveCacheBackend)}
+
+
+def get_backend(engine, store=None):
+    """Return a backend for `engine`
+
+    :param engine: One of ENGINES ('nmap', 'arp', 'icmp' or 'passive')
+    :param store: Optionally the HostStateStore a PassiveMonitor feeds, reported by the passive engine instead of
+    sniffing on each scan. Ignored by the other engines. Default: None
+    :return: A ScannerBackend object
+    :exception KeyError: If the engine is not known
+    """
+    if engine == PassiveCacheBackend.name:
+        return PassiveCacheBackend(store)
+    return BACKENDS[engine]()
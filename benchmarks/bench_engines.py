@@ -0,0 +1,51 @@
+"""bench_engines
+
+Time the discovery engines against the same network, in total and per phase
+
+    sudo python3 benchmarks/bench_engines.py 192.168.1.0/24
+    sudo python3 benchmarks/bench_engines.py 192.168.1.0/24 -i en0 -r 10
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+from statistics import median
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from constants import ENGINES  # noqa: E402
+from metrics import summary  # noqa: E402
+from scan import scan  # noqa: E402
+
+
+def bench(ip, engine, interface, rounds):
+    """Return the elapsed seconds and found hosts of `rounds` scans of `ip` with `engine`"""
+    times = []
+    hosts = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hosts = scan(ip, engine, interface)
+        times.append(time.perf_counter() - start)
+    return times, hosts
+
+
+def _add_args():
+    parser = ArgumentParser(description='Time the host discovery engines against each other')
+    parser.add_argument('network', help='network to scan in CIDR notation')
+    parser.add_argument('-i', '--interface', help='interface to send packets from')
+    parser.add_argument('-r', '--rounds', default=5, type=int, help='scans per engine (default: 5)')
+    parser.add_argument('-e', '--engines', nargs='+', default=ENGINES, choices=ENGINES,
+                        help='engines to time (default: all)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _add_args()
+    print(f'{"engine":<8}{"hosts":>7}{"min":>10}{"median":>10}{"max":>10}')
+    for name in args.engines:
+        elapsed, found = bench(args.network, name, args.interface, args.rounds)
+        print(f'{name:<8}{len(found):>7}{min(elapsed):>10.3f}{median(elapsed):>10.3f}{max(elapsed):>10.3f}')
+
+    print(f'\n{"engine":<8}{"phase":<16}{"mean":>10}{"max":>10}')
+    for (name, phase), timing in sorted(summary().items()):
+        print(f'{name:<8}{phase:<16}{timing["total"] / timing["count"]:>10.3f}{timing["max"]:>10.3f}')
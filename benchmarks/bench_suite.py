@@ -0,0 +1,210 @@
+"""bench_suite
+
+Time scan, get_vendor, resolve_vendors, Addresses.sync and get_hosts across network sizes against local stand-ins
+(fake_nmap.py and a local vendor API) and write the results as JSON, to be compared between releases
+
+    python3 benchmarks/bench_suite.py -o results.json
+    python3 benchmarks/bench_suite.py --sizes 28 24 -r 10 --latency 0.2
+    python3 benchmarks/bench_suite.py -o new.json --compare results.json
+
+Networks broader than SHARD_PREFIX are scanned at SHARD_RATE addresses per second, so a /16 takes a minute per round.
+Addresses.sync resolves the real interface and is skipped when netifaces or kamene aren't installed.
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from ipaddress import ip_network
+from pathlib import Path
+from statistics import median
+from types import SimpleNamespace
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from constants import VERSION  # noqa: E402
+from fixtures import VendorStub, fake_nmap, isolated, known_hosts  # noqa: E402
+import metrics  # noqa: E402
+
+BENCHMARKS = ('scan', 'get_vendor', 'resolve_vendors', 'sync', 'get_hosts')
+SIZES = (28, 24, 20, 16)
+# Lookups timed per round of get_vendor
+LOOKUPS = 20
+
+
+def timings(function, rounds, before=None):
+    """Call `function` `rounds` times and return the elapsed seconds of each call and the last result
+
+    :param function: Function without arguments
+    :param rounds: Times to call it
+    :param before: Optionally a function called before each call, outside of the timing. Default: None
+    """
+    seconds = []
+    result = None
+    for _ in range(rounds):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start)
+    return seconds, result
+
+
+def result(benchmark, variant, size, seconds, count):
+    """Return the result of a benchmark with the phases recorded by the metrics module since the last one"""
+    phases = {f'{source}.{phase}': timing for (source, phase), timing in sorted(metrics.summary().items())}
+    metrics.reset()
+    return {'benchmark': benchmark, 'variant': variant, 'size': size, 'count': count, 'seconds': seconds,
+            'min': min(seconds), 'median': median(seconds), 'max': max(seconds), 'phases': phases}
+
+
+def bench_scan(sizes, rounds, cold):
+    from scan import scan
+    for size in sizes:
+        cidr = str(ip_network(f'10.0.0.0/{size}'))
+        seconds, hosts = timings(lambda: scan(cidr), rounds, cold)
+        yield result('scan', 'nmap', size, seconds, len(hosts))
+
+
+def bench_get_vendor(rounds, cold):
+    from mac_vendor import get_vendor
+    # An OUI each, so every lookup misses the cache
+    unknown = [f'02:00:{i:02X}:00:00:01' for i in range(LOOKUPS)]
+    indexed = [f'AA:BB:CC:00:00:{i:02X}' for i in range(LOOKUPS)]
+    # From the API with an empty cache, then from the cache the last round filled, then from the OUI index
+    for variant, macs, before in (('api', unknown, cold), ('cache', unknown, None), ('oui', indexed, None)):
+        seconds, _ = timings(lambda: [get_vendor(m) for m in macs], rounds, before)
+        yield result('get_vendor', variant, None, [s / LOOKUPS for s in seconds], LOOKUPS)
+
+
+def bench_resolve_vendors(sizes, rounds, cold):
+    from mac_vendor import resolve_vendors
+    for size in sizes:
+        cidr = str(ip_network(f'10.0.0.0/{size}'))
+        # The hosts fake_nmap reports without vendor
+        macs = [h.mac for h in known_hosts(cidr).hosts(cidr)]
+        seconds, _ = timings(lambda: resolve_vendors(macs), rounds, cold)
+        yield result('resolve_vendors', 'api', size, seconds, len(macs))
+
+
+def bench_sync(rounds, interface):
+    try:
+        from addresses import Addresses
+    except ImportError as e:
+        print(f'Skipping Addresses.sync: {e}', file=sys.stderr)
+        return
+    addresses = None
+
+    def create():
+        nonlocal addresses
+        addresses = Addresses(interface, False, 'nmap')
+
+    seconds, _ = timings(create, rounds)
+    yield result('sync', 'resolve', None, seconds, 1)
+    # No link, address or route change since the addresses were resolved
+    seconds, _ = timings(addresses.sync, rounds)
+    yield result('sync', 'unchanged', None, seconds, 1)
+
+
+def bench_get_hosts(sizes, rounds, cold):
+    from display_scan import get_hosts
+    for size in sizes:
+        network = ip_network(f'10.0.0.0/{size}')
+        cidr = str(network)
+        addresses = SimpleNamespace(network=SimpleNamespace(cidr=cidr), engine='nmap',
+                                    interface=SimpleNamespace(name=None), gateway=SimpleNamespace(ip=str(network[1])))
+        seconds, hosts = timings(lambda: get_hosts(addresses), rounds, cold)
+        yield result('get_hosts', 'scan', size, seconds, len(hosts))
+
+        # Hosts learned from sniffed traffic are listed with their vendors resolved, a sweep runs in the background
+        stores = []
+
+        def sniffed():
+            cold()
+            stores.append(known_hosts(cidr))
+
+        seconds, hosts = timings(lambda: get_hosts(addresses, stores[-1]), rounds, sniffed)
+        for store in stores:
+            sweep = store._sweeps.get(cidr)
+            if sweep is not None:
+                sweep.join()
+        yield result('get_hosts', 'sniffed', size, seconds, len(hosts))
+
+
+def run(args):
+    """Run the benchmarks selected in `args` and return their results"""
+    results = []
+    with fake_nmap(args.up_every, args.delay), VendorStub(args.latency) as stub, isolated() as cold:
+        metrics.reset()
+        for name in args.benchmarks:
+            print(f'Running {name}...', file=sys.stderr)
+            if name == 'scan':
+                found = bench_scan(args.sizes, args.rounds, cold)
+            elif name == 'get_vendor':
+                found = bench_get_vendor(args.rounds, cold)
+            elif name == 'resolve_vendors':
+                found = bench_resolve_vendors(args.sizes, args.rounds, cold)
+            elif name == 'sync':
+                found = bench_sync(args.rounds, args.interface)
+            else:
+                found = bench_get_hosts(args.sizes, args.rounds, cold)
+            for r in found:
+                print(f'  {r["variant"]:<10}{str(r["size"] or ""):>4}{r["count"]:>7}'
+                      f'{r["min"]:>10.4f}{r["median"]:>10.4f}{r["max"]:>10.4f}', file=sys.stderr)
+                results.append(r)
+        print(f'{stub.requests} vendor API requests', file=sys.stderr)
+    return results
+
+
+def compare(results, baseline):
+    """Print the median of each result against the one of the same benchmark, variant and size in `baseline`"""
+    before = {(r['benchmark'], r['variant'], r['size']): r['median'] for r in baseline['results']}
+    print(f'\n{"benchmark":<16}{"variant":<10}{"size":>5}{"before":>10}{"after":>10}{"change":>9}', file=sys.stderr)
+    for r in results:
+        old = before.get((r['benchmark'], r['variant'], r['size']))
+        change = f'{(r["median"] - old) / old:>+9.1%}' if old else f'{"new":>9}'
+        print(f'{r["benchmark"]:<16}{r["variant"]:<10}{str(r["size"] or ""):>5}'
+              f'{old if old is not None else float("nan"):>10.4f}{r["median"]:>10.4f}{change}', file=sys.stderr)
+
+
+def _add_args():
+    parser = ArgumentParser(description='Time host discovery, vendor lookup and address resolution '
+                                        'against local stand-ins')
+    parser.add_argument('-b', '--benchmarks', nargs='+', default=BENCHMARKS, choices=BENCHMARKS,
+                        help='benchmarks to run (default: all)')
+    parser.add_argument('-s', '--sizes', nargs='+', default=SIZES, type=int,
+                        help='prefix lengths of the networks (default: 28 24 20 16)')
+    parser.add_argument('-r', '--rounds', default=3, type=int, help='rounds of each benchmark (default: 3)')
+    parser.add_argument('-u', '--up-every', default=4, type=int,
+                        help='every how many addresses a host is up (default: 4)')
+    parser.add_argument('-d', '--delay', default=0.0, type=float,
+                        help='seconds fake nmap takes per address (default: 0)')
+    parser.add_argument('-l', '--latency', default=0.05, type=float,
+                        help='seconds the vendor API takes per answer (default: 0.05)')
+    parser.add_argument('-i', '--interface', help='interface resolved by Addresses.sync (default: the default route)')
+    parser.add_argument('-o', '--output', help='file to write the JSON results to (default: stdout)')
+    parser.add_argument('-c', '--compare', help='JSON results of a previous run to compare with')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _add_args()
+    report = {'version': VERSION,
+              'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpus': os.cpu_count(),
+              'parameters': {'rounds': args.rounds, 'up_every': args.up_every, 'delay': args.delay,
+                             'latency': args.latency},
+              'results': run(args)}
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report['results'], json.load(f))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
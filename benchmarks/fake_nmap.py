@@ -0,0 +1,83 @@
+"""fake_nmap
+
+Stand-in for nmap -sn -oX - that reports hosts of the targets without sending a packet
+
+Every BENCH_NMAP_UP_EVERY-th address of each network (default: 4) is reported up, single addresses always are.
+Half of the hosts up get a vendor from nmap, the other half get a locally administered MAC address with an OUI
+of its own, so their vendors have to be looked up. Each address takes BENCH_NMAP_DELAY seconds (default: 0)
+to "probe", hosts are written as they are found.
+
+    BENCH_NMAP_UP_EVERY=4 BENCH_NMAP_DELAY=0.0001 python3 benchmarks/fake_nmap.py -sn -oX - 10.0.0.0/24
+"""
+from ipaddress import ip_network
+import os
+import sys
+import time
+
+# Options of nmap taking a value
+VALUE_OPTIONS = ('-oX', '--stats-every', '-e')
+
+
+def targets_of(args):
+    """Return the targets of the nmap command line `args`"""
+    targets = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in VALUE_OPTIONS:
+            skip = True
+        elif not arg.startswith('-'):
+            targets.append(arg)
+    return targets
+
+
+def hosts_up(target, up_every):
+    """Yield the addresses of `target` reported up"""
+    network = ip_network(target, strict=False)
+    if network.num_addresses == 1:
+        yield network.network_address
+        return
+    for index, address in enumerate(network):
+        if index % up_every == 1 % up_every:
+            yield address
+
+
+def host_xml(address, known_vendor):
+    """Return the <host> element of `address`, with a vendor if `known_vendor`"""
+    packed = address.packed
+    if known_vendor:
+        mac = f'AA:BB:CC:{packed[1]:02X}:{packed[2]:02X}:{packed[3]:02X}'
+        vendor = ' vendor="Bench Vendor"'
+    else:
+        mac = f'02:{packed[2]:02X}:{packed[3]:02X}:{packed[1]:02X}:00:01'
+        vendor = ''
+    return (f'<host><status state="up" reason="arp-response"/>\n'
+            f'<address addr="{address}" addrtype="ipv4"/>\n'
+            f'<address addr="{mac}" addrtype="mac"{vendor}/>\n'
+            f'<hostnames/>\n<times srtt="1000" rttvar="5000" to="100000"/>\n</host>\n')
+
+
+def main(args):
+    up_every = int(os.environ.get('BENCH_NMAP_UP_EVERY', '4'))
+    delay = float(os.environ.get('BENCH_NMAP_DELAY', '0'))
+    targets = targets_of(args)
+    total = sum(ip_network(t, strict=False).num_addresses for t in targets)
+    out = sys.stdout
+    out.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<nmaprun scanner="nmap" args="nmap {" ".join(args)}">\n')
+    up = 0
+    for target in targets:
+        for address in hosts_up(target, up_every):
+            if delay:
+                time.sleep(delay * up_every)
+            out.write(host_xml(address, up % 2))
+            out.flush()
+            up += 1
+    out.write(f'<taskprogress task="ARP Ping Scan" percent="100.00"/>\n'
+              f'<runstats><finished/><hosts up="{up}" down="{total - up}" total="{total}"/></runstats>\n'
+              f'</nmaprun>\n')
+    out.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
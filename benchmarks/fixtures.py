@@ -0,0 +1,153 @@
+"""fixtures
+
+Local stand-ins the benchmarks run against, so their results don't depend on the network or a remote API
+
+  - fake_nmap       context manager that puts fake_nmap.py first in the PATH as nmap
+  - VendorStub      local HTTP server answering vendor lookups like MacVendors.co after a configurable latency
+  - isolated        context manager that gives the benchmarks a fixed OUI index, an empty vendor cache, a
+                    temporary host inventory and logs warnings only
+  - known_hosts     function that fills a HostStateStore as if its hosts had been sniffed
+"""
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import ip_network
+from pathlib import Path
+from unittest import mock
+import logging
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+FAKE_NMAP = Path(__file__).resolve().parent / 'fake_nmap.py'
+
+
+@contextmanager
+def fake_nmap(up_every=4, delay=0.0):
+    """Put fake_nmap.py first in the PATH as nmap, shard scanning processes inherit it
+
+    :param up_every: Every how many addresses of a network a host is up. Default: 4
+    :param delay: Seconds each address takes to probe. Default: 0.0
+    """
+    import nmap_scan
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'nmap')
+        with open(path, 'w') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_NMAP}" "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        environment = {'PATH': f'{directory}{os.pathsep}{os.environ.get("PATH", "")}',
+                       'BENCH_NMAP_UP_EVERY': str(up_every), 'BENCH_NMAP_DELAY': str(delay)}
+        with mock.patch.dict(os.environ, environment), mock.patch.object(nmap_scan, '_path', None):
+            yield path
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for every concurrent lookup, connections beyond the backlog would be retried a second later
+    request_queue_size = 128
+
+
+class VendorStub:
+    """Local HTTP server answering vendor lookups like MacVendors.co after `latency` seconds
+
+        Used as a context manager, the API URL of mac_vendor points to it and the internet counts as reachable
+        within the block.
+    """
+    __slots__ = ('latency', 'requests', '_server', '_patches')
+
+    def __init__(self, latency=0.05):
+        """A VendorStub object
+
+        :param latency: Seconds each answer takes. Default: 0.05
+        """
+        self.latency = latency
+        self.requests = 0
+        self._server = None
+        self._patches = []
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.latency)
+                body = f'Vendor {self.path.rsplit("/", 1)[-1][:8]}'.encode()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _StubServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._patches = [mock.patch('mac_vendor.MAC_VENDORS_API', f'http://127.0.0.1:{self._server.server_port}/'),
+                         mock.patch('check_internet.Connectivity.online', lambda connectivity, wait=True: True)]
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        for patch in reversed(self._patches):
+            patch.stop()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.latency!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+@contextmanager
+def isolated():
+    """Give the block an OUI index that only knows AA:BB:CC, an empty vendor cache in memory and a host inventory
+    in a temporary directory, so the results don't depend on the files of the installation
+
+    Only warnings and errors are logged, in this process and the ones it starts, so the timings don't include
+    writing debug records and the log of the installation isn't flooded with them.
+
+    :return: Function that empties the vendor cache, for timing cold lookups
+    """
+    import inventory
+    import logger
+    import oui
+    import vendor_cache
+    with tempfile.TemporaryDirectory() as directory, mock.patch.dict(os.environ, {logger.LEVEL_ENV: 'WARNING'}):
+        cache = [vendor_cache.VendorCache(None)]
+
+        def cold():
+            cache[0] = vendor_cache.VendorCache(None)
+
+        with mock.patch.object(oui, '_index', oui.OuiIndex([(24, 0xAABBCC, 'Bench Vendor')])), \
+                mock.patch.object(vendor_cache, 'get_cache', lambda: cache[0]), \
+                mock.patch('mac_vendor.get_cache', lambda: cache[0]), \
+                mock.patch.object(inventory, '_inventory', inventory.Inventory(Path(directory, 'inventory.sqlite3'))):
+            logging.disable(logging.INFO)
+            try:
+                yield cold
+            finally:
+                logging.disable(logging.NOTSET)
+                inventory._inventory.close()
+
+
+def known_hosts(cidr, up_every=4):
+    """Return a HostStateStore with the hosts fake_nmap reports up on `cidr` as if they had been sniffed,
+    so without vendor
+
+    :param cidr: The network in CIDR notation
+    :param up_every: Every how many addresses of the network a host is up. Default: 4
+    """
+    from host_state import HostStateStore
+    from scan import Host
+    store = HostStateStore()
+    for index, address in enumerate(ip_network(cidr)):
+        if index % up_every == 1 % up_every:
+            packed = address.packed
+            mac = f'02:{packed[2]:02X}:{packed[3]:02X}:{packed[1]:02X}:00:01'
+            store.see(cidr, Host(str(address), mac, None, 'N/A'))
+    return store
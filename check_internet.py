@@ -1,17 +1,33 @@
 """check_internet
 
 This module exports:
-  - is_connected      function that verifies there is an active internet connection
+  - is_connected        function that verifies there is an active internet connection
+  - Connectivity        class that checks the internet connection in the background and caches the result
+  - get_connectivity    function that returns the Connectivity shared by the whole process
+
+Local scanning doesn't need the internet, only the online vendor fallback does, so the connection is checked
+in the background while the program starts and the features that need it ask the cached result.
 """
 from logger import create_logger
+from constants import CONNECTIVITY_TTL
+from metrics import timed
 from shutdown import shutdown
 from terminal_control import Color
+from http.client import HTTPException
 from urllib.parse import urlsplit, quote_plus
 from urllib.request import Request, urlopen
-from urllib.error import URLError
+import os
+import threading
+import time
 
 log = create_logger(__name__)
 
+# Overrides CONNECTIVITY_TTL e.g. DIAMOND_CONNECTIVITY_TTL=60
+TTL_ENV = 'DIAMOND_CONNECTIVITY_TTL'
+
+_connectivity = None
+_connectivity_lock = threading.Lock()
+
 
 def is_connected(site='https://github.com', timeout=5):
     """Try to connect to `site` with a specified `timeout`
@@ -26,15 +42,133 @@ def is_connected(site='https://github.com', timeout=5):
     :exception URLError: If the URL can't be opened
     :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
     """
-    log.debug(f'Connecting to {site} with a {timeout} second timeout')
-    request = _parse_url(site)
+    if _reachable(_parse_url(site), timeout):
+        return True
+    print(f'{Color.B_RED}Al parecer no estás en linea. Por favor revisa tu conexión a Internet.{Color.OFF}')
+    return False
+
+
+class Connectivity:
+    """Check the internet connection on a background thread and cache the result for `ttl` seconds
+
+        Public methods:
+          - check       start a check in the background unless one is running or the cached result is fresh
+          - online      return whether the internet is reachable
+          - disable     go offline, the connection is never checked again
+    """
+    __slots__ = ('site', 'timeout', 'ttl', '_request', '_disabled', '_result', '_checked', '_thread', '_lock')
+
+    def __init__(self, site='https://github.com', timeout=5, ttl=CONNECTIVITY_TTL):
+        """A Connectivity object
+
+        :param site: The website to connect to. Default: 'https://github.com'
+        :param timeout: The connection timeout in seconds. Default: 5
+        :param ttl: Seconds a result is cached before the connection is checked again. Default: CONNECTIVITY_TTL
+        :exception SystemExit: If `site` is not a valid https URL
+        """
+        self.site = site
+        self.timeout = timeout
+        self.ttl = ttl
+        self._request = _parse_url(site)
+        self._disabled = False
+        self._result = None
+        self._checked = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+        log.debug('Connectivity created: %r', self)
+
+    def check(self):
+        """Start checking the connection on a daemon thread, unless a check is running, the cached result is fresh
+        or the connection is disabled
+
+        :return: The thread running the check, None if there is none
+        """
+        with self._lock:
+            if self._disabled:
+                return None
+            if self._thread is None and (self._result is None or time.monotonic() - self._checked >= self.ttl):
+                self._thread = threading.Thread(target=self._check, name='connectivity', daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def online(self, wait=True):
+        """Return whether the internet is reachable, from the cached result
+
+        A stale result is returned as is while a check refreshes it in the background.
+
+        :param wait: If True and the connection was never checked, wait for the running check. Default: True
+        :return: True if the internet is reachable. False if it's not, the connection is disabled, or it was never
+        checked and `wait` is False
+        """
+        thread = self.check()
+        with self._lock:
+            result = self._result
+        if result is None and wait and thread is not None:
+            log.debug('Waiting for the connection check')
+            thread.join(self.timeout + 1)
+            with self._lock:
+                result = self._result
+        return bool(result) and not self._disabled
+
+    def disable(self):
+        """Go offline, the features that need the internet are skipped and the connection is never checked again"""
+        with self._lock:
+            self._disabled = True
+        log.debug('Connectivity disabled')
+
+    def _check(self):
+        result = None
+        try:
+            result = _reachable(self._request, self.timeout)
+        finally:
+            # Whatever happens the check is over, the next one must be able to start
+            with self._lock:
+                if result is not None:
+                    if result != self._result:
+                        log.info('Internet %s', 'reachable' if result else 'unreachable')
+                    self._result = result
+                    self._checked = time.monotonic()
+                self._thread = None
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.site!r}', f'{self.timeout!r}', f'{self.ttl!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+def get_connectivity():
+    """Return the Connectivity shared by the whole process, creating it on first use
+
+    Its TTL is CONNECTIVITY_TTL, overridden by the DIAMOND_CONNECTIVITY_TTL environment variable.
+    """
+    global _connectivity
+    if _connectivity is None:
+        with _connectivity_lock:
+            if _connectivity is None:
+                _connectivity = Connectivity(ttl=_ttl())
+    return _connectivity
+
+
+def _ttl():
+    value = os.environ.get(TTL_ENV)
+    if value is None:
+        return CONNECTIVITY_TTL
+    try:
+        return float(value)
+    except ValueError:
+        log.warning('Invalid %s %r, using %s', TTL_ENV, value, CONNECTIVITY_TTL)
+        return CONNECTIVITY_TTL
+
+
+def _reachable(request, timeout):
+    log.debug('Connecting to %s with a %s second timeout', request.full_url, timeout)
     try:
-        with urlopen(request, timeout=timeout) as response:
-            log.debug(f'Got response {response}')
+        with timed('internet', 'check'), urlopen(request, timeout=timeout) as response:
+            log.debug('Got response %s', response)
             return True
-    except URLError:
-        print(f'{Color.B_RED}Al parecer no estás en linea. Por favor revisa tu conexión a Internet.{Color.OFF}')
-        log.exception(f'URLError on {__name__} module')
+    except (OSError, HTTPException) as e:
+        # URLError, timeouts and resets are OSErrors, a malformed or cut response is an HTTPException
+        log.exception(f'{e.__class__.__name__} on {__name__} module')
         return False
     except KeyboardInterrupt:
         log.debug(f'KeyboardInterrupt on {__name__} module')
@@ -43,16 +177,16 @@ def is_connected(site='https://github.com', timeout=5):
 
 def _parse_url(site):
     split_result = _split(site)
-    log.debug(f'Split result: {split_result}')
+    log.debug('Split result: %s', split_result)
 
     log.debug('Verifying that url scheme is https')
     _verify_https(split_result.scheme)
 
     quoted = _quote(split_result.netloc)
-    log.debug(f'Quoted special characters and non-ASCII text: {quoted}')
+    log.debug('Quoted special characters and non-ASCII text: %s', quoted)
 
     url = f'{split_result.scheme}://{quoted}'
-    log.debug(f'Parsed url: {url}')
+    log.debug('Parsed url: %s', url)
     return Request(url)
 
 
@@ -1,19 +1,57 @@
 """constants module
 
 This module exports:
+  - ARP_TIMEOUT         Seconds to wait for ARP replies on an ARP sweep
   - BANNER              Program's title and logo
+  - CONNECTIVITY_TTL    Seconds an internet connection check is cached, overridden by DIAMOND_CONNECTIVITY_TTL
+  - DETECT_FLIPS        MAC changes an IP may have per detection window before it is reported
+  - DETECT_GARP_LIMIT   Gratuitous ARPs a MAC may send per detection window before it is reported
+  - DETECT_MAX_HOSTS    Maximum IPs and MACs tracked at once by the detection, the least recently added are dropped
+  - DETECT_STATS        Seconds between the detection counters written to the log
+  - DETECT_WINDOW       Seconds of the detection rate windows
+  - ENGINES             Available host discovery engines
   - EXAMPLES            Usage examples displayed in help
+  - HOST_STALE          Seconds after which a known host is probed again on a rescan
+  - ICMP_TIMEOUT        Seconds to wait for echo replies on an ICMP sweep
+  - INVENTORY_NEW       Seconds a device first seen counts as new in the host inventory
+  - LOG_BACKUPS         Rotated log files kept
+  - LOG_FILE            Name of the log file in the 'logs' directory
+  - LOG_LEVEL           Default log level, overridden by the DIAMOND_LOG_LEVEL environment variable
+  - LOG_MAX_BYTES       Size at which the log file is rotated
   - MAC_VENDORS_API     URL for the MacVendors.co API
   - MAX_PACKETS         Maximum packets per minute allowed
+  - METRICS_PORT        Default port of the local metrics endpoint
   - MIN_PACKETS         Minimum packets per minute allowed
   - NAME                Program's name
+  - OUTPUT_FORMATS      Machine readable formats for the scan output
   - PACKETS_PER_MIN     Default packets to send per minute
+  - PASSIVE_LISTEN      Seconds the passive engine sniffs traffic on each scan
   - PATRICK             Flatter the customer, make him feel good
+  - PROFILE_KINDS       Profile dumps available besides the breakdown of the phases
+  - PROGRESS_RATE       Maximum redraws per second of the progress displayed while loading
   - PROMPT              String for user prompt
   - REQUIREMENTS        Requirements displayed along an error message when they are not satisfied
+  - RESTORE_CONFIRM     Answered rounds without poisoned traffic that verify the connection of a target as restored
+  - RESTORE_MIN_ROUNDS  Minimum correction rounds sent before the connection of a target is verified
+  - RESTORE_MIN_SECONDS Minimum seconds of corrections before the connection of a target is verified
+  - RESTORE_TIMEOUT     Maximum seconds to restore the connection of the targets
+  - SHARD_PREFIX        Prefix length of the shards broad networks are split into to be scanned concurrently
+  - SHARD_RATE          Maximum addresses per second handed to the shard scanning processes
+  - SHARD_WORKERS       Maximum shard scanning processes, also bounded by the number of cores
+  - VENDOR_CACHE_SIZE   Maximum entries of the in-process vendor cache
+  - VENDOR_CACHE_TTL    Seconds a vendor name stays cached
+  - VENDOR_DEADLINE     Seconds to wait for all the concurrent vendor lookups of a scan
+  - VENDOR_ERROR_TTL    Seconds a failed vendor lookup ('N/A') stays cached
+  - VENDOR_NEGATIVE_TTL Seconds an unknown vendor ('No vendor') stays cached
+  - VENDOR_TIMEOUT      Seconds to wait for a single vendor lookup
+  - VENDOR_WORKERS      Maximum concurrent vendor lookups
   - VERSION             Program's version
+  - WATCH_MAX_INTERVAL  Maximum seconds between scans of an idle network on watch mode
+  - WATCH_MIN_INTERVAL  Seconds between scans of a changing network on watch mode
+  - WATCH_MISSES        Scans in a row a host must miss to leave on watch mode
 """
 
+ARP_TIMEOUT = 2
 BANNER = """
  __                __        __      __   ___  ___  ___       __   ___ 
 |  \ |  /\   |\/| /  \ |\ | |  \    |  \ |__  |__  |__  |\ | /__` |__  
@@ -27,6 +65,13 @@ BANNER = """
                                 \ \/ /
                                   \/
 """
+CONNECTIVITY_TTL = 5 * 60
+DETECT_FLIPS = 3
+DETECT_GARP_LIMIT = 10
+DETECT_MAX_HOSTS = 4096
+DETECT_STATS = 60
+DETECT_WINDOW = 10
+ENGINES = ('nmap', 'arp', 'icmp', 'passive')
 EXAMPLES = 'start interactive mode\n' \
            '   sudo python3 diamond.py\n\n' \
            'specify an interface\n' \
@@ -38,14 +83,49 @@ EXAMPLES = 'start interactive mode\n' \
            'display active hosts and exit\n' \
            '   sudo python3 diamond.py -s\n' \
            '   sudo python3 diamond.py --scan\n\n' \
+           'stream active hosts as they are found in a machine readable format\n' \
+           '   sudo python3 diamond.py -s -o ndjson\n' \
+           '   sudo python3 diamond.py --scan --output csv > hosts.csv\n\n' \
+           'watch the network and report hosts joining, leaving or changing MAC as NDJSON\n' \
+           '   sudo python3 diamond.py -w\n' \
+           '   sudo python3 diamond.py --watch --socket /run/diamond.sock\n\n' \
+           'detect ARP spoofing of the gateway, gratuitous ARP floods and IP/MAC flip-flops\n' \
+           '   sudo python3 diamond.py -d\n' \
+           '   sudo python3 diamond.py --detect -i eth0\n\n' \
+           'discover hosts with an ARP sweep, an ICMP sweep or sniffed traffic instead of nmap\n' \
+           '   sudo python3 diamond.py -s -e arp\n' \
+           '   sudo python3 diamond.py --engine icmp\n' \
+           '   sudo DIAMOND_ENGINE=passive python3 diamond.py -s\n\n' \
+           'keep a host table from sniffed ARP/DHCP/mDNS traffic between interactive scans\n' \
+           '   sudo python3 diamond.py --passive\n\n' \
+           'time each phase of a run, optionally with a cProfile dump and a Chrome trace in the logs directory\n' \
+           '   sudo python3 diamond.py -s --profile\n' \
+           '   sudo python3 diamond.py -s --profile cprofile trace\n' \
+           '   sudo DIAMOND_PROFILE=trace python3 diamond.py -s\n\n' \
+           'serve counters and phase timings for Prometheus at http://127.0.0.1:PORT/metrics\n' \
+           '   sudo python3 diamond.py --metrics\n' \
+           '   sudo python3 diamond.py -w --metrics 9100\n\n' \
+           'work offline, vendors are only looked up in the OUI index and the cache\n' \
+           '   sudo python3 diamond.py --offline\n' \
+           '   sudo python3 diamond.py -s --offline\n\n' \
            'start non-interactive mode setting target ips\n' \
            '   sudo python3 diamond.py -t 192.168.1.114\n' \
            '   sudo python3 diamond.py --target 192.168.1.242 192.168.1.237'
+HOST_STALE = 60
+ICMP_TIMEOUT = 2
+INVENTORY_NEW = 24 * 60 * 60
+LOG_BACKUPS = 3
+LOG_FILE = 'diamond_defense.log'
+LOG_LEVEL = 'DEBUG'
+LOG_MAX_BYTES = 5 * 1024 * 1024
 MAC_VENDORS_API = 'https://macvendors.co/api/vendorname/'
 MAX_PACKETS = 120
+METRICS_PORT = 9477
 MIN_PACKETS = 1
 NAME = 'Diamond Defense'
+OUTPUT_FORMATS = ('json', 'ndjson', 'csv')
 PACKETS_PER_MIN = 60
+PASSIVE_LISTEN = 5
 PATRICK = """
 ****,,***********,,******************************************#%***%***%%%%%%(,,,,,,*************,**********************
 *//*****************,,*********************************(%##%#*/%***%(/*****#%******,***********************************
@@ -96,6 +176,25 @@ PATRICK = """
 |__) |  | |__  |  \ /  \     /\  \ / |  | |  \  /\  |__)  |  |__   _|   /    ·
 |    \__/ |___ |__/ \__/    /~~\  |  \__/ |__/ /~~\ |  \  |  |___  .    \__  ·
 """
+PROFILE_KINDS = ('cprofile', 'trace')
+PROGRESS_RATE = 5
 PROMPT = 'diamond_defense> '
-REQUIREMENTS = 'kamene, netifaces, python-nmap'
+REQUIREMENTS = 'kamene, netifaces'
+RESTORE_CONFIRM = 3
+RESTORE_MIN_ROUNDS = 10
+RESTORE_MIN_SECONDS = 5
+RESTORE_TIMEOUT = 10
+SHARD_PREFIX = 24
+SHARD_RATE = 1024
+SHARD_WORKERS = 8
+VENDOR_CACHE_SIZE = 1024
+VENDOR_CACHE_TTL = 30 * 24 * 60 * 60
+VENDOR_DEADLINE = 10
+VENDOR_ERROR_TTL = 5 * 60
+VENDOR_NEGATIVE_TTL = 24 * 60 * 60
+VENDOR_TIMEOUT = 5
+VENDOR_WORKERS = 16
 VERSION = '2.4'
+WATCH_MAX_INTERVAL = 5 * 60
+WATCH_MIN_INTERVAL = 10
+WATCH_MISSES = 2
@@ -0,0 +1,232 @@
+"""detect module
+
+This module exports:
+  - Alert               dataclass containing a detected ARP anomaly
+  - ArpSpoofDetector    class that inspects ARP packets against the gateway baseline of an Addresses object
+  - detect              function that sniffs ARP traffic and reports the anomalies until interrupted
+
+Three anomalies are detected:
+  - gateway_spoof   a host claims the gateway IP with a MAC other than the gateway's
+  - garp_flood      a MAC sends more than DETECT_GARP_LIMIT gratuitous ARPs in DETECT_WINDOW seconds
+  - flip_flop       an IP changes MAC more than DETECT_FLIPS times in DETECT_WINDOW seconds
+"""
+from logger import create_logger
+from constants import DETECT_FLIPS, DETECT_GARP_LIMIT, DETECT_MAX_HOSTS, DETECT_STATS, DETECT_WINDOW
+from shutdown import shutdown
+from terminal_control import Color
+from dataclasses import dataclass
+import time
+from kamene.layers.l2 import ARP
+from kamene.sendrecv import sniff
+# noinspection PyUnresolvedReferences
+from kamene import route
+
+log = create_logger(__name__)
+
+# Filtered by the kernel so only ARP packets get copied to user space
+BPF_FILTER = 'arp'
+KINDS = ('gateway_spoof', 'garp_flood', 'flip_flop')
+
+
+@dataclass(frozen=True)
+class Alert:
+    """Dataclass containing a detected ARP anomaly"""
+    kind: str
+    ip: str
+    mac: str
+    detail: str
+    __slots__ = ('kind', 'ip', 'mac', 'detail')
+
+
+class _Window:
+    # Fixed window counter: constant memory per host
+    __slots__ = ('start', 'count', 'alerted')
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.alerted = False
+
+    def hit(self, when, window):
+        if when - self.start >= window:
+            self.start = when
+            self.count = 0
+            self.alerted = False
+        self.count += 1
+        return self.count
+
+
+class _IpState:
+    __slots__ = ('mac', 'seen', 'flips')
+
+    def __init__(self, mac, when):
+        self.mac = mac
+        self.seen = when
+        self.flips = _Window(when)
+
+
+class ArpSpoofDetector:
+    """Inspect ARP packets against a trusted gateway IP/MAC baseline
+
+        Each host is tracked with a fixed size state, so memory grows with the hosts of the segment
+        and not with its traffic. Hosts quiet for a whole window are forgotten and at most `max_hosts` IPs and
+        `max_hosts` MACs are tracked, so packets with made up addresses can't grow it without bound either.
+        Each anomaly is reported once per window and sender MAC.
+
+        Public methods:
+          - inspect     inspect an ARP packet and return its alerts
+          - stats       return the packet and alert counters and their rates
+    """
+    __slots__ = ('gateway_ip', 'gateway_mac', 'interface_mac', 'window', 'garp_limit', 'flips',
+                 'max_hosts', 'counters', 'started', '_ips', '_garps', '_spoofs', '_evicted')
+
+    def __init__(self, gateway_ip, gateway_mac, interface_mac=None, window=DETECT_WINDOW,
+                 garp_limit=DETECT_GARP_LIMIT, flips=DETECT_FLIPS, max_hosts=DETECT_MAX_HOSTS):
+        """An ArpSpoofDetector object
+
+        :param gateway_ip: The trusted gateway IP address
+        :param gateway_mac: The trusted gateway MAC address
+        :param interface_mac: Our hardware address, its packets are ignored (e.g. while blocking). Default: None
+        :param window: Seconds of the rate windows. Default: DETECT_WINDOW
+        :param garp_limit: Gratuitous ARPs a MAC may send per window. Default: DETECT_GARP_LIMIT
+        :param flips: MAC changes an IP may have per window. Default: DETECT_FLIPS
+        :param max_hosts: Maximum IPs, and MACs, tracked at once. Default: DETECT_MAX_HOSTS
+        """
+        self.gateway_ip = gateway_ip
+        self.gateway_mac = gateway_mac.lower()
+        self.interface_mac = interface_mac.lower() if interface_mac else None
+        self.window = window
+        self.garp_limit = garp_limit
+        self.flips = flips
+        self.max_hosts = max_hosts
+        self.counters = dict.fromkeys(('packets',) + KINDS, 0)
+        self.started = time.monotonic()
+        self._ips = {}
+        self._garps = {}
+        self._spoofs = {}
+        self._evicted = None
+        log.debug('ArpSpoofDetector created: %r', self)
+
+    def inspect(self, ip, mac, target_ip=None, when=None):
+        """Inspect an ARP packet sent by `mac` claiming `ip`
+
+        :param ip: The sender protocol address (psrc)
+        :param mac: The sender hardware address (hwsrc)
+        :param target_ip: The target protocol address (pdst). Gratuitous when equal to `ip`. Default: None
+        :param when: Seconds from time.monotonic(). Default: None (now)
+        :return: List of Alert objects, empty if the packet looks legitimate
+        """
+        when = time.monotonic() if when is None else when
+        mac = mac.lower()
+        self.counters['packets'] += 1
+        if mac == self.interface_mac:
+            return []
+        if self._evicted is None or when - self._evicted >= self.window:
+            self._evict(when)
+
+        alerts = []
+        if ip == self.gateway_ip and mac != self.gateway_mac:
+            spoofs = self._window(self._spoofs, mac, when)
+            spoofs.hit(when, self.window)
+            if not spoofs.alerted:
+                spoofs.alerted = True
+                alerts.append(Alert('gateway_spoof', ip, mac, f'gateway is at {self.gateway_mac}'))
+
+        if ip == target_ip:
+            garps = self._window(self._garps, mac, when)
+            if garps.hit(when, self.window) > self.garp_limit and not garps.alerted:
+                garps.alerted = True
+                alerts.append(Alert('garp_flood', ip, mac, f'{garps.count} gratuitous ARPs in {self.window}s'))
+
+        state = self._ips.get(ip)
+        if state is None:
+            self._ips[ip] = _IpState(mac, when)
+            self._cap(self._ips)
+        else:
+            state.seen = when
+            if state.mac != mac:
+                previous, state.mac = state.mac, mac
+                flips = state.flips
+                if flips.hit(when, self.window) > self.flips and not flips.alerted:
+                    flips.alerted = True
+                    alerts.append(Alert('flip_flop', ip, mac, f'{flips.count} MAC changes in {self.window}s, '
+                                                              f'last from {previous}'))
+
+        for alert in alerts:
+            self.counters[alert.kind] += 1
+        return alerts
+
+    def stats(self):
+        """Return a dict with the packet and alert counters and their rates per second"""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        stats = dict(self.counters)
+        stats.update({f'{k}_rate': round(v / elapsed, 3) for k, v in self.counters.items()})
+        stats['hosts'] = len(self._ips)
+        return stats
+
+    def _window(self, windows, mac, when):
+        window = windows.get(mac)
+        if window is None:
+            window = windows[mac] = _Window(when)
+            self._cap(windows)
+        return window
+
+    def _cap(self, states):
+        # The least recently added go first
+        while len(states) > self.max_hosts:
+            del states[next(iter(states))]
+
+    def _evict(self, when):
+        # Whatever had no packet for a whole window holds nothing a new packet wouldn't start over
+        self._evicted = when
+        for windows in (self._garps, self._spoofs):
+            for mac in [m for m, w in windows.items() if when - w.start >= self.window]:
+                del windows[mac]
+        for ip in [i for i, s in self._ips.items() if when - s.seen >= self.window]:
+            del self._ips[ip]
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.gateway_ip!r}', f'{self.gateway_mac!r}', f'{self.interface_mac!r}', f'{self.window!r}',
+                f'{self.garp_limit!r}', f'{self.flips!r}', f'{self.max_hosts!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+def detect(addresses):
+    """Sniff ARP traffic on the interface of `addresses` and report the anomalies until interrupted
+
+    The gateway IP/MAC pair learned by `addresses` is the trusted baseline.
+    The counters are logged every DETECT_STATS seconds and displayed on exit.
+
+    :param addresses: An Addresses object
+    :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
+    """
+    detector = ArpSpoofDetector(addresses.gateway.ip, addresses.gateway.mac, addresses.interface.mac)
+    print(f'{Color.B_GREEN}Vigilando ARP en {Color.WHITE}{addresses.interface.name}{Color.B_GREEN}, '
+          f'gateway {Color.WHITE}{addresses.gateway.ip} {addresses.gateway.mac}{Color.OFF}')
+    last_stats = time.monotonic()
+
+    def handle(packet):
+        nonlocal last_stats
+        arp = packet[ARP]
+        for alert in detector.inspect(arp.psrc, arp.hwsrc, arp.pdst):
+            log.warning('%s: %s is at %s (%s)', alert.kind, alert.ip, alert.mac, alert.detail)
+            print(f'{Color.B_RED}[{alert.kind}] {Color.WHITE}{alert.ip} {Color.B_RED}en {Color.WHITE}{alert.mac}'
+                  f'{Color.OFF} ({alert.detail})')
+        now = time.monotonic()
+        if now - last_stats >= DETECT_STATS:
+            last_stats = now
+            log.info('Detector stats: %s', detector.stats())
+
+    try:
+        # store=False so sniffed packets are dropped as soon as they are inspected
+        sniff(iface=addresses.interface.name, filter=BPF_FILTER, prn=handle, store=False)
+    except KeyboardInterrupt:
+        log.debug(f'KeyboardInterrupt on {__name__} module')
+        stats = detector.stats()
+        log.info('Detector stats: %s', stats)
+        print(f'\n{Color.B_CYAN}Paquetes ARP: {Color.WHITE}{stats["packets"]} '
+              f'({stats["packets_rate"]}/s){Color.OFF}')
+        for kind in KINDS:
+            print(f'{Color.B_CYAN}{kind}: {Color.WHITE}{stats[kind]}{Color.OFF}')
+        shutdown()
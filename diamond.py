@@ -16,31 +16,68 @@ Diamond Defense can be executed with the following command line options
     display active hosts and exit
         sudo python3 diamond.py -s
         sudo python3 diamond.py --scan
+    stream active hosts as they are found in a machine readable format
+        sudo python3 diamond.py -s -o ndjson
+        sudo python3 diamond.py --scan --output csv > hosts.csv
+    watch the network and report hosts joining, leaving or changing MAC as NDJSON
+        sudo python3 diamond.py -w
+        sudo python3 diamond.py --watch --socket /run/diamond.sock
+    detect ARP spoofing of the gateway, gratuitous ARP floods and IP/MAC flip-flops
+        sudo python3 diamond.py -d
+        sudo python3 diamond.py --detect -i eth0
+    discover hosts with an ARP sweep, an ICMP sweep or sniffed traffic instead of nmap
+        sudo python3 diamond.py -s -e arp
+        sudo python3 diamond.py --engine icmp
+        sudo DIAMOND_ENGINE=passive python3 diamond.py -s
+    keep a host table from sniffed ARP/DHCP/mDNS traffic between interactive scans
+        sudo python3 diamond.py --passive
+    time each phase of a run, optionally with a cProfile dump and a Chrome trace in the logs directory
+        sudo python3 diamond.py -s --profile
+        sudo python3 diamond.py -s --profile cprofile trace
+        sudo DIAMOND_PROFILE=trace python3 diamond.py -s
+    serve counters and phase timings for Prometheus at http://127.0.0.1:PORT/metrics
+        sudo python3 diamond.py --metrics
+        sudo python3 diamond.py -w --metrics 9100
+    work offline, vendors are only looked up in the OUI index and the cache
+        sudo python3 diamond.py --offline
+        sudo python3 diamond.py -s --offline
     start non-interactive mode specifying target ips
         sudo python3 diamond.py -t 192.168.1.114
         sudo python3 diamond.py --target 192.168.1.242 192.168.1.237
 """
 
 from logger import create_logger
-from check_internet import is_connected
-from constants import BANNER, EXAMPLES, MAX_PACKETS, MIN_PACKETS, NAME, PACKETS_PER_MIN, PATRICK, REQUIREMENTS, VERSION
+from constants import BANNER, ENGINES, EXAMPLES, MAX_PACKETS, METRICS_PORT, MIN_PACKETS, NAME, OUTPUT_FORMATS,\
+    PACKETS_PER_MIN, PATRICK, PROFILE_KINDS, REQUIREMENTS, VERSION
 from is_root import is_root
+from metrics import timed
 from shutdown import shutdown
 from terminal_control import Color
 from argparse import ArgumentParser, RawDescriptionHelpFormatter, ArgumentTypeError
+from contextlib import contextmanager, redirect_stdout
+import atexit
+import os
+import signal
+import sys
 
 log = create_logger(__name__)
 
-try:
-    from addresses import Addresses
-    from display_scan import display_scan
-    from interactive import interactive
-    from non_interactive import non_interactive
-except ModuleNotFoundError as e:
-    print(f'{Color.B_RED}Requerimientos no satisfechos: {e.name}{Color.OFF}')
-    print(f'{Color.B_YELLOW}Los paquetes requeridos son: {REQUIREMENTS}{Color.OFF}')
-    log.exception(f'ModuleNotFoundError on {__name__} module')
-    shutdown(True)
+ENGINE_ENV = 'DIAMOND_ENGINE'
+# Any value profiles the run, the PROFILE_KINDS it lists separated by commas are also dumped e.g. 'cprofile,trace'
+PROFILE_ENV = 'DIAMOND_PROFILE'
+
+
+@contextmanager
+def _requirements():
+    # Modes import their modules (and kamene, netifaces with them) only when they run,
+    # so --version, --help and failed startup checks don't pay for them
+    try:
+        yield
+    except ModuleNotFoundError as e:
+        print(f'{Color.B_RED}Requerimientos no satisfechos: {e.name}{Color.OFF}')
+        print(f'{Color.B_YELLOW}Los paquetes requeridos son: {REQUIREMENTS}{Color.OFF}')
+        log.exception(f'ModuleNotFoundError on {__name__} module')
+        shutdown(True)
 
 
 def _range_type(string):
@@ -54,6 +91,14 @@ def _range_type(string):
         raise ArgumentTypeError(f'invalid choice: {string} (choose from [{MIN_PACKETS}-{MAX_PACKETS}])')
 
 
+def _default_engine():
+    engine = os.environ.get(ENGINE_ENV, ENGINES[0])
+    if engine not in ENGINES:
+        log.warning('Unknown engine %s in %s, using %s', engine, ENGINE_ENV, ENGINES[0])
+        return ENGINES[0]
+    return engine
+
+
 def _add_args():
     parser = ArgumentParser(formatter_class=RawDescriptionHelpFormatter, epilog=f'{EXAMPLES}\n{PATRICK}')
     parser.add_argument('--version', action='version', version=f'{NAME} {VERSION}')
@@ -62,8 +107,90 @@ def _add_args():
                         type=_range_type, metavar=f'[{MIN_PACKETS}-{MAX_PACKETS}]',
                         help=f'packets to send per minute (default: {PACKETS_PER_MIN})')
     parser.add_argument('-s', '--scan', action='store_true', help='scan your network and exit')
+    parser.add_argument('-o', '--output', choices=OUTPUT_FORMATS,
+                        help='with --scan, stream the hosts in a machine readable format')
+    parser.add_argument('-w', '--watch', action='store_true',
+                        help='keep scanning your network and report the changes as NDJSON')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='with --watch, send the changes to the clients of a unix socket instead of stdout')
+    parser.add_argument('-d', '--detect', action='store_true',
+                        help='watch ARP traffic for spoofing of the gateway and report it')
     parser.add_argument('-t', '--target', nargs='+', help='IP address(es) to block')
-    return parser.parse_args()
+    engine = _default_engine()
+    parser.add_argument('-e', '--engine', default=engine, choices=ENGINES,
+                        help=f'host discovery engine, also set with ${ENGINE_ENV} (default: {engine})')
+    parser.add_argument('--passive', action='store_true',
+                        help='interactive mode: learn hosts from sniffed traffic and only probe stale ones')
+    parser.add_argument('--profile', nargs='*', choices=PROFILE_KINDS, metavar='KIND',
+                        help=f'time each phase and display the breakdown on exit, also dump any of '
+                             f'{", ".join(PROFILE_KINDS)}. Also set with ${PROFILE_ENV}')
+    parser.add_argument('--offline', action='store_true',
+                        help="don't check the internet connection nor look up vendors online")
+    parser.add_argument('--metrics', nargs='?', const=METRICS_PORT, type=int, metavar='PORT',
+                        help=f'serve counters and phase timings for Prometheus at http://127.0.0.1:PORT/metrics '
+                             f'(default port: {METRICS_PORT})')
+    args = parser.parse_args()
+    if args.output and not args.scan:
+        parser.error('argument -o/--output: only allowed with -s/--scan')
+    return args
+
+
+def _handle_signals():
+    # SIGTERM and SIGHUP take the same path as ⌃C, so blocking restores the connection before exiting
+    for name in ('SIGTERM', 'SIGHUP'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), _interrupt)
+
+
+def _interrupt(signum, frame):
+    log.debug('Signal %s received', signum)
+    raise KeyboardInterrupt
+
+
+def _heal():
+    # Restore the connection of a previous session that died while blocking, before anything else
+    from journal import heal
+    with _requirements():
+        heal()
+
+
+def _check_connection(offline):
+    # Checked in the background while the addresses are resolved, only the online vendor lookups wait for it
+    from check_internet import get_connectivity
+    connectivity = get_connectivity()
+    if offline:
+        connectivity.disable()
+    else:
+        connectivity.check()
+
+
+def _profile(kinds):
+    # Profiled with --profile or a DIAMOND_PROFILE value, otherwise nothing is imported nor hooked
+    if kinds is None:
+        value = os.environ.get(PROFILE_ENV)
+        if not value:
+            return
+        kinds = [k.strip() for k in value.split(',') if k.strip() in PROFILE_KINDS]
+    from profiling import Profiler
+    profiler = Profiler(kinds)
+    profiler.start()
+    # Also on shutdown, which exits from anywhere
+    atexit.register(profiler.stop)
+
+
+def _export(port):
+    # The endpoint is optional, the run goes on without it if the port can't be listened on
+    if port is None:
+        return
+    from exporter import MetricsExporter
+    exporter = MetricsExporter(port)
+    try:
+        exporter.start()
+    except OSError:
+        print(f'{Color.B_YELLOW}No se pudieron servir las métricas en el puerto {port}{Color.OFF}', file=sys.stderr)
+        log.exception(f'OSError on {__name__} module')
+        return
+    atexit.register(exporter.close)
 
 
 def _show_banner():
@@ -73,28 +200,79 @@ def _show_banner():
 if __name__ == '__main__':
     log.debug('Adding command line interface args')
     args = _add_args()
-    if is_root() and is_connected():
-        log.debug('Showing banner')
-        _show_banner()
+    _profile(args.profile)
+    _export(args.metrics)
+    _handle_signals()
+    root = is_root()
+    if root:
+        with timed('diamond', 'heal'):
+            _heal()
+        _check_connection(args.offline)
+        if not args.output and not args.watch:
+            log.debug('Showing banner')
+            _show_banner()
+            if args.offline:
+                print(f'{Color.B_YELLOW}Modo sin conexión: los fabricantes sólo se buscan localmente{Color.OFF}\n')
 
-        log.debug(f'Argument interface specified: {args.interface}')
-        log.debug(f'Argument packets specified: {args.packets}')
-        log.debug(f'Argument scan specified: {args.scan}')
-        log.debug(f'Argument targets specified: {args.target}')
+        log.debug('Argument interface specified: %s', args.interface)
+        log.debug('Argument packets specified: %s', args.packets)
+        log.debug('Argument scan specified: %s', args.scan)
+        log.debug('Argument output specified: %s', args.output)
+        log.debug('Argument watch specified: %s', args.watch)
+        log.debug('Argument socket specified: %s', args.socket)
+        log.debug('Argument detect specified: %s', args.detect)
+        log.debug('Argument targets specified: %s', args.target)
+        log.debug('Argument engine specified: %s', args.engine)
+        log.debug('Argument passive specified: %s', args.passive)
+        log.debug('Argument offline specified: %s', args.offline)
+        log.debug('Argument metrics specified: %s', args.metrics)
 
         if args.scan:
             log.debug('Scan selected')
-            display_scan(Addresses(args.interface))
+            with _requirements():
+                from addresses import Addresses
+                from display_scan import display_scan, stream_scan
+            if args.output:
+                # Keep stdout for the machine readable output, human readable messages go to stderr
+                out = sys.stdout
+                with redirect_stdout(sys.stderr):
+                    stream_scan(Addresses(args.interface, engine=args.engine), args.output, out)
+            else:
+                display_scan(Addresses(args.interface, engine=args.engine))
+        elif args.watch:
+            log.debug('Watch mode selected')
+            with _requirements():
+                from addresses import Addresses
+                from watch import watch
+            # Keep stdout for the events, human readable messages go to stderr
+            out = sys.stdout
+            try:
+                with redirect_stdout(sys.stderr):
+                    watch(Addresses(args.interface, False, args.engine), args.socket, out)
+            except KeyboardInterrupt:
+                log.debug(f'KeyboardInterrupt on {__name__} module')
+        elif args.detect:
+            log.debug('Detect mode selected')
+            with _requirements():
+                from addresses import Addresses
+                from detect import detect
+            detect(Addresses(args.interface, False, args.engine))
         elif args.target:
             log.debug('Non-interactive mode selected')
+            with _requirements():
+                from addresses import Addresses
+                from non_interactive import non_interactive
             try:
-                non_interactive(Addresses(args.interface, False), args.packets, args.target)
+                non_interactive(Addresses(args.interface, False, args.engine), args.packets, args.target)
             except KeyboardInterrupt:
                 log.debug(f'KeyboardInterrupt on {__name__} module')
         else:
             log.debug('Interactive mode selected')
+            with _requirements():
+                from addresses import Addresses
+                from interactive import interactive
             try:
-                interactive(Addresses(args.interface), args.packets)
+                interactive(Addresses(args.interface, engine=args.engine), args.packets, args.passive)
             except KeyboardInterrupt:
                 log.debug(f'KeyboardInterrupt on {__name__} module')
     else:
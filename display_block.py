@@ -6,6 +6,7 @@ This module exports:
 """
 from logger import create_logger
 from block import block, restore_connection
+from journal import clear_journal, write_journal
 from terminal_control import Color
 
 log = create_logger(__name__)
@@ -14,6 +15,8 @@ log = create_logger(__name__)
 def display_block(targets, addresses, packets):
     """Display targets, block them and restore the connection when the user interrupts the program (⌃C)
 
+    The targets are written to the journal while they are blocked.
+
     :param targets: List of target hosts
     :param addresses: An Addresses object
     :param packets: Packets to send per minute
@@ -26,11 +29,18 @@ def display_block(targets, addresses, packets):
     print(f'{Color.B_CYAN}Bloqueo iniciado ( {Color.WHITE}{packets} paquetes/minuto {Color.B_CYAN}){Color.OFF}')
     print(f'\n{Color.MAGENTA}Para detener el bloqueo, presiona ^C{Color.OFF}')
 
+    # Recorded so the connection can be restored on the next start if this process dies while blocking
+    write_journal(targets, addresses)
     log.debug('Starting block')
     try:
         block(targets, addresses, packets)
     except KeyboardInterrupt:
-        restore_connection(targets, addresses)
-        print(f'{Color.B_GREEN}Conexión restaurada con éxito{Color.OFF}')
+        unrestored = restore_connection(targets, addresses)
+        clear_journal()
+        if unrestored:
+            ips = [t.ip for t in unrestored]
+            print(f'{Color.B_YELLOW}No se pudo verificar la conexión de: {Color.WHITE}{", ".join(ips)}{Color.OFF}')
+        else:
+            print(f'{Color.B_GREEN}Conexión restaurada con éxito{Color.OFF}')
         log.debug(f'KeyboardInterrupt on {__name__} module')
         log.debug('Block stopped')
@@ -2,15 +2,21 @@
 
 This module exports:
   - display_scan                function that scans and displays information about the network and its active hosts
+  - stream_scan                 function that scans and writes the active hosts in a machine readable format
   - display_network_info        function that displays information about the network
   - display_hosts               function that displays information about the hosts
+  - display_host                function that displays information about a host
   - get_hosts                   function that scans the network, validates that hosts are active and returns them
 """
 from logger import create_logger
+from backends import ScanError
+from inventory import get_inventory
 from loading_animation import animate
-from scan import scan
+from output import create_writer
+from scan import resolve_hosts, scan
 from shutdown import shutdown
 from terminal_control import Color
+import time
 
 log = create_logger(__name__)
 
@@ -25,6 +31,33 @@ def display_scan(addresses):
     display_hosts(hosts)
 
 
+def stream_scan(addresses, output_format, stream=None):
+    """Perform a scan and write each active host as soon as it is found
+
+    A host is first seen when the host inventory first saw its MAC address, or now if it is new,
+    and last seen now.
+
+    :param addresses: An Addresses object
+    :param output_format: One of OUTPUT_FORMATS ('json', 'ndjson' or 'csv')
+    :param stream: The text stream to write to. Default: None (sys.stdout)
+    :return: List of active hosts
+    """
+    writer = create_writer(output_format, stream)
+    inventory = get_inventory()
+
+    def write(host, latency):
+        now = time.time()
+        known = inventory.devices(mac=host.mac)
+        writer.write(host, latency, known[0].first_seen if known else now, now)
+
+    try:
+        return scan(addresses.network.cidr, addresses.engine, addresses.interface.name, write)
+    except ScanError as e:
+        _scan_failed(e)
+    finally:
+        writer.close()
+
+
 def display_network_info(hosts, addresses):
     """Display information about the network
 
@@ -38,33 +71,99 @@ def display_network_info(hosts, addresses):
           f'{Color.CYAN} --> {Color.B_RED}{len(hosts)} {Color.CYAN}dispositivos activos{Color.OFF} 📱 🖥  📺 🕹️')
 
 
-def display_hosts(hosts):
+def display_hosts(hosts, last_seen=None):
     """Display information about the hosts
 
     :param hosts: A list of Host objects
+    :param last_seen: Optionally a dict mapping each host IP to when it was last seen (seconds since the epoch).
+    Default: None
     """
     log.debug('Displaying active hosts')
     print(f'\n{Color.B_WHITE}Dispositivos conectados:{Color.OFF}')
     for index, host in enumerate(hosts):
-        print(f'  {Color.WHITE}[{Color.GREEN}{index}{Color.WHITE}] {Color.BLUE}{host.ip}\t\t{host.mac}'
-              f'\t{Color.CYAN}{host.vendor} ({Color.MAGENTA}{host.hostname}{Color.CYAN}){Color.OFF}')
+        display_host(index, host, last_seen.get(host.ip) if last_seen else None)
+
+
+def display_host(index, host, last_seen=None):
+    """Display information about a host on its own line
+
+    :param index: The number the user selects the host with
+    :param host: A Host object
+    :param last_seen: Optionally when the host was last seen (seconds since the epoch). Default: None
+    """
+    age = ''
+    if last_seen is not None:
+        age = f' {Color.WHITE}visto hace {_format_age(time.time() - last_seen)}'
+    print(f'  {Color.WHITE}[{Color.GREEN}{index}{Color.WHITE}] {Color.BLUE}{host.ip}\t\t{host.mac}'
+          f'\t{Color.CYAN}{host.vendor} ({Color.MAGENTA}{host.hostname}{Color.CYAN}){age}{Color.OFF}')
 
 
-def get_hosts(addresses):
+def get_hosts(addresses, store=None, on_host=None):
     """Scan network, validate that hosts are active and return them
 
+    With a `store` the network is only scanned in full the first time.
+    Afterwards only the stale hosts are probed, the known ones are reused,
+    and a sweep for new hosts runs in the background to be shown on the next call.
+
     :param addresses: An Addresses object
+    :param store: Optionally a HostStateStore with the hosts known from previous scans, also the one
+    the passive engine reports. Default: None
+    :param on_host: Optionally a function called, on the sweep thread, with each host the background sweep finds
+    and its latency as soon as it is found. Not called if a sweep of the network was already running. Default: None
     :return: List of active hosts with their respective ip, mac, vendor and hostname
     """
     log.debug('Getting hosts')
-    hosts = _scan_network(addresses)
+    try:
+        if store is None:
+            hosts = _scan_network(addresses)
+        else:
+            hosts = _incremental_hosts(addresses, store, on_host)
+    except ScanError as e:
+        _scan_failed(e)
     _check_hosts_length(hosts, addresses)
     return hosts
 
 
+def _incremental_hosts(addresses, store, on_host=None):
+    cidr = addresses.network.cidr
+    if not store.records(cidr):
+        log.debug('No known hosts on %s', cidr)
+        store.update(cidr, _scan_network(addresses, store))
+    else:
+        stale = store.stale(cidr)
+        log.debug('Probing %s stale hosts on %s', len(stale), cidr)
+        if stale:
+            store.update(cidr, _scan_targets(addresses, stale, store), stale)
+        store.start_sweep(cidr, lambda: scan(cidr, addresses.engine, addresses.interface.name, on_host, store))
+
+    # Hosts learned passively have no vendor yet
+    hosts = resolve_hosts((h.ip, h.mac, h.vendor, h.hostname, None) for h in store.hosts(cidr))
+    store.fill(cidr, hosts)
+    return hosts
+
+
+def _format_age(seconds):
+    if seconds < 60:
+        return f'{int(seconds)} s'
+    if seconds < 3600:
+        return f'{int(seconds // 60)} min'
+    return f'{int(seconds // 3600)} h'
+
+
 @animate(msg=f'{Color.B_YELLOW}Escaneando tu red, espera un momento...')
-def _scan_network(addresses):
-    return scan(addresses.network.cidr)
+def _scan_network(addresses, store=None):
+    return scan(addresses.network.cidr, addresses.engine, addresses.interface.name, store=store)
+
+
+@animate(msg=f'{Color.B_YELLOW}Revisando los dispositivos conocidos, espera un momento...')
+def _scan_targets(addresses, ips, store=None):
+    return scan(' '.join(ips), addresses.engine, addresses.interface.name, store=store)
+
+
+def _scan_failed(error):
+    print(f'{Color.B_RED}{error}{Color.OFF}')
+    log.exception(f'ScanError on {__name__} module')
+    shutdown(True)
 
 
 def _check_hosts_length(hosts, addresses):
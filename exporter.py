@@ -0,0 +1,138 @@
+"""exporter module
+
+This module exports:
+  - MetricsExporter     class that serves the counters, gauges and timings of the metrics module on a local HTTP
+                        endpoint
+  - render              function that returns the counters, gauges and timings in the Prometheus text format
+
+The endpoint is served by its own threads and only reads snapshots of the metrics module, copied under its lock,
+so a scrape never waits for a scan, a block or a vendor lookup and never makes them wait.
+"""
+from logger import create_logger
+from constants import METRICS_PORT
+from metrics import BUCKETS, counters, gauges, histograms
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+log = create_logger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'diamond_'
+COUNTERS = {
+    'address_syncs': 'Syncs of the interface, gateway and network addresses by result',
+    'block_packets': 'Malicious ARP replies sent to block targets',
+    'hosts_found': 'Active hosts found by the scans by engine',
+    'restore_packets': 'Legitimate ARP replies sent to restore the connection of targets',
+    'restored_targets': 'Targets whose connection was restored by result',
+    'scans': 'Scans run by engine',
+    'vendor_lookups': 'Vendor lookups by where the vendor was found',
+    'vendor_requests': 'Requests to the vendor API by result',
+}
+GAUGES = {
+    'hosts_up': 'Active hosts found by the last scan of each network',
+}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug('%s %s', self.address_string(), format % args)
+
+
+class MetricsExporter:
+    """Serve the counters, gauges and timings of the metrics module at http://`host`:`port`/metrics
+    on a background thread
+
+        Public methods:
+          - start       start serving
+          - close       stop serving and release the port
+    """
+    __slots__ = ('host', 'port', '_server')
+
+    def __init__(self, port=METRICS_PORT, host='127.0.0.1'):
+        """A MetricsExporter object
+
+        :param port: The port to listen on, 0 for any free port. Default: METRICS_PORT
+        :param host: The address to listen on. Default: '127.0.0.1'
+        """
+        self.host = host
+        self.port = port
+        self._server = None
+        log.debug('MetricsExporter created: %r', self)
+
+    def start(self):
+        """Start serving on a daemon thread, `port` becomes the port listened on
+
+        :exception OSError: If the port can't be listened on e.g. it is in use
+        """
+        self._server = _Server((self.host, self.port), _Handler)
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, name='metrics-exporter', daemon=True).start()
+        log.debug('Serving metrics on http://%s:%s/metrics', self.host, self.port)
+
+    def close(self):
+        """Stop serving and release the port"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            log.debug('Metrics exporter closed')
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.port!r}', f'{self.host!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+def render():
+    """Return the counters as Prometheus counters, the gauges as Prometheus gauges and the timings as the
+    diamond_phase_seconds histogram, in the Prometheus text exposition format
+    """
+    lines = []
+    lines.extend(_render(counters(), 'counter', COUNTERS, '_total'))
+    lines.extend(_render(gauges(), 'gauge', GAUGES))
+
+    metric = f'{PREFIX}phase_seconds'
+    lines.append(f'# HELP {metric} Seconds each phase of a source took')
+    lines.append(f'# TYPE {metric} histogram')
+    for (source, phase), histogram in sorted(histograms().items()):
+        labels = (('source', source), ('phase', phase))
+        for bound, cumulative in zip(BUCKETS, histogram['buckets']):
+            lines.append(f'{metric}_bucket{_labels(labels + (("le", f"{bound:g}"),))} {cumulative}')
+        lines.append(f'{metric}_bucket{_labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+        lines.append(f'{metric}_sum{_labels(labels)} {histogram["total"]!r}')
+        lines.append(f'{metric}_count{_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _render(values, kind, helps, suffix=''):
+    named = {}
+    for (name, labels), value in values.items():
+        named.setdefault(name, []).append((labels, value))
+    for name in sorted(named):
+        metric = f'{PREFIX}{name}{suffix}'
+        yield f'# HELP {metric} {helps.get(name, name.replace("_", " ").capitalize())}'
+        yield f'# TYPE {metric} {kind}'
+        for labels, value in sorted(named[name]):
+            yield f'{metric}{_labels(labels)} {value}'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
@@ -0,0 +1,198 @@
+"""host_state module
+
+This module exports:
+  - HostRecord          dataclass containing a host and when it was first and last seen
+  - HostStateStore      class that keeps the known hosts of each network between scans
+  - target_networks     function that returns the networks of a scan target string
+"""
+from logger import create_logger
+from constants import HOST_STALE
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
+import threading
+import time
+
+log = create_logger(__name__)
+
+
+@dataclass
+class HostRecord:
+    """Dataclass containing a Host and when it was first and last seen (seconds since the epoch)"""
+    host: object
+    first_seen: float
+    last_seen: float
+    __slots__ = ('host', 'first_seen', 'last_seen')
+
+
+class HostStateStore:
+    """Keep the known hosts of each network, keyed by the network CIDR, between scans
+
+        Public methods:
+          - see             record that a host was seen
+          - update          record the hosts of a scan
+          - fill            replace hosts with resolved copies without changing when they were seen
+          - stale           return the IPs that haven't been seen recently
+          - records         return the host records of a network sorted by IP
+          - hosts           return the hosts of a network sorted by IP
+          - last_seen       return when each host of a network was last seen
+          - find            return the hosts of any network within scan targets
+          - start_sweep     scan a whole network in the background and merge the result
+    """
+    __slots__ = ('stale_after', '_networks', '_sweeps', '_lock')
+
+    def __init__(self, stale_after=HOST_STALE):
+        """A HostStateStore object
+
+        :param stale_after: Seconds after which a host is considered stale. Default: HOST_STALE
+        """
+        self.stale_after = stale_after
+        self._networks = {}
+        self._sweeps = {}
+        self._lock = threading.Lock()
+        log.debug('HostStateStore created: %r', self)
+
+    def see(self, cidr, host, when=None):
+        """Record that `host` was seen on the `cidr` network
+
+        A host that keeps its MAC address keeps the vendor and hostname already learned
+        when `host` doesn't bring them (None or 'N/A').
+
+        :param cidr: The network in CIDR notation
+        :param host: A Host object. Its vendor may be None when unknown
+        :param when: Seconds since the epoch. Default: None (now)
+        :return: The HostRecord of `host`
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            table = self._networks.setdefault(cidr, {})
+            record = table.get(host.ip)
+            if record is None or record.host.mac.upper() != host.mac.upper():
+                record = table[host.ip] = HostRecord(host, when, when)
+                log.debug('New host on %s: %r', cidr, record)
+                return record
+
+            known = record.host
+            record.host = replace(host,
+                                  vendor=host.vendor if host.vendor not in (None, 'N/A') else known.vendor,
+                                  hostname=host.hostname if host.hostname not in (None, 'N/A') else known.hostname)
+            record.last_seen = max(record.last_seen, when)
+            return record
+
+    def update(self, cidr, hosts, probed=()):
+        """Record the `hosts` of a scan and forget the `probed` IPs that didn't answer
+
+        :param cidr: The network in CIDR notation
+        :param hosts: List of Host objects
+        :param probed: IPs the scan was sent to. Default: ()
+        """
+        when = time.time()
+        for host in hosts:
+            self.see(cidr, host, when)
+        answered = {host.ip for host in hosts}
+        with self._lock:
+            table = self._networks.setdefault(cidr, {})
+            for ip in probed:
+                if ip not in answered and table.pop(ip, None):
+                    log.debug('%s did not answer, forgetting it', ip)
+
+    def fill(self, cidr, hosts):
+        """Replace the known hosts with `hosts` (e.g. with their vendors resolved) without changing their times
+
+        :param cidr: The network in CIDR notation
+        :param hosts: List of Host objects
+        """
+        with self._lock:
+            table = self._networks.get(cidr, {})
+            for host in hosts:
+                record = table.get(host.ip)
+                if record is not None and record.host.mac.upper() == host.mac.upper():
+                    record.host = host
+
+    def stale(self, cidr):
+        """Return the IPs of the `cidr` network that haven't been seen in the last `stale_after` seconds"""
+        limit = time.time() - self.stale_after
+        with self._lock:
+            return [ip for ip, r in self._networks.get(cidr, {}).items() if r.last_seen < limit]
+
+    def records(self, cidr):
+        """Return the HostRecord objects of the `cidr` network sorted by IP"""
+        with self._lock:
+            return sorted(self._networks.get(cidr, {}).values(), key=lambda r: ip_address(r.host.ip))
+
+    def hosts(self, cidr):
+        """Return the Host objects of the `cidr` network sorted by IP"""
+        return [r.host for r in self.records(cidr)]
+
+    def last_seen(self, cidr):
+        """Return a dict mapping the IPs of the `cidr` network to when they were last seen"""
+        with self._lock:
+            return {ip: r.last_seen for ip, r in self._networks.get(cidr, {}).items()}
+
+    def find(self, targets, since=None):
+        """Return the known hosts, whatever network they were recorded under, whose IP is within `targets`
+
+        :param targets: String specifying the targets. A network in CIDR notation, an IP address or several
+        separated by spaces
+        :param since: Optionally only the hosts last seen at or after these seconds since the epoch. Default: None
+        :return: List of Host objects sorted by IP, the most recently seen when an IP is known on several networks
+        :exception ValueError: If `targets` is not valid
+        """
+        networks = target_networks(targets)
+        found = {}
+        with self._lock:
+            for table in self._networks.values():
+                for ip, record in table.items():
+                    if since is not None and record.last_seen < since:
+                        continue
+                    if ip in found and found[ip].last_seen >= record.last_seen:
+                        continue
+                    if any(ip_address(ip) in n for n in networks):
+                        found[ip] = record
+        return [r.host for r in sorted(found.values(), key=lambda r: ip_address(r.host.ip))]
+
+    def start_sweep(self, cidr, scan):
+        """Scan the whole `cidr` network on a daemon thread and merge the result
+
+        Known hosts that don't answer the sweep are forgotten. Only one sweep per network runs at a time.
+
+        :param cidr: The network in CIDR notation
+        :param scan: Function without arguments that scans the network and returns a list of Host objects
+        :return: The sweep thread, or None if a sweep of the network is already running
+        """
+        with self._lock:
+            running = self._sweeps.get(cidr)
+            if running is not None and running.is_alive():
+                log.debug('Sweep of %s already running', cidr)
+                return None
+            thread = self._sweeps[cidr] = threading.Thread(target=self._sweep, args=(cidr, scan), daemon=True)
+        thread.start()
+        return thread
+
+    def _sweep(self, cidr, scan):
+        log.debug('Sweep of %s starting', cidr)
+        with self._lock:
+            known = list(self._networks.get(cidr, {}))
+        try:
+            hosts = scan()
+        except (Exception, SystemExit):
+            # SystemExit too, a shutdown called on this thread would otherwise end it silently
+            log.exception(f'Sweep of {cidr} failed')
+            return
+        self.update(cidr, hosts, known)
+        log.debug('Sweep of %s finished with %s hosts', cidr, len(hosts))
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.stale_after!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+@lru_cache(maxsize=64)
+def target_networks(targets):
+    """Return the networks of `targets`, a network in CIDR notation, an IP address or several separated by spaces
+
+    :return: Tuple of IPv4Network/IPv6Network objects, single addresses being /32 (or /128) networks
+    :exception ValueError: If a target is not a valid network or address
+    """
+    return tuple(ip_network(t, strict=False) for t in targets.split())
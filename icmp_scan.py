@@ -0,0 +1,134 @@
+"""icmp_scan module
+
+This module exports:
+  - icmp_sweep      function that discovers active hosts with a single burst of ICMP echo requests
+
+The echo requests go through a raw socket of the kernel, which resolves the MAC addresses of the hosts
+while sending them. The MAC addresses are then read from the kernel's ARP table (/proc/net/arp, Linux only).
+"""
+from logger import create_logger
+from backends import ScanError
+from constants import ICMP_TIMEOUT
+from progress import report
+from ipaddress import ip_network
+import os
+import select
+import socket
+import struct
+import time
+
+log = create_logger(__name__)
+
+ARP_TABLE = '/proc/net/arp'
+ECHO_REQUEST = 8
+ECHO_REPLY = 0
+# Complete entry flag of the kernel's ARP table
+ATF_COM = 0x2
+
+
+def icmp_sweep(ip, interface=None, timeout=ICMP_TIMEOUT):
+    """Send one burst of ICMP echo requests to `ip` and collect the replies until `timeout`
+
+    The addresses probed are reported with the progress module as each echo request is sent.
+
+    :param ip: String specifying the targets. A network in CIDR notation, an IP address or several separated by spaces
+    :param interface: The interface to send packets from. Default: None (chosen by the kernel's routing table)
+    :param timeout: Seconds to wait for replies after the last request is sent. Default: ICMP_TIMEOUT
+    :return: List of (ip, mac, vendor, hostname, latency) tuples of the hosts that replied and whose MAC address
+    is known, vendor being None and hostname 'N/A' since ICMP doesn't carry them
+    :exception PermissionError: If not running as root
+    :exception ScanError: If some target is neither a network nor an IP address
+    """
+    targets = [str(h) for t in ip.split() for h in _hosts(t)]
+    identifier = os.getpid() & 0xFFFF
+    sent = {}
+    replies = {}
+    log.debug('Sending ICMP sweep to %s (%s hosts) with a %s second timeout', ip, len(targets), timeout)
+    report(total=len(targets))
+    with socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP) as sock:
+        if interface and hasattr(socket, 'SO_BINDTODEVICE'):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+        sock.setblocking(False)
+        for sequence, target in enumerate(targets):
+            try:
+                sock.sendto(_echo_request(identifier, sequence & 0xFFFF), (target, 0))
+                sent[target] = time.perf_counter()
+            except OSError:
+                # e.g. the broadcast address, or no route to the host
+                log.debug('Could not send echo request to %s', target)
+            report(probed=1)
+            _receive(sock, identifier, sent, replies, 0)
+
+        deadline = time.perf_counter() + timeout
+        while len(replies) < len(sent):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            _receive(sock, identifier, sent, replies, remaining)
+
+    macs = _arp_table()
+    found = []
+    for target, latency in replies.items():
+        mac = macs.get(target)
+        if mac is None:
+            # Answered from outside the link (e.g. a routed network) or our own address
+            log.debug('%s replied but its MAC address is unknown', target)
+            continue
+        found.append((target, mac, None, 'N/A', latency))
+    return found
+
+
+def _hosts(target):
+    try:
+        network = ip_network(target, strict=False)
+    except ValueError:
+        raise ScanError(f'Objetivo no válido: {target}')
+    return network.hosts() if network.num_addresses > 1 else [network.network_address]
+
+
+def _echo_request(identifier, sequence):
+    header = struct.pack('!BBHHH', ECHO_REQUEST, 0, 0, identifier, sequence)
+    return struct.pack('!BBHHH', ECHO_REQUEST, 0, _checksum(header), identifier, sequence)
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _receive(sock, identifier, sent, replies, timeout):
+    readable, _, _ = select.select([sock], [], [], timeout)
+    if not readable:
+        return
+    # Drain every reply already queued
+    while True:
+        try:
+            packet, (source, _) = sock.recvfrom(1024)
+        except BlockingIOError:
+            return
+        received = time.perf_counter()
+        # The raw socket gets the IP header too, its length is in the low nibble of the first byte
+        offset = (packet[0] & 0x0F) * 4
+        if len(packet) < offset + 8:
+            continue
+        icmp_type, _, _, reply_id, _ = struct.unpack('!BBHHH', packet[offset:offset + 8])
+        if icmp_type == ECHO_REPLY and reply_id == identifier and source in sent and source not in replies:
+            replies[source] = received - sent[source]
+
+
+def _arp_table():
+    macs = {}
+    try:
+        with open(ARP_TABLE) as f:
+            next(f)  # header
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 4 and int(fields[2], 16) & ATF_COM:
+                    macs[fields[0]] = fields[3]
+    except OSError:
+        log.exception(f'OSError on {__name__} module')
+    return macs
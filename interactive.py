@@ -7,16 +7,19 @@ This module exports:
 from logger import create_logger
 from constants import PROMPT
 from display_block import display_block
-from display_scan import display_network_info, display_hosts, get_hosts
+from display_scan import display_host, display_network_info, get_hosts
+from host_state import HostStateStore
 from shutdown import shutdown
 from terminal_control import Color, Misc
-import time
+import asyncio
 import re
+import threading
+import time
 
 log = create_logger(__name__)
 
 
-def interactive(addresses, packets):
+def interactive(addresses, packets, passive=False):
     """Enter Diamond Defense on interactive mode
 
     Display network information.
@@ -24,34 +27,51 @@ def interactive(addresses, packets):
     Ask user for targets.
     Start blocking.
 
+    The session runs on an asyncio event loop. Prompts and scans run on their own threads.
+    The known hosts are listed once the stale ones are probed again, then the hosts the background sweep finds
+    are appended as they are found, so targets can be chosen before it finishes.
+
     :param addresses: An Addresses object
     :param packets: Packets to send per minute
+    :param passive: If True keep the known hosts fresh from sniffed traffic so rescans probe fewer hosts.
+    Always the case with the passive engine, whose scans report those hosts. Default: False
     :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
     :exception EOFError: If the user enters EOF (⌃D)
     :exception ValueError: If the user enters not a number when selecting a target
     :exception IndexError: If the user enters a target number not available
     """
-    hosts = get_hosts(addresses)
+    store = HostStateStore()
+    if passive or addresses.engine == 'passive':
+        # Imported here so the sniffing layers only load when they are used
+        from passive import PassiveMonitor
+        log.debug('Starting passive monitor')
+        PassiveMonitor(addresses, store).start()
+
+    # Not asyncio.run: it turns the first ⌃C into a task cancellation, which doesn't stop a block in progress
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_session(addresses, packets, store))
+    except KeyboardInterrupt:
+        log.debug(f'KeyboardInterrupt on {__name__} module')
+        shutdown()
+    finally:
+        loop.close()
+
+
+async def _session(addresses, packets, store):
+    hosts = await _in_thread(get_hosts, addresses, store)
     display_network_info(hosts, addresses)
 
     pattern_block = re.compile('^b(lock)?$')
     pattern_clear = re.compile('^cl(ear)?$')
     pattern_exit = re.compile('^e(xit)?$')
-    option = ''
     while True:
         _display_options()
-        try:
-            option = input(f'\n{Color.CYAN}{PROMPT}{Color.OFF}').lower()
-        except KeyboardInterrupt:
-            log.debug(f'KeyboardInterrupt on {__name__} module')
-            shutdown()
-        except EOFError:
-            log.debug(f'EOFError on {__name__} module')
-            shutdown()
+        option = (await _prompt(f'\n{Color.CYAN}{PROMPT}{Color.OFF}')).lower()
 
         if pattern_block.match(option):
             log.debug('Selected: block')
-            _choose_targets(addresses, packets)
+            await _choose_targets(addresses, packets, store)
         elif pattern_clear.match(option):
             log.debug('Selected: clear')
             print(f'{Misc.CLEAR}')
@@ -69,48 +89,116 @@ def _display_options():
                f'   {Color.WHITE}[{Color.GREEN}cl/clear{Color.WHITE}]\t{Color.BLUE} Limpiar pantalla',
                f'   {Color.WHITE}[{Color.GREEN}e/exit{Color.WHITE}]\t{Color.BLUE} Salir de Diamond Defense{Color.OFF}']
     log.debug('Displaying options')
-    for o in options:
-        print(o)
-        time.sleep(0.1)
+    print('\n'.join(options))
 
 
-def _choose_targets(addresses, packets):
+async def _choose_targets(addresses, packets, store):
     print(f'{Misc.CLEAR}')
     print(f'{Color.B_CYAN}Bloquear dispositivos (modo interactivo) {Color.B_GREEN}seleccionado...{Color.OFF}')
 
     log.debug('Getting addresses')
-    addresses.sync()
+    await _in_thread(addresses.sync)
+
+    loop = asyncio.get_event_loop()
+    listing = _HostListing()
+
+    def found(host, latency):
+        # Called on the sweep thread
+        _call_soon(loop, listing.add, host, time.time())
 
-    hosts = get_hosts(addresses)
-    display_hosts(hosts)
+    # Only the stale hosts are probed, the known ones are listed right away
+    # and the ones the background sweep finds are appended as they arrive
+    hosts = await _in_thread(get_hosts, addresses, store, found)
+    print(f'\n{Color.B_WHITE}Dispositivos conectados:{Color.OFF}')
+    listing.start(hosts, store.last_seen(addresses.network.cidr))
 
     log.debug('Asking user for targets')
-    targets = _parse_targets(_get_target_numbers(), hosts, addresses)
+    answer = await _prompt(f'\n{Color.B_GREEN}Elige los dispositivos a bloquear (separados por coma)'
+                           f'\n{Color.CYAN}{PROMPT}{Color.OFF}')
+    listing.close()
+    targets = _parse_targets(_get_target_numbers(answer), listing.hosts, addresses)
 
     if targets:
+        # Blocks the event loop until ⌃C, the sweep keeps running on its thread and updates the store
         display_block(targets, addresses, packets)
     else:
         print(f'{Color.B_RED}No seleccionaste ningún dispositivo de la lista{Color.OFF}')
         log.warning('No valid target(s) selected')
 
 
-def _get_target_numbers():
-    list_with_empty_elements = [t.strip() for t in _targets_prompt().split(',')]
-    return [i for i in list_with_empty_elements if i]
+class _HostListing:
+    # Hosts numbered in the order they are listed, so numbers don't change as the sweep appends hosts
+    __slots__ = ('hosts', 'open', '_pending')
+
+    def __init__(self):
+        self.hosts = []
+        self.open = True
+        # Found by the sweep before the known hosts are listed
+        self._pending = []
+
+    def start(self, hosts, last_seen):
+        pending, self._pending = self._pending, None
+        for host in hosts:
+            self.add(host, last_seen.get(host.ip))
+        for host, seen in pending:
+            self.add(host, seen)
+
+    def add(self, host, last_seen=None):
+        if self._pending is not None:
+            self._pending.append((host, last_seen))
+            return
+        if not self.open or any(h.ip == host.ip and h.mac == host.mac for h in self.hosts):
+            return
+        display_host(len(self.hosts), host, last_seen)
+        self.hosts.append(host)
 
+    def close(self):
+        # Hosts found after the targets were chosen are only recorded in the store
+        self.open = False
 
-def _targets_prompt():
+
+async def _prompt(message):
     try:
-        return input(f'\n{Color.B_GREEN}Elige los dispositivos a bloquear (separados por coma)'
-                     f'\n{Color.CYAN}{PROMPT}{Color.OFF}')
-    except KeyboardInterrupt:
-        log.debug(f'KeyboardInterrupt on {__name__} module')
-        shutdown()
+        return await _in_thread(input, message)
     except EOFError:
         log.debug(f'EOFError on {__name__} module')
         shutdown()
 
 
+def _in_thread(func, *args):
+    # Daemon threads rather than the loop's executor, so a pending input() or scan doesn't delay the exit
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+
+    def settle(setter, value):
+        if not future.done():
+            setter(value)
+
+    def run():
+        try:
+            result = func(*args)
+        except BaseException as e:
+            _call_soon(loop, settle, future.set_exception, e)
+        else:
+            _call_soon(loop, settle, future.set_result, result)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _call_soon(loop, callback, *args):
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        # The session already ended and closed the loop
+        log.debug('Event loop closed, dropping %s', callback)
+
+
+def _get_target_numbers(answer):
+    list_with_empty_elements = [t.strip() for t in answer.split(',')]
+    return [i for i in list_with_empty_elements if i]
+
+
 def _parse_targets(target_numbers, hosts, addresses):
     targets = []
     for i in target_numbers:
@@ -134,5 +222,5 @@ def _parse_targets(target_numbers, hosts, addresses):
             continue
         else:
             targets.append(host)
-            log.debug(f'Appended {host}')
+            log.debug('Appended %s', host)
     return targets
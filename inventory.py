@@ -0,0 +1,239 @@
+"""inventory module
+
+This module exports:
+  - INVENTORY_PATH  default location of the host inventory
+  - Device          dataclass containing a MAC address, its latest vendor and hostname and when it was seen
+  - Inventory       class that keeps every host ever scanned in sqlite with the IP addresses it used and its changes
+  - get_inventory   function that returns the inventory shared by the whole process
+
+Sightings of the same MAC address on the same IP address are folded into one row with a counter, so the inventory
+grows with the devices and addresses seen rather than with the number of scans.
+"""
+from logger import create_logger
+from constants import INVENTORY_NEW
+from dataclasses import dataclass
+from pathlib import Path
+import atexit
+import sqlite3
+import threading
+import time
+
+log = create_logger(__name__)
+
+INVENTORY_PATH = Path(__file__).resolve().parent / 'data' / 'inventory.sqlite3'
+
+# Below SQLITE_MAX_VARIABLE_NUMBER of old sqlite versions
+CHUNK_SIZE = 500
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS devices '
+    '(mac TEXT PRIMARY KEY, vendor TEXT, hostname TEXT, first_seen REAL NOT NULL, last_seen REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS devices_first_seen ON devices (first_seen)',
+    'CREATE TABLE IF NOT EXISTS addresses '
+    '(mac TEXT NOT NULL, ip TEXT NOT NULL, cidr TEXT, first_seen REAL NOT NULL, last_seen REAL NOT NULL, '
+    'sightings INTEGER NOT NULL, PRIMARY KEY (mac, ip)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS addresses_ip ON addresses (ip)',
+    'CREATE INDEX IF NOT EXISTS addresses_cidr ON addresses (cidr)',
+    'CREATE TABLE IF NOT EXISTS changes (mac TEXT NOT NULL, field TEXT NOT NULL, value TEXT, seen REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS changes_mac ON changes (mac)',
+)
+
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Device:
+    """Dataclass containing a MAC address, its latest vendor and hostname and when it was first and last seen"""
+    mac: str
+    vendor: str
+    hostname: str
+    first_seen: float
+    last_seen: float
+    __slots__ = ('mac', 'vendor', 'hostname', 'first_seen', 'last_seen')
+
+
+class Inventory:
+    """Keep every host ever scanned in sqlite, with the IP addresses it used and how its vendor and hostname changed
+
+        Devices are keyed by MAC address, addresses are indexed by MAC address, IP address and network.
+        If the sqlite file can't be used the inventory records nothing and its queries return nothing.
+
+        Public methods:
+          - record          record the hosts of a scan in one transaction
+          - devices         return the devices with a MAC address, IP address or network
+          - new_devices     return the devices first seen recently
+          - multiple_ips    return the MAC addresses seen on more than one IP address
+          - addresses       return the IP addresses a MAC address used
+          - changes         return how the vendor and hostname of a MAC address changed
+          - close           close the sqlite file
+    """
+    __slots__ = ('path', '_db', '_lock')
+
+    def __init__(self, path=INVENTORY_PATH):
+        """An Inventory object stored in the sqlite file at `path`
+
+        :param path: Path of the sqlite file, ':memory:' for an inventory that isn't kept. Default: INVENTORY_PATH
+        """
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+        self._open()
+        log.debug('Inventory created: %r', self)
+
+    def record(self, hosts, cidr=None, when=None):
+        """Record the `hosts` of a scan in a single transaction
+
+        A device keeps the vendor and hostname already known when a host doesn't bring them (None or 'N/A').
+
+        :param hosts: List of Host objects
+        :param cidr: Optionally the network the hosts were found on, kept for addresses seen before. Default: None
+        :param when: Seconds since the epoch. Default: None (now)
+        """
+        if not hosts:
+            return
+        when = time.time() if when is None else when
+        # A host found twice by the same scan (e.g. proxy ARP) is one sighting
+        hosts = list({(h.mac.upper(), h.ip): h for h in hosts}.items())
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                with self._db:
+                    known = self._known(list({mac for (mac, _), _ in hosts}))
+                    new, updates, changes = [], [], []
+                    for (mac, _), host in hosts:
+                        vendor = host.vendor if host.vendor not in (None, 'N/A') else None
+                        hostname = host.hostname if host.hostname not in (None, 'N/A') else None
+                        if mac not in known:
+                            new.append((mac, vendor, hostname, when, when))
+                            changes.extend((mac, field, value, when)
+                                           for field, value in (('vendor', vendor), ('hostname', hostname)) if value)
+                            known[mac] = (vendor, hostname)
+                            continue
+                        old_vendor, old_hostname = known[mac]
+                        vendor, hostname = vendor or old_vendor, hostname or old_hostname
+                        changes.extend((mac, field, new_value, when) for field, old_value, new_value in
+                                       (('vendor', old_vendor, vendor), ('hostname', old_hostname, hostname))
+                                       if new_value != old_value)
+                        updates.append((vendor, hostname, when, mac))
+                        known[mac] = (vendor, hostname)
+
+                    self._db.executemany('INSERT INTO devices VALUES (?, ?, ?, ?, ?)', new)
+                    self._db.executemany('UPDATE devices SET vendor = ?, hostname = ?, last_seen = max(last_seen, ?) '
+                                         'WHERE mac = ?', updates)
+                    self._db.executemany('INSERT INTO changes VALUES (?, ?, ?, ?)', changes)
+                    self._db.executemany('INSERT OR IGNORE INTO addresses VALUES (?, ?, ?, ?, ?, 0)',
+                                         [(mac, ip, cidr, when, when) for (mac, ip), _ in hosts])
+                    self._db.executemany('UPDATE addresses SET cidr = coalesce(?, cidr), '
+                                         'last_seen = max(last_seen, ?), sightings = sightings + 1 '
+                                         'WHERE mac = ? AND ip = ?', [(cidr, when, mac, ip) for (mac, ip), _ in hosts])
+                log.debug('Recorded %s hosts, %s new devices, %s changes', len(hosts), len(new), len(changes))
+            except sqlite3.Error:
+                log.exception(f'sqlite3.Error on {__name__} module')
+
+    def devices(self, mac=None, ip=None, cidr=None):
+        """Return the devices with the MAC address `mac`, or seen with the IP address `ip` or on the network `cidr`
+
+        :param mac: Optionally a MAC address. Default: None
+        :param ip: Optionally an IP address. Default: None
+        :param cidr: Optionally a network in CIDR notation as scanned. Default: None
+        :return: List of Device objects sorted by when they were last seen, all of them if no filter is given
+        """
+        filters = [(f, v) for f, v in (('a.mac', mac and mac.upper()), ('a.ip', ip), ('a.cidr', cidr)) if v]
+        where = ' AND '.join(f'{f} = ?' for f, _ in filters) or '1'
+        return [Device(*row) for row in self._query(
+            'SELECT DISTINCT d.mac, d.vendor, d.hostname, d.first_seen, d.last_seen FROM devices d '
+            f'JOIN addresses a ON a.mac = d.mac WHERE {where} ORDER BY d.last_seen DESC', [v for _, v in filters])]
+
+    def new_devices(self, within=INVENTORY_NEW):
+        """Return the devices first seen in the last `within` seconds
+
+        :param within: Seconds. Default: INVENTORY_NEW
+        :return: List of Device objects, the newest first
+        """
+        return [Device(*row) for row in self._query(
+            'SELECT mac, vendor, hostname, first_seen, last_seen FROM devices WHERE first_seen >= ? '
+            'ORDER BY first_seen DESC', (time.time() - within,))]
+
+    def multiple_ips(self):
+        """Return a dict mapping each MAC address seen on more than one IP address to those IP addresses"""
+        rows = self._query('SELECT mac, ip FROM addresses WHERE mac IN '
+                           '(SELECT mac FROM addresses GROUP BY mac HAVING count(*) > 1) ORDER BY mac, last_seen')
+        macs = {}
+        for mac, ip in rows:
+            macs.setdefault(mac, []).append(ip)
+        return macs
+
+    def addresses(self, mac):
+        """Return the IP addresses `mac` used
+
+        :param mac: The MAC address
+        :return: List of (ip, cidr, first_seen, last_seen, sightings) tuples, the most recent first
+        """
+        return self._query('SELECT ip, cidr, first_seen, last_seen, sightings FROM addresses WHERE mac = ? '
+                           'ORDER BY last_seen DESC', (mac.upper(),))
+
+    def changes(self, mac):
+        """Return how the vendor and hostname of `mac` changed, starting with the first ones known
+
+        :param mac: The MAC address
+        :return: List of (field, value, seen) tuples, field being 'vendor' or 'hostname'
+        """
+        return self._query('SELECT field, value, seen FROM changes WHERE mac = ? ORDER BY seen', (mac.upper(),))
+
+    def close(self):
+        """Close the sqlite file. Nothing is recorded from then on"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _open(self):
+        try:
+            if self.path != ':memory:':
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            # Readers don't block the scans that record and the log is synced at checkpoints only
+            self._db.execute('PRAGMA journal_mode = WAL')
+            self._db.execute('PRAGMA synchronous = NORMAL')
+            with self._db:
+                for statement in SCHEMA:
+                    self._db.execute(statement)
+        except (OSError, sqlite3.Error):
+            log.exception(f'Could not open inventory {self.path}. Nothing will be recorded')
+            self._db = None
+
+    def _known(self, macs):
+        known = {}
+        for i in range(0, len(macs), CHUNK_SIZE):
+            chunk = macs[i:i + CHUNK_SIZE]
+            rows = self._db.execute(f'SELECT mac, vendor, hostname FROM devices WHERE mac IN '
+                                    f'({", ".join("?" * len(chunk))})', chunk)
+            known.update((mac, (vendor, hostname)) for mac, vendor, hostname in rows)
+        return known
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            if self._db is None:
+                return []
+            try:
+                return self._db.execute(sql, parameters).fetchall()
+            except sqlite3.Error:
+                log.exception(f'sqlite3.Error on {__name__} module')
+                return []
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{str(self.path)!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+def get_inventory():
+    """Return the Inventory shared by the whole process, creating it on first use"""
+    global _inventory
+    if _inventory is None:
+        with _inventory_lock:
+            if _inventory is None:
+                _inventory = Inventory()
+                atexit.register(_inventory.close)
+    return _inventory
@@ -0,0 +1,201 @@
+"""journal module
+
+This module exports:
+  - JOURNAL_DIR         default directory of the blocking journals
+  - write_journal       function that records the targets being blocked
+  - read_journal        function that returns the recorded blocking session or None
+  - clear_journal       function that removes the journal once the connection is restored
+  - heal                function that restores the connection of the sessions that didn't finish
+
+Each blocking session has its own journal, named after its process ID, so concurrent sessions don't overwrite
+each other's. It is written when blocking starts and removed when the connection is restored,
+so a journal found at startup means its session died while blocking, unless its process is still alive.
+The boot and the start time of the process are recorded along with its ID, so a process that reused the ID
+after a reboot or once the session died isn't taken for it.
+A journal that can't be read or lacks part of the session is moved aside with a '.corrupt' suffix.
+"""
+from logger import create_logger
+from terminal_control import Color
+from pathlib import Path
+from types import SimpleNamespace
+import json
+import os
+import time
+
+log = create_logger(__name__)
+
+JOURNAL_DIR = Path(__file__).resolve().parent / 'data' / 'journals'
+BOOT_ID = '/proc/sys/kernel/random/boot_id'
+
+
+def write_journal(targets, addresses, path=None):
+    """Atomically record the `targets` being blocked and the addresses needed to restore them
+
+    The journal is written to a temporary file that replaces the previous one,
+    so it is never left half written.
+
+    :param targets: List of target hosts
+    :param addresses: An Addresses object
+    :param path: The journal file. Default: None (the journal of this process in JOURNAL_DIR)
+    """
+    pid = os.getpid()
+    session = {'pid': pid,
+               'boot_id': _boot_id(),
+               'process_start': _process_start(pid),
+               'started': time.time(),
+               'interface': {'name': addresses.interface.name, 'mac': addresses.interface.mac},
+               'gateway': {'ip': addresses.gateway.ip, 'mac': addresses.gateway.mac},
+               'network': addresses.network.cidr,
+               'targets': [{'ip': t.ip, 'mac': t.mac} for t in targets]}
+    path = Path(path or _own_journal())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(session, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # Persist the rename itself
+    fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    log.debug('Journal written: %s', session)
+
+
+def read_journal(path=None):
+    """Return the blocking session recorded in the journal
+
+    :param path: The journal file. Default: None (the journal of this process in JOURNAL_DIR)
+    :return: Dict with the recorded session or None if there is no journal or it can't be read
+    """
+    path = path or _own_journal()
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        log.exception(f'Corrupt journal on {__name__} module')
+        _quarantine(path)
+        return None
+    except OSError:
+        log.exception(f'Unreadable journal on {__name__} module')
+        return None
+
+
+def clear_journal(path=None):
+    """Remove the journal
+
+    :param path: The journal file. Default: None (the journal of this process in JOURNAL_DIR)
+    """
+    try:
+        os.unlink(path or _own_journal())
+        log.debug('Journal cleared')
+    except FileNotFoundError:
+        pass
+
+
+def heal(directory=JOURNAL_DIR):
+    """Restore the connection of the targets of the blocking sessions that didn't finish
+
+    A session whose process is still alive is left alone, it is blocking right now and restores on its own.
+
+    :param directory: The directory of the journals. Default: JOURNAL_DIR
+    :return: List of the targets that could not be verified as restored, empty if there was nothing to heal
+    """
+    unrestored = []
+    for path in sorted(Path(directory).glob('*.json')):
+        unrestored.extend(_heal_session(path))
+    return unrestored
+
+
+def _heal_session(path):
+    session = read_journal(path)
+    if session is None:
+        return []
+    try:
+        pid = session.get('pid')
+        process = (pid, session.get('boot_id'), session.get('process_start'))
+        recorded = [(t['ip'], t['mac']) for t in session['targets']]
+        interface = (session['interface']['name'], session['interface']['mac'])
+        gateway = (session['gateway']['ip'], session['gateway']['mac'])
+        network = session.get('network')
+    except (AttributeError, KeyError, TypeError):
+        log.exception(f'Malformed journal on {__name__} module: {session}')
+        _quarantine(path)
+        return []
+    if _alive(*process):
+        log.info('Blocking session of process %s is still running, not healing it', pid)
+        return []
+    log.warning('Unfinished blocking session found: %s', session)
+
+    # Imported here so startup only loads kamene when there is a session to heal
+    from addresses import Gateway, Interface, Network
+    from block import restore_connection
+    from scan import Host
+
+    targets = [Host(ip, mac, None, 'N/A') for ip, mac in recorded]
+    # restore_connection only needs the recorded interface, gateway and network, not a new Addresses sync
+    addresses = SimpleNamespace(interface=Interface(*interface), gateway=Gateway(*gateway),
+                                network=Network('', '', network))
+    ips = [t.ip for t in targets]
+    print(f'{Color.B_YELLOW}La sesión anterior terminó sin restaurar la conexión de: '
+          f'{Color.WHITE}{", ".join(ips)}{Color.OFF}')
+    unrestored = restore_connection(targets, addresses)
+    if unrestored:
+        ips = [t.ip for t in unrestored]
+        print(f'{Color.B_YELLOW}No se pudo verificar la conexión de: {Color.WHITE}{", ".join(ips)}{Color.OFF}')
+    else:
+        print(f'{Color.B_GREEN}Conexión restaurada con éxito{Color.OFF}')
+    clear_journal(path)
+    return unrestored
+
+
+def _own_journal():
+    return JOURNAL_DIR / f'{os.getpid()}.json'
+
+
+def _alive(pid, boot_id=None, process_start=None):
+    if not isinstance(pid, int) or pid <= 0 or pid == os.getpid():
+        return False
+    # Recorded on a previous boot, or by another process that had the same ID. Not known where /proc isn't
+    if boot_id is not None and boot_id != _boot_id():
+        return False
+    if process_start is not None and _process_start(pid) not in (None, process_start):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It exists, owned by someone else
+        return True
+    return True
+
+
+def _boot_id():
+    try:
+        with open(BOOT_ID) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _process_start(pid):
+    # Clock ticks since boot, the 22nd field of /proc/<pid>/stat. The 2nd field, the name, may hold spaces
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return int(f.read().rpartition(')')[2].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _quarantine(path):
+    # Kept for inspection but out of the way, so it isn't reported on every start
+    try:
+        os.replace(path, f'{path}.corrupt')
+        log.warning('Journal moved to %s.corrupt', path)
+    except OSError:
+        log.exception(f'OSError on {__name__} module')
@@ -1,20 +1,26 @@
 """loading_animation module
 
 This module exports:
-  - animate             decorator for displaying an animation when calling a function
-  - LoadingThread       threading.Thread subclass that displays a loading text animation
+  - animate             decorator for displaying an animation with the progress reported when calling a function
+  - LoadingThread       threading.Thread subclass that displays a loading text animation with the progress reported
 """
 
 from logger import create_logger
-from terminal_control import Color
+from constants import PROGRESS_RATE
+from progress import listen
+from terminal_control import Color, IS_TTY, Misc
 import threading
-import time
 
 log = create_logger(__name__)
 
+# Seconds between spinner frames while nothing is reported
+IDLE_INTERVAL = 1
+
 
 def animate(msg='Loading...'):
-    """Decorator for displaying an animation when calling a function
+    """Decorator for displaying an animation with the progress reported when calling a function
+
+    The animation is skipped when stdout is not a terminal. It is stopped even if the function raises.
 
     :param msg: Message to display with the animation. Default: 'Loading...'
     :return: Decorator that calls the inner function
@@ -28,11 +34,15 @@ def animate(msg='Loading...'):
         """
 
         def wrapper(*args, **kwargs):
+            if not IS_TTY:
+                return func(*args, **kwargs)
             animation = LoadingThread(msg)
             animation.start()
-            result = func(*args, **kwargs)
-            animation.stop()
-            return result
+            try:
+                with listen(animation.update):
+                    return func(*args, **kwargs)
+            finally:
+                animation.stop()
 
         return wrapper
 
@@ -40,45 +50,82 @@ def animate(msg='Loading...'):
 
 
 class LoadingThread(threading.Thread):
-    """threading.Thread subclass that displays a loading text animation
+    """threading.Thread subclass that displays a loading text animation with the progress reported
 
-        Output can be customized with the msg property
+        Output can be customized with the msg property. The animation is redrawn when the progress changes,
+        at most `rate` times per second, and once per IDLE_INTERVAL otherwise.
 
         Public methods:
           - run     overridden from threading.Thread to display a loading text animation
+          - update  add reported progress to the counters displayed
           - stop    stop the running animation
     """
-    __slots__ = ('msg', '_loading')
+    __slots__ = ('msg', 'rate', 'counts', '_changed', '_stopped')
 
-    def __init__(self, msg):
+    def __init__(self, msg, rate=PROGRESS_RATE):
         """A LoadingThread object (daemon thread) used for displaying a loading text animation
 
         :param msg: Message to display with the animation.
+        :param rate: Maximum redraws per second. Default: PROGRESS_RATE
         """
         super().__init__()
         self.daemon = True
         self.msg = msg
-        self._loading = True
-        log.debug(f'LoadingThread created: {self!r}')
+        self.rate = rate
+        self.counts = dict.fromkeys(('total', 'probed', 'up', 'vendors'), 0)
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        log.debug('LoadingThread created: %r', self)
 
     def run(self):
         """Overridden from threading.Thread to display a loading text animation"""
         animation = r'\|/—'
         i = 0
-        log.debug(f'LoadingThread running: {self!r}')
+        log.debug('LoadingThread running: %r', self)
         print()  # print message on its own line
-        while self._loading:
-            print(f'{self.msg} {animation[i % len(animation)]}{Color.OFF}', end='\r')
+        while True:
+            print(f'{self.msg} {animation[i % len(animation)]}{Color.OFF}{self._progress()}{Misc.ERASE_LINE}',
+                  end='\r', flush=True)
+            # The last redraw shows the final counters
+            if self._stopped.is_set():
+                break
             i += 1
-            time.sleep(0.1)
+            # Sleeps until something is reported, then leaves the reports of the next 1/rate seconds for one redraw
+            self._changed.wait(IDLE_INTERVAL)
+            self._changed.clear()
+            self._stopped.wait(1 / self.rate)
+
+    def update(self, counts):
+        """Add reported progress to the counters displayed
+
+        :param counts: Dict mapping each counter name ('total', 'probed', 'up' or 'vendors') to its increment
+        """
+        for name, count in counts.items():
+            if name in self.counts:
+                self.counts[name] += count
+        self._changed.set()
 
     def stop(self):
-        """Stop the running animation"""
-        self._loading = False
+        """Stop the running animation, waiting for its last redraw"""
+        self._stopped.set()
+        self._changed.set()
+        if self.is_alive() and self is not threading.current_thread():
+            self.join()
         print(end='\n\n')  # get space after message
-        log.debug(f'LoadingThread stopping: {self!r}')
+        log.debug('LoadingThread stopping: %r', self)
+
+    def _progress(self):
+        counts = self.counts
+        parts = []
+        if counts['total']:
+            parts.append(f'{counts["probed"]}/{counts["total"]} direcciones revisadas')
+        if counts['up']:
+            parts.append(f'{counts["up"]} activos')
+        if counts['vendors'] > 0:
+            parts.append(f'{counts["vendors"]} fabricantes pendientes')
+        return f'  {" · ".join(parts)}' if parts else ''
 
     def __repr__(self):
         class_name = self.__class__.__name__
-        args = [f'{self.msg!r}', f'{self._loading!r}']
+        args = [f'{self.msg!r}', f'{self.rate!r}']
         return f'{class_name}({", ".join(args)})'
@@ -1,41 +1,88 @@
 """logger module
 
 This module exports:
-  - create_logger   function that returns a logger for console and file output
+  - create_logger   function that returns a logger writing to the shared log file
+  - set_level       function that changes the level of a module's logger
+
+All the loggers share a single handler that puts the records on a queue.
+A background thread takes them off the queue and writes them to one rotating file (logs/diamond_defense.log),
+so logging never blocks on disk writes.
+
+Levels are set per module with the DIAMOND_LOG_LEVEL environment variable, a default level optionally
+followed by module=level pairs e.g. DIAMOND_LOG_LEVEL='INFO,scan=DEBUG,block=WARNING'.
+Records below the level of their logger are discarded before their message is formatted.
 """
 
-import logging
+from constants import LOG_BACKUPS, LOG_FILE, LOG_LEVEL, LOG_MAX_BYTES
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+import atexit
+import logging
+import os
+import queue
+import threading
+
+LEVEL_ENV = 'DIAMOND_LOG_LEVEL'
+
+_handler = None
+_levels = None
+_setup_lock = threading.Lock()
 
 
 def create_logger(name):
-    """Create a logger for console and file output
+    """Create a logger that writes to the shared log file
 
     :param name: The name of the module to log
     :return: A logger with the specified name
     """
+    _setup()
+    logger = logging.getLogger(name)
+    logger.setLevel(_levels.get(name, _levels[None]))
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+    return logger
 
-    # Get logger module's dir and create 'logs' directory if it doesn't exist
-    output_dir = Path(__file__).resolve().parent / 'logs'
-    output_dir.mkdir(exist_ok=True)
 
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+def set_level(name, level):
+    """Set the level of the logger of module `name`
+
+    :param name: The name of the module
+    :param level: A logging level e.g. logging.INFO or 'INFO'
+    """
+    logging.getLogger(name).setLevel(level)
 
-    # Create console and file handlers
-    c_handler = logging.StreamHandler()
-    f_handler = logging.FileHandler(output_dir / f'{name}.log')
-    c_handler.setLevel(logging.WARNING)
-    f_handler.setLevel(logging.DEBUG)
 
-    # Set formats
-    c_format = logging.Formatter('%(levelname)s - %(name)s - %(message)s')
-    f_format = logging.Formatter('%(asctime)s - %(levelname)s\t- %(name)s - %(message)s')
-    c_handler.setFormatter(c_format)
-    f_handler.setFormatter(f_format)
+def _setup():
+    global _handler, _levels
+    if _handler is not None:
+        return
+    with _setup_lock:
+        if _handler is not None:
+            return
+        _levels = _parse_levels(os.environ.get(LEVEL_ENV, LOG_LEVEL))
 
-    # Add handlers
-    # logger.addHandler(c_handler)
-    logger.addHandler(f_handler)
+        # Get logger module's dir and create 'logs' directory if it doesn't exist
+        output_dir = Path(__file__).resolve().parent / 'logs'
+        output_dir.mkdir(exist_ok=True)
 
-    return logger
+        f_handler = RotatingFileHandler(output_dir / LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                        encoding='utf-8', delay=True)
+        f_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s\t- %(name)s - %(message)s'))
+
+        records = queue.Queue()
+        listener = QueueListener(records, f_handler, respect_handler_level=True)
+        listener.start()
+        # Flush the pending records on exit
+        atexit.register(listener.stop)
+        _handler = QueueHandler(records)
+
+
+def _parse_levels(spec):
+    # None holds the default level
+    levels = {None: logging.DEBUG}
+    for item in spec.split(','):
+        name, _, level = item.strip().rpartition('=')
+        level = level.strip().upper()
+        if isinstance(logging.getLevelName(level), int):
+            levels[name.strip() or None] = level
+    return levels
@@ -1,22 +1,35 @@
 """mac_vendor module
 
 This module exports:
-  - get_vendor      function that gets the vendor name from a MAC address
+  - get_vendor          function that gets the vendor name from a MAC address
+  - resolve_vendors     function that gets the vendor names of several MAC addresses concurrently
+  - local_vendor        function that gets the vendor name from the OUI index or the cache, without the API
 """
 from logger import create_logger
-from constants import MAC_VENDORS_API
+from check_internet import get_connectivity
+from constants import MAC_VENDORS_API, VENDOR_DEADLINE, VENDOR_TIMEOUT, VENDOR_WORKERS
+from metrics import count, timed
+from oui import block_bits, lookup_vendor, oui_of
 from shutdown import shutdown
 from terminal_control import Color
+from vendor_cache import get_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from http.client import HTTPException
 from urllib.request import urlopen
-from urllib.error import URLError
 
 log = create_logger(__name__)
 
 
-def get_vendor(mac):
+def get_vendor(mac, online=None, timeout=VENDOR_TIMEOUT):
     """Return the vendor name given a `mac` address
 
+    The local OUI index is searched first, then the vendor cache.
+    The MacVendors.co API is only queried as a fallback and its answer is cached.
+
     :param mac: The MAC address to get the vendor from
+    :param online: If True query the API when the vendor is neither in the OUI index nor cached.
+    Default: None (query it if the internet is reachable)
+    :param timeout: The API request timeout in seconds. Default: VENDOR_TIMEOUT
     :return: The vendor name from the given MAC address.
     'Please provide mac address' if the mac parameter is empty.
     'No vendor' if the vendor name could not be found.
@@ -24,14 +37,121 @@ def get_vendor(mac):
     :exception URLError: If there is no connection
     :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
     """
+    vendor = local_vendor(mac)
+    if vendor:
+        return vendor
+    if online is None:
+        online = get_connectivity().online()
+    if not online:
+        log.debug('%s not in OUI index nor cache and online lookup disabled', mac)
+        return 'No vendor'
+
+    vendor = _request_vendor(mac, timeout)
+    get_cache().put(mac, vendor, block_bits(mac))
+    return vendor
+
+
+def resolve_vendors(macs, online=None, timeout=VENDOR_TIMEOUT, deadline=VENDOR_DEADLINE, workers=VENDOR_WORKERS,
+                    on_vendor=None):
+    """Return the vendor names of `macs`, querying the API concurrently for the ones not found locally
+
+    MAC addresses are deduplicated by assignment so each OUI, or MA-M or MA-S block of a split OUI, is requested once.
+    Lookups still running when the `deadline` expires are abandoned and resolve to 'N/A'.
+
+    :param macs: Iterable of MAC addresses
+    :param online: If True query the API for the vendors not found locally.
+    Default: None (query it if the internet is reachable)
+    :param timeout: Timeout in seconds of each API request. Default: VENDOR_TIMEOUT
+    :param deadline: Seconds to wait for all the API requests. Default: VENDOR_DEADLINE
+    :param workers: Maximum concurrent API requests. Default: VENDOR_WORKERS
+    :param on_vendor: Optionally a function called with each MAC address and its vendor as soon as it is known.
+    Default: None
+    :return: Dict mapping each MAC address to its vendor name
+    :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
+    """
+    vendors = {}
+    pending = {}
+
+    def resolved(group, vendor):
+        for m in group:
+            vendors[m] = vendor
+            if on_vendor:
+                on_vendor(m, vendor)
+
+    for mac in macs:
+        if mac in vendors or mac in pending.get(_block(mac), ()):
+            continue
+        vendor = local_vendor(mac)
+        if vendor:
+            resolved([mac], vendor)
+        else:
+            pending.setdefault(_block(mac), []).append(mac)
+
+    if not pending:
+        return vendors
+    if online is None:
+        online = get_connectivity().online()
+    if not online:
+        log.debug('%s OUIs not in OUI index nor cache and online lookup disabled', len(pending))
+        for group in pending.values():
+            resolved(group, 'No vendor')
+        return vendors
+
+    log.debug('Resolving %s OUIs with up to %s workers', len(pending), workers)
+    executor = ThreadPoolExecutor(max_workers=min(workers, len(pending)))
+    futures = {executor.submit(_request_vendor, group[0], timeout): group for group in pending.values()}
+    cache = get_cache()
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            group = futures.pop(future)
+            vendor = future.result()
+            cache.put(group[0], vendor, block_bits(group[0]))
+            resolved(group, vendor)
+    except TimeoutError:
+        log.warning(f'{len(futures)} vendor lookups missed the {deadline} second deadline')
+        for future, group in futures.items():
+            future.cancel()
+            resolved(group, 'N/A')
+    except KeyboardInterrupt:
+        log.debug(f'KeyboardInterrupt on {__name__} module')
+        shutdown()
+    finally:
+        # Don't wait for the abandoned requests, their threads finish on their own timeout
+        executor.shutdown(wait=False)
+    return vendors
+
+
+def local_vendor(mac):
+    """Return the vendor name of `mac` from the OUI index or the vendor cache, or None if neither has it"""
+    vendor = lookup_vendor(mac)
+    if vendor:
+        log.debug('Got vendor %s from OUI index', vendor)
+        count('vendor_lookups', source='oui')
+        return vendor
+    vendor = get_cache().get(mac)
+    if vendor:
+        log.debug('Got vendor %s from cache', vendor)
+    count('vendor_lookups', source='cache' if vendor else 'miss')
+    return vendor
+
+
+def _block(mac):
+    # Invalid MAC addresses have no prefix and get a request of their own
+    return oui_of(mac, block_bits(mac)) or mac
+
+
+def _request_vendor(mac, timeout):
     try:
-        with urlopen(f'{MAC_VENDORS_API}{mac}') as response:
+        with timed('vendor', 'request'), urlopen(f'{MAC_VENDORS_API}{mac}', timeout=timeout) as response:
             vendor = response.read().decode()
-            log.debug(f'Got vendor {vendor}')
+            log.debug('Got vendor %s', vendor)
+            count('vendor_requests', result='ok')
             return vendor
-    except URLError:
+    except (OSError, HTTPException, ValueError) as e:
+        # URLError and timeouts are OSErrors, a dropped connection or a broken answer raise the others
+        count('vendor_requests', result='error')
         print(f'{Color.B_RED}No se pudo obtener el nombre del fabricante{Color.OFF}')
-        log.exception(f'URLError on {__name__} module')
+        log.exception(f'{e.__class__.__name__} on {__name__} module')
         return 'N/A'
     except KeyboardInterrupt:
         log.debug(f'KeyboardInterrupt on {__name__} module')
@@ -0,0 +1,162 @@
+"""metrics module
+
+This module exports:
+  - add_hook        function that registers a function called with every timing recorded
+  - remove_hook     function that unregisters a hook
+  - record          function that records the time a phase took
+  - timed           context manager that records the time spent in its block
+  - summary         function that returns the count, total and maximum seconds of each phase
+  - histograms      function that returns how the timings of each phase are distributed over BUCKETS
+  - count           function that increments a counter
+  - counters        function that returns the value of each counter
+  - gauge           function that sets a gauge
+  - gauges          function that returns the value of each gauge
+  - reset           function that clears the recorded timings, counters and gauges
+
+Timings are keyed by a source (e.g. the scanner backend name) and a phase (e.g. 'spawn', 'probe', 'parse',
+'vendor_resolve'), so backends can be compared phase by phase.
+Counters are keyed by a name and optional labels (e.g. count('vendor_lookups', source='cache')).
+Gauges are keyed the same way and hold the last value set (e.g. gauge('hosts_up', 12, network='10.0.0.0/24')).
+"""
+from logger import create_logger
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+
+log = create_logger(__name__)
+
+# Upper bounds in seconds of the histogram buckets, from a cached vendor lookup to a sweep of a broad network
+BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.5, 1, 2.5, 10, 30, 120)
+
+_hooks = []
+_totals = {}
+_buckets = {}
+_counters = {}
+_gauges = {}
+_lock = threading.Lock()
+
+
+def add_hook(hook):
+    """Register `hook`, called with the source, phase and seconds of every timing recorded
+
+    :param hook: Function taking (source, phase, seconds)
+    """
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Unregister `hook` if it was registered
+
+    :param hook: A function passed to add_hook
+    """
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def record(source, phase, seconds):
+    """Record that `phase` of `source` took `seconds`
+
+    :param source: What was timed e.g. a scanner backend name
+    :param phase: The phase of `source` that was timed
+    :param seconds: The time it took
+    """
+    log.debug('%s %s took %.6f seconds', source, phase, seconds)
+    with _lock:
+        totals = _totals.setdefault((source, phase), [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+        # The last bucket counts the timings above every bound
+        _buckets.setdefault((source, phase), [0] * (len(BUCKETS) + 1))[bisect_left(BUCKETS, seconds)] += 1
+        hooks = list(_hooks)
+    for hook in hooks:
+        hook(source, phase, seconds)
+
+
+@contextmanager
+def timed(source, phase):
+    """Record the time spent in the block as `phase` of `source`, even if it raises
+
+    :param source: What is timed e.g. a scanner backend name
+    :param phase: The phase of `source` that is timed
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(source, phase, time.perf_counter() - start)
+
+
+def summary():
+    """Return a dict mapping each (source, phase) to a dict with its 'count', 'total' and 'max' seconds"""
+    with _lock:
+        return {k: {'count': c, 'total': t, 'max': m} for k, (c, t, m) in _totals.items()}
+
+
+def histograms():
+    """Return a dict mapping each (source, phase) to a dict with its 'count' and 'total' seconds and its 'buckets',
+    the cumulative count of timings up to each bound of BUCKETS
+    """
+    with _lock:
+        totals = {k: (c, t) for k, (c, t, _) in _totals.items()}
+        buckets = {k: list(b) for k, b in _buckets.items()}
+    histograms = {}
+    for key, (c, t) in totals.items():
+        cumulative, running = [], 0
+        for n in buckets[key][:-1]:
+            running += n
+            cumulative.append(running)
+        histograms[key] = {'count': c, 'total': t, 'buckets': cumulative}
+    return histograms
+
+
+def count(name, amount=1, **labels):
+    """Add `amount` to the counter `name` with `labels`
+
+    :param name: The counter name e.g. 'block_packets'
+    :param amount: What to add. Default: 1
+    :param labels: Optionally values that split the counter e.g. engine='arp'
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def counters():
+    """Return a dict mapping each (name, labels) to the value of its counter, labels being a sorted tuple of
+    (label, value) pairs
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def gauge(name, value, **labels):
+    """Set the gauge `name` with `labels` to `value`
+
+    :param name: The gauge name e.g. 'hosts_up'
+    :param value: The current value
+    :param labels: Optionally values that split the gauge e.g. network='10.0.0.0/24'
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = value
+
+
+def gauges():
+    """Return a dict mapping each (name, labels) to the value of its gauge, labels being a sorted tuple of
+    (label, value) pairs
+    """
+    with _lock:
+        return dict(_gauges)
+
+
+def reset():
+    """Clear the recorded timings, counters and gauges, the hooks stay registered"""
+    with _lock:
+        _totals.clear()
+        _buckets.clear()
+        _counters.clear()
+        _gauges.clear()
@@ -0,0 +1,81 @@
+"""netlink module
+
+This module exports:
+  - NetlinkMonitor      class that tells whether the kernel reported a link, address or route change
+
+The kernel multicasts its rtnetlink messages to the sockets subscribed to the link, IPv4 address and IPv4 route
+groups. The messages aren't parsed: any message received since the last check means the interface, gateway or network
+may have changed. Where rtnetlink isn't available (e.g. macOS) every check reports a change.
+"""
+from logger import create_logger
+import socket
+
+log = create_logger(__name__)
+
+# rtnetlink multicast groups, from linux/rtnetlink.h
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+BUFFER_SIZE = 64 * 1024
+
+
+class NetlinkMonitor:
+    """Tell whether the kernel reported a link, address or route change
+
+        The first check always reports a change.
+
+        Public methods:
+          - changed     return True if there was a change since the last check
+          - invalidate  make the next check report a change
+          - close       close the rtnetlink socket
+    """
+    __slots__ = ('_socket', '_changed')
+
+    def __init__(self):
+        """A NetlinkMonitor object subscribed to the rtnetlink link, IPv4 address and IPv4 route groups"""
+        self._changed = True
+        try:
+            self._socket = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            self._socket.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+            self._socket.setblocking(False)
+        except (AttributeError, OSError):
+            # AttributeError where the socket module has no AF_NETLINK
+            log.warning('rtnetlink is not available, the addresses are resolved on every sync')
+            self._socket = None
+        log.debug('NetlinkMonitor created: %r', self)
+
+    def changed(self):
+        """Return True if the kernel reported a change since the last check, or when rtnetlink isn't available
+
+        The messages received are discarded, so a change is only reported once.
+        """
+        if self._socket is None:
+            return True
+        changed = self._changed
+        self._changed = False
+        try:
+            while True:
+                self._socket.recv(BUFFER_SIZE)
+                changed = True
+        except BlockingIOError:
+            pass
+        except OSError:
+            # ENOBUFS: the kernel dropped messages because they weren't read in time
+            log.exception(f'OSError on {__name__} module')
+            changed = True
+        return changed
+
+    def invalidate(self):
+        """Make the next check report a change e.g. when acting on the last change failed"""
+        self._changed = True
+
+    def close(self):
+        """Close the rtnetlink socket, the checks report a change from then on"""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self._socket!r}', f'{self._changed!r}']
+        return f'{class_name}({", ".join(args)})'
@@ -0,0 +1,142 @@
+"""nmap_scan module
+
+This module exports:
+  - nmap_path       function that returns the path of the nmap executable, looked up once per process
+  - nmap_sweep      generator that runs nmap -sn and yields each active host as soon as nmap reports it
+
+nmap writes its XML report to a pipe that is parsed incrementally as it arrives, each <host> element is dropped
+once it is read, so memory stays constant however large the scanned network is.
+"""
+from logger import create_logger
+from metrics import record
+from progress import report
+from ipaddress import ip_network
+from xml.etree.ElementTree import ParseError, XMLPullParser
+import shutil
+import subprocess
+import tempfile
+import time
+
+log = create_logger(__name__)
+
+# Host discovery only (no port scan), XML report to stdout with the progress of the scan every second
+NMAP_ARGUMENTS = ('-sn', '-oX', '-', '--stats-every', '1s')
+CHUNK_SIZE = 64 * 1024
+
+_path = None
+
+
+def nmap_path():
+    """Return the path of the nmap executable, looking it up in the PATH only the first time
+
+    :exception FileNotFoundError: If nmap is not found in the PATH
+    """
+    global _path
+    if _path is None:
+        _path = shutil.which('nmap')
+        if _path is None:
+            raise FileNotFoundError('nmap')
+        log.debug('nmap found at %s', _path)
+    return _path
+
+
+def nmap_sweep(ip, interface=None):
+    """Run nmap -sn on `ip` and yield each active host as soon as nmap reports it
+
+    The spawn, probe and parse times are recorded with the metrics module under 'nmap'.
+    The addresses probed are reported with the progress module as nmap reports its progress.
+    nmap is killed if the generator is closed before it finishes.
+
+    :param ip: String specifying nmap targets e.g. 'scanme.nmap.org', '198.116.0-255.1-127', '216.163.128.20/20'
+    or several separated by spaces
+    :param interface: The interface to send packets from. Default: None (chosen by nmap)
+    :return: Generator of (ip, mac, vendor, hostname, latency) tuples, vendor being None when nmap doesn't know it
+    and latency None when nmap doesn't report it
+    :exception FileNotFoundError: If nmap is not found in the PATH
+    :exception CalledProcessError: If nmap exits with an error
+    """
+    args = [nmap_path(), *NMAP_ARGUMENTS, *(('-e', interface) if interface else ()), *ip.split()]
+    log.debug('Running %s', args)
+    parsing = 0.0
+    total = _count_addresses(ip)
+    probed = 0
+    if total:
+        report(total=total)
+    with tempfile.TemporaryFile() as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=errors)
+        record('nmap', 'spawn', time.perf_counter() - start)
+        try:
+            # read1 returns whatever nmap wrote so far, iterparse would wait for full 16 KiB reads
+            parser = XMLPullParser(events=('start', 'end'))
+            root = None
+            for chunk in iter(lambda: process.stdout.read1(CHUNK_SIZE), b''):
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if root is None:
+                        root = element
+                    if event != 'end':
+                        continue
+                    if element.tag in ('taskprogress', 'hosts'):
+                        count = _probed(element, total)
+                        if count is not None:
+                            # The total is only known from the final count when the targets couldn't be counted
+                            report(total=0 if total else count, probed=count - probed)
+                            total, probed = total or count, count
+                    if element.tag != 'host':
+                        continue
+                    parse_start = time.perf_counter()
+                    host = _parse_host(element)
+                    # Drop the hosts already read, the root keeps every element otherwise
+                    root.clear()
+                    parsing += time.perf_counter() - parse_start
+                    if host:
+                        yield host
+            parser.close()
+        except ParseError:
+            # nmap failed before completing its report, its exit status tells why
+            log.exception(f'ParseError on {__name__} module')
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+            record('nmap', 'probe', time.perf_counter() - start - parsing)
+            record('nmap', 'parse', parsing)
+        if process.returncode:
+            errors.seek(0)
+            raise subprocess.CalledProcessError(process.returncode, args, stderr=errors.read().decode().strip())
+
+
+def _count_addresses(ip):
+    # None when some target isn't an address or a network e.g. a hostname or an octet range
+    try:
+        return sum(ip_network(t, strict=False).num_addresses for t in ip.split())
+    except ValueError:
+        return None
+
+
+def _probed(element, total):
+    # <taskprogress> of the ping scan tells the percentage done, <runstats><hosts> the final count
+    if element.tag == 'hosts':
+        return int(element.get('total', 0)) or None
+    if total and 'Ping Scan' in element.get('task', ''):
+        return int(total * float(element.get('percent', 0)) / 100)
+    return None
+
+
+def _parse_host(element):
+    status = element.find('status')
+    if status is None or status.get('state') != 'up':
+        return None
+    addresses = {a.get('addrtype'): a for a in element.iter('address')}
+    if 'mac' not in addresses or 'ipv4' not in addresses:
+        log.debug('%s is up without MAC address. Localhost response.', addresses)
+        return None
+    mac = addresses['mac'].get('addr')
+    hostname = element.find('hostnames/hostname')
+    times = element.find('times')
+    latency = int(times.get('srtt')) / 1e6 if times is not None and times.get('srtt') else None
+    log.debug('%s is up', addresses['ipv4'].get('addr'))
+    return (addresses['ipv4'].get('addr'), mac, addresses['mac'].get('vendor'),
+            hostname.get('name') if hostname is not None else 'N/A', latency)
@@ -4,6 +4,7 @@ This module exports:
   - non_interactive     function that enters Diamond Defense on non-interactive mode
 """
 from logger import create_logger
+from backends import ScanError
 from display_block import display_block
 from loading_animation import animate
 from scan import scan
@@ -19,14 +20,13 @@ def non_interactive(addresses, packets, ips):
 
     Validate the given ips.
     Display interface, gateway ip and target ips.
-    Check if the target ips are active.
-    Start blocking.
+    Check if the target ips are active, the ones that aren't are skipped.
+    Start blocking, or exit if none of them is active.
 
     :param addresses: An Addresses object
     :param packets: Packets to send per minute
     :param ips: The target IPs to block
     :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
-    :exception IndexError: If the scan's list of hosts is empty because the specified IP is not active
     """
     log.debug('Validating ips')
     _validate(ips)
@@ -36,7 +36,7 @@ def non_interactive(addresses, packets, ips):
     print(f'\n{Color.B_CYAN}Bloquear dispositivos (modo no interactivo) {Color.B_GREEN}seleccionado...{Color.OFF}')
 
     log.debug('Checking status of target ips')
-    targets = _check_status(ips)
+    targets = _check_status(ips, addresses)
 
     if targets:
         display_block(targets, addresses, packets)
@@ -64,12 +64,19 @@ def _display_info(addresses, targets):
 
 
 @animate(msg=f'{Color.B_YELLOW}Revisando el estado de los objetivos, espera un momento...')
-def _check_status(ips):
+def _check_status(ips, addresses):
+    # A single discovery pass for all the targets, its hosts are then matched back to each IP
+    try:
+        hosts = {h.ip: h for h in scan(' '.join(ips), addresses.engine, addresses.interface.name)}
+    except ScanError as e:
+        print(f'{Color.B_RED}{e}{Color.OFF}')
+        log.exception(f'ScanError on {__name__} module')
+        shutdown(True)
     targets = []
-    for ip in ips:
+    for ip in dict.fromkeys(ips):
         try:
-            targets.append(scan(ip)[0])
-        except IndexError:
+            targets.append(hosts[ip])
+        except KeyError:
             print(f'{Color.B_RED}El objetivo {ip} no parece estar activo. Omitiendo...{Color.OFF}')
             log.error(f'Not active: {ip}')
     return targets
@@ -0,0 +1,338 @@
+"""oui module
+
+This module exports:
+  - INDEX_PATH      default location of the local OUI index file
+  - REGISTRIES      URLs of the IEEE registry CSV files the index is built from
+  - OuiIndex        class that resolves MAC addresses to vendors with a longest-prefix match
+  - mac_to_int      function that converts a MAC address to a 48 bit int
+  - oui_of          function that returns the 24 bit OUI (or a longer prefix) of a MAC address as an hex string
+  - parse_csv       function that reads the entries of an IEEE registry CSV file (MA-L, MA-M or MA-S)
+  - download_registries   function that downloads the IEEE registry CSV files
+  - build_index     function that rebuilds the local OUI index file from IEEE registry CSV files
+  - load_index      function that loads an OuiIndex from the local OUI index file
+  - lookup_vendor   function that returns the vendor of a MAC address from the local OUI index
+  - block_bits      function that returns the prefix length of the assignment a MAC address belongs to
+
+The index is not shipped with the program: the registries take a few MB and change every week.
+Build it once after installing, and again to pick up new assignments, by downloading the registries with:
+    python3 oui.py --download
+or from IEEE registry files (oui.csv, mam.csv, oui36.csv) already at hand, e.g. on an air-gapped machine, with:
+    python3 oui.py oui.csv mam.csv oui36.csv
+Until it is built every vendor missing from the cache is looked up online.
+"""
+
+from logger import create_logger
+from shutdown import shutdown
+from terminal_control import Color
+from argparse import ArgumentParser
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from urllib.request import Request, urlopen
+import csv
+import tempfile
+import threading
+
+log = create_logger(__name__)
+
+INDEX_PATH = Path(__file__).resolve().parent / 'data' / 'oui.tsv'
+REGISTRIES = ('https://standards-oui.ieee.org/oui/oui.csv',
+              'https://standards-oui.ieee.org/oui28/mam.csv',
+              'https://standards-oui.ieee.org/oui36/oui36.csv')
+
+# MA-S (36 bits), MA-M (28 bits) and MA-L (24 bits) assignments. Most specific first for the longest prefix match
+PREFIX_LENGTHS = (36, 28, 24)
+MAC_BITS = 48
+# Holder of the MA-L assignments the IEEE splits into MA-M and MA-S assignments of other vendors
+REGISTRATION_AUTHORITY = 'IEEE Registration Authority'
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class OuiIndex:
+    """Resolve MAC addresses to vendors with a longest-prefix match over the IEEE assignments
+
+        Prefixes are kept in sorted arrays (one per prefix length) and searched with bisection.
+        Vendor names are deduplicated and referenced by position.
+
+        Public methods:
+          - lookup      return the vendor of a MAC address or None if it is not assigned
+          - block_bits  return the prefix length of the assignment a MAC address belongs to
+          - entries     yield the (bits, prefix, vendor) entries of the index
+    """
+    __slots__ = ('_prefixes', '_vendor_ids', '_vendors')
+
+    def __init__(self, entries=()):
+        """An OuiIndex object built from `entries`
+
+        :param entries: Iterable of (bits, prefix, vendor) tuples, prefix being an int of `bits` length
+        :exception ValueError: If an entry has a prefix length other than 24, 28 or 36 bits
+        """
+        rows = {bits: {} for bits in PREFIX_LENGTHS}
+        vendor_ids = {}
+        for bits, prefix, vendor in entries:
+            if bits not in rows:
+                raise ValueError(f'Invalid prefix length: {bits}')
+            rows[bits][prefix] = vendor_ids.setdefault(vendor, len(vendor_ids))
+
+        self._vendors = tuple(vendor_ids)
+        self._prefixes = {}
+        self._vendor_ids = {}
+        for bits, table in rows.items():
+            prefixes = sorted(table)
+            self._prefixes[bits] = array('Q', prefixes)
+            self._vendor_ids[bits] = array('I', (table[p] for p in prefixes))
+
+    def lookup(self, mac):
+        """Return the vendor of `mac` or None if it is not in the index
+
+        :param mac: The MAC address e.g. '08:74:02:00:00:00', '08-74-02-00-00-00' or '0874.0200.0000'
+        :return: The vendor name of the most specific assignment containing `mac`
+        """
+        value = mac_to_int(mac)
+        if value is None:
+            return None
+
+        for bits in PREFIX_LENGTHS:
+            prefixes = self._prefixes[bits]
+            key = value >> (MAC_BITS - bits)
+            i = bisect_left(prefixes, key)
+            if i < len(prefixes) and prefixes[i] == key:
+                return self._vendors[self._vendor_ids[bits][i]]
+        return None
+
+    def block_bits(self, mac):
+        """Return the prefix length of the assignment containing `mac`, as far as the index knows
+
+        Only the OUIs the index knows to be split into MA-M or MA-S assignments, which may belong to different
+        vendors, are taken as more specific than the OUI. Any other MAC address, including those of OUIs missing
+        from the index or from an index that was never built, is taken as part of a MA-L assignment.
+
+        :param mac: The MAC address
+        :return: 36 if its OUI is split into MA-S assignments or held by the IEEE Registration Authority.
+        28 if it is split into MA-M assignments only. 24 otherwise, or if `mac` is not valid
+        """
+        value = mac_to_int(mac)
+        if value is None:
+            return 24
+
+        oui = value >> (MAC_BITS - 24)
+        if self._within(36, oui):
+            return 36
+        if self._within(28, oui):
+            return 28
+        prefixes = self._prefixes[24]
+        i = bisect_left(prefixes, oui)
+        if i < len(prefixes) and prefixes[i] == oui \
+                and self._vendors[self._vendor_ids[24][i]] == REGISTRATION_AUTHORITY:
+            return 36
+        return 24
+
+    def entries(self):
+        """Yield the (bits, prefix, vendor) tuples of the index sorted by prefix length and prefix"""
+        for bits in sorted(PREFIX_LENGTHS):
+            for prefix, vendor_id in zip(self._prefixes[bits], self._vendor_ids[bits]):
+                yield bits, prefix, self._vendors[vendor_id]
+
+    def _within(self, bits, oui):
+        # Whether there is any `bits` long prefix inside `oui`
+        prefixes = self._prefixes[bits]
+        shift = bits - 24
+        i = bisect_left(prefixes, oui << shift)
+        return i < len(prefixes) and prefixes[i] >> shift == oui
+
+    def __len__(self):
+        return sum(len(p) for p in self._prefixes.values())
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{bits}: {len(self._prefixes[bits])}' for bits in PREFIX_LENGTHS]
+        return f'{class_name}({", ".join(args)})'
+
+
+def mac_to_int(mac):
+    """Return `mac` as a 48 bit int or None if it is not a valid MAC address
+
+    :param mac: The MAC address with ':', '-' or '.' separators, or none at all
+    """
+    digits = mac.replace(':', '').replace('-', '').replace('.', '') if mac else ''
+    if len(digits) != MAC_BITS // 4:
+        return None
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return None
+
+
+def oui_of(mac, bits=24):
+    """Return the first `bits` bits of `mac` as an hex string or None if it is not a valid MAC address
+
+    :param mac: The MAC address with ':', '-' or '.' separators, or none at all
+    :param bits: The prefix length, 24 (6 digits, the OUI), 28 (7 digits) or 36 (9 digits). Default: 24
+    """
+    value = mac_to_int(mac)
+    return None if value is None else f'{value >> (MAC_BITS - bits):0{bits // 4}X}'
+
+
+def parse_csv(path):
+    """Yield the (bits, prefix, vendor) entries of an IEEE registry CSV file
+
+    The file has the 'Registry,Assignment,Organization Name,Organization Address' columns.
+    The prefix length is given by the assignment (6, 7 or 9 hex digits).
+
+    :param path: Path of the CSV file
+    :exception OSError: If the file can't be read
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            assignment = (row.get('Assignment') or '').strip()
+            vendor = (row.get('Organization Name') or '').strip()
+            bits = len(assignment) * 4
+            if bits not in PREFIX_LENGTHS or not vendor:
+                log.debug('Skipping row: %r', row)
+                continue
+            try:
+                yield bits, int(assignment, 16), vendor
+            except ValueError:
+                log.debug('Skipping row: %r', row)
+
+
+def download_registries(directory, urls=REGISTRIES, timeout=60):
+    """Download the IEEE registry CSV files to `directory`
+
+    :param directory: Directory to write the files to
+    :param urls: URLs of the files. Default: REGISTRIES
+    :param timeout: Timeout in seconds of each download. Default: 60
+    :return: List of the paths written
+    :exception OSError: If a file can't be downloaded or written
+    """
+    paths = []
+    for url in urls:
+        path = Path(directory) / url.rsplit('/', 1)[-1]
+        log.debug('Downloading %s to %s', url, path)
+        # The IEEE server refuses requests without a user agent
+        with urlopen(Request(url, headers={'User-Agent': 'Mozilla/5.0'}), timeout=timeout) as response, \
+                open(path, 'wb') as file:
+            while True:
+                chunk = response.read(1 << 16)
+                if not chunk:
+                    break
+                file.write(chunk)
+        paths.append(path)
+    return paths
+
+
+def build_index(csv_paths, index_path=INDEX_PATH):
+    """Rebuild the local OUI index file from IEEE registry CSV files
+
+    :param csv_paths: Paths of the registry CSV files (oui.csv, mam.csv, oui36.csv)
+    :param index_path: Path of the index file to write. Default: INDEX_PATH
+    :return: The new OuiIndex
+    :exception OSError: If a CSV file can't be read or the index file can't be written
+    """
+    global _index
+    entries = []
+    for path in csv_paths:
+        log.debug('Parsing %s', path)
+        entries.extend(parse_csv(path))
+    index = OuiIndex(entries)
+
+    # Write to a temporary file first so a running lookup never reads a partial index
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        for bits, prefix, vendor in index.entries():
+            file.write(f'{prefix:0{bits // 4}X}\t{vendor}\n')
+    tmp_path.replace(index_path)
+    log.debug('Index written to %s: %r', index_path, index)
+
+    if index_path == INDEX_PATH:
+        _index = index
+    return index
+
+
+def load_index(index_path=INDEX_PATH):
+    """Load an OuiIndex from the local OUI index file
+
+    Each line of the file is an hex prefix (6, 7 or 9 digits) and a vendor name separated by a tab.
+    Lines that aren't are skipped.
+
+    :param index_path: Path of the index file. Default: INDEX_PATH
+    :return: The loaded OuiIndex. An empty one if the file does not exist
+    """
+    try:
+        with open(index_path, encoding='utf-8') as file:
+            entries = []
+            for line in file:
+                prefix, _, vendor = line.rstrip('\n').partition('\t')
+                bits = len(prefix) * 4
+                if bits not in PREFIX_LENGTHS or not vendor:
+                    log.debug('Skipping line: %r', line)
+                    continue
+                try:
+                    entries.append((bits, int(prefix, 16), vendor))
+                except ValueError:
+                    log.debug('Skipping line: %r', line)
+    except FileNotFoundError:
+        print(f'{Color.B_YELLOW}Índice OUI no encontrado, los fabricantes se buscarán en línea. '
+              f'Genéralo con: {Color.WHITE}python3 oui.py --download{Color.OFF}')
+        log.warning(f'OUI index not found: {index_path}')
+        return OuiIndex()
+    index = OuiIndex(entries)
+    log.debug('Index loaded from %s: %r', index_path, index)
+    return index
+
+
+def lookup_vendor(mac):
+    """Return the vendor of `mac` from the local OUI index, loading the index on first use
+
+    :param mac: The MAC address to get the vendor from
+    :return: The vendor name or None if it is not in the index
+    """
+    return _get_index().lookup(mac)
+
+
+def block_bits(mac):
+    """Return the prefix length of the assignment `mac` belongs to from the local OUI index,
+    loading the index on first use. See OuiIndex.block_bits
+
+    :param mac: The MAC address
+    :return: 24, 28 or 36
+    """
+    return _get_index().block_bits(mac)
+
+
+def _get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_index()
+    return _index
+
+
+def _add_args():
+    parser = ArgumentParser(description='Rebuild the local OUI index from the IEEE registry CSV files')
+    parser.add_argument('csv', nargs='*', help='registry CSV files (oui.csv, mam.csv, oui36.csv)')
+    parser.add_argument('-d', '--download', action='store_true', help='download the registry CSV files from IEEE')
+    parser.add_argument('-o', '--output', default=INDEX_PATH, help=f'index file to write (default: {INDEX_PATH})')
+    args = parser.parse_args()
+    if not args.csv and not args.download:
+        parser.error('give the registry CSV files or --download')
+    return args
+
+
+if __name__ == '__main__':
+    args = _add_args()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            registries = download_registries(directory) if args.download else []
+            new_index = build_index(list(args.csv) + registries, args.output)
+    except OSError as e:
+        print(f'{Color.B_RED}No se pudo generar el índice OUI: {e}{Color.OFF}')
+        log.exception(f'OSError on {__name__} module')
+        shutdown(True)
+    else:
+        print(f'{Color.B_GREEN}Índice OUI generado con {len(new_index)} prefijos{Color.OFF}')
@@ -0,0 +1,129 @@
+"""output module
+
+This module exports:
+  - FIELDS          names of the fields written for each host
+  - HostWriter      base class for the writers that stream hosts in a machine readable format
+  - JsonWriter      HostWriter subclass that writes a JSON array
+  - NdjsonWriter    HostWriter subclass that writes one JSON object per line
+  - CsvWriter       HostWriter subclass that writes CSV rows with a header
+  - create_writer   function that returns the writer of a given format
+  - host_dict       function that returns the fields of a host as a dict
+"""
+from logger import create_logger
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+import csv
+import json
+import sys
+
+log = create_logger(__name__)
+
+FIELDS = ('ip', 'mac', 'vendor', 'hostname', 'latency', 'first_seen', 'last_seen')
+
+
+class HostWriter(ABC):
+    """Base class for the writers that stream hosts in a machine readable format
+
+        Each host is flushed as soon as it is written so consumers get it right away.
+        Subclasses implement _write, which writes the dict of FIELDS of a host.
+
+        Public methods:
+          - write       write a host
+          - close       finish the output
+    """
+    __slots__ = ('stream',)
+
+    def __init__(self, stream=None):
+        """A HostWriter object writing to `stream`
+
+        :param stream: A text stream. Default: None (sys.stdout)
+        """
+        self.stream = stream or sys.stdout
+
+    def write(self, host, latency=None, first_seen=None, last_seen=None):
+        """Write `host`
+
+        :param host: A Host object
+        :param latency: Seconds the host took to answer or None if unknown. Default: None
+        :param first_seen: When the host was first seen, in seconds since the epoch. Default: None
+        :param last_seen: When the host was last seen, in seconds since the epoch. Default: None
+        """
+        self._write(host_dict(host, latency, first_seen, last_seen))
+        self.stream.flush()
+
+    def close(self):
+        """Finish the output"""
+        self.stream.flush()
+
+    @abstractmethod
+    def _write(self, record):
+        pass
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        return f'{class_name}({self.stream!r})'
+
+
+class NdjsonWriter(HostWriter):
+    """HostWriter subclass that writes one JSON object per line"""
+    __slots__ = ()
+
+    def _write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+
+
+class JsonWriter(HostWriter):
+    """HostWriter subclass that writes a JSON array, one object per line"""
+    __slots__ = ('_count',)
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self._count = 0
+
+    def _write(self, record):
+        self.stream.write(('[\n' if not self._count else ',\n') + json.dumps(record))
+        self._count += 1
+
+    def close(self):
+        """Close the array"""
+        self.stream.write('\n]\n' if self._count else '[]\n')
+        super().close()
+
+
+class CsvWriter(HostWriter):
+    """HostWriter subclass that writes CSV rows after a header row"""
+    __slots__ = ('_writer',)
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self._writer = csv.DictWriter(self.stream, FIELDS)
+        self._writer.writeheader()
+
+    def _write(self, record):
+        self._writer.writerow(record)
+
+
+WRITERS = {'json': JsonWriter, 'ndjson': NdjsonWriter, 'csv': CsvWriter}
+
+
+def create_writer(output_format, stream=None):
+    """Return the writer for `output_format`
+
+    :param output_format: One of OUTPUT_FORMATS ('json', 'ndjson' or 'csv')
+    :param stream: A text stream. Default: None (sys.stdout)
+    :exception KeyError: If the format is not known
+    """
+    writer = WRITERS[output_format](stream)
+    log.debug('Writer created: %r', writer)
+    return writer
+
+
+def host_dict(host, latency=None, first_seen=None, last_seen=None):
+    """Return a dict with the FIELDS of `host`, timestamps in ISO 8601 (UTC)"""
+    return {'ip': host.ip, 'mac': host.mac, 'vendor': host.vendor, 'hostname': host.hostname,
+            'latency': None if latency is None else round(latency, 6),
+            'first_seen': _iso(first_seen), 'last_seen': _iso(last_seen)}
+
+
+def _iso(timestamp):
+    return None if timestamp is None else datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
@@ -0,0 +1,134 @@
+"""passive module
+
+This module exports:
+  - PassiveMonitor      threading.Thread subclass that feeds a HostStateStore from sniffed ARP, DHCP and mDNS traffic
+"""
+from logger import create_logger
+from host_state import target_networks
+from scan import Host
+from ipaddress import ip_address
+import threading
+from kamene.layers.dhcp import BOOTP, DHCP
+from kamene.layers.dns import DNS
+from kamene.layers.inet import IP
+from kamene.layers.l2 import ARP, Ether
+from kamene.error import Kamene_Exception
+from kamene.sendrecv import sniff
+# noinspection PyUnresolvedReferences
+from kamene import route
+
+log = create_logger(__name__)
+
+# ARP, DHCP (server and client ports) and mDNS
+BPF_FILTER = 'arp or (udp and (port 67 or port 68 or port 5353))'
+UNSPECIFIED = '0.0.0.0'
+DNS_TYPE_A = 1
+# Seconds to wait before sniffing again after the interface fails, e.g. while it is down
+RETRY_DELAY = 5
+
+
+class PassiveMonitor(threading.Thread):
+    """threading.Thread subclass that records the hosts seen in sniffed ARP, DHCP and mDNS traffic
+
+        Hosts are recorded in a HostStateStore under the current network of an Addresses object,
+        so they don't go stale and don't need to be probed on rescans.
+        Frames sent from our own interface (e.g. the spoofed replies while blocking) are ignored.
+        If sniffing fails, e.g. the interface goes down, it is retried every RETRY_DELAY seconds.
+
+        Public methods:
+          - run         overridden from threading.Thread to sniff the traffic
+          - stop        stop sniffing
+          - observe     record that a host was seen
+    """
+    __slots__ = ('addresses', 'store', '_stopping')
+
+    def __init__(self, addresses, store):
+        """A PassiveMonitor object (daemon thread) sniffing on the interface of `addresses`
+
+        :param addresses: An Addresses object
+        :param store: The HostStateStore to record the hosts in
+        """
+        super().__init__()
+        self.daemon = True
+        self.addresses = addresses
+        self.store = store
+        self._stopping = threading.Event()
+        log.debug('PassiveMonitor created: %r', self)
+
+    def run(self):
+        """Overridden from threading.Thread to sniff the traffic until stopped"""
+        log.debug('PassiveMonitor running: %r', self)
+        while not self._stopping.is_set():
+            try:
+                # Short sniffing rounds so a quiet network doesn't keep the thread from stopping
+                sniff(iface=self.addresses.interface.name, filter=BPF_FILTER, prn=self._on_packet, store=False,
+                      timeout=1)
+            except (OSError, Kamene_Exception) as e:
+                # The hosts recorded so far go stale in the store until sniffing works again
+                log.exception(f'{e.__class__.__name__} on {__name__} module')
+                self._stopping.wait(RETRY_DELAY)
+
+    def stop(self):
+        """Stop sniffing"""
+        self._stopping.set()
+        log.debug('PassiveMonitor stopping: %r', self)
+
+    def observe(self, ip, mac, hostname=None):
+        """Record that `ip` was seen at `mac` if it belongs to the current network (or addresses, as scan targets)
+
+        :param ip: The host IP address
+        :param mac: The host MAC address
+        :param hostname: The hostname if known. Default: None
+        """
+        cidr = self.addresses.network.cidr
+        if ip == UNSPECIFIED or not cidr or not any(ip_address(ip) in n for n in target_networks(cidr)):
+            return
+        self.store.see(cidr, Host(ip, mac.upper(), None, hostname or 'N/A'))
+
+    def _on_packet(self, packet):
+        # A packet that can't be parsed must not end the sniffing thread
+        try:
+            self._handle_packet(packet)
+        except Exception:
+            log.exception(f'Could not handle packet {packet!r}')
+
+    def _handle_packet(self, packet):
+        # The backend's own monitor only knows the interface name
+        mine = getattr(self.addresses.interface, 'mac', None)
+        if mine and Ether in packet and packet[Ether].src.lower() == mine.lower():
+            return
+        if ARP in packet:
+            arp = packet[ARP]
+            if mine and arp.hwsrc.lower() == mine.lower():
+                return
+            self.observe(arp.psrc, arp.hwsrc)
+        elif DHCP in packet:
+            self._handle_dhcp(packet)
+        elif DNS in packet and IP in packet:
+            self._handle_mdns(packet)
+
+    def _handle_dhcp(self, packet):
+        bootp = packet[BOOTP]
+        options = dict(o for o in packet[DHCP].options if isinstance(o, tuple) and len(o) == 2)
+        # Client hardware address is the first 6 bytes of chaddr
+        mac = ':'.join(f'{b:02x}' for b in bytes(bootp.chaddr)[:6])
+        ip = bootp.yiaddr if bootp.yiaddr != UNSPECIFIED else options.get('requested_addr', bootp.ciaddr)
+        hostname = options.get('hostname')
+        if isinstance(hostname, bytes):
+            hostname = hostname.decode(errors='replace')
+        self.observe(ip, mac, hostname)
+
+    def _handle_mdns(self, packet):
+        dns = packet[DNS]
+        for i in range(dns.ancount):
+            answer = dns.an[i]
+            if answer.type == DNS_TYPE_A and answer.rdata == packet[IP].src:
+                name = answer.rrname
+                if isinstance(name, bytes):
+                    name = name.decode(errors='replace')
+                self.observe(packet[IP].src, packet[Ether].src, name.rstrip('.'))
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.addresses.interface.name!r}', f'{self.store!r}']
+        return f'{class_name}({", ".join(args)})'
@@ -0,0 +1,124 @@
+"""profiling module
+
+This module exports:
+  - PROFILE_DIR     default directory of the profile dumps
+  - Profiler        class that collects the phase timings of a run and displays and dumps them when it stops
+
+The phases are the timings recorded with the metrics module (e.g. 'diamond heal', 'addresses sync',
+'nmap probe', 'vendor request'). While a Profiler runs each timing also becomes a Chrome trace event, to be opened
+with chrome://tracing or https://ui.perfetto.dev, and cProfile optionally profiles the thread that started it.
+Without a Profiler the phases only cost their timers.
+"""
+from logger import create_logger
+from metrics import add_hook, remove_hook, summary
+from terminal_control import Color
+from pathlib import Path
+import json
+import os
+import sys
+import threading
+import time
+
+log = create_logger(__name__)
+
+PROFILE_DIR = Path(__file__).resolve().parent / 'logs'
+
+
+class Profiler:
+    """Collect the phase timings of a run and display and dump them when it stops
+
+        Public methods:
+          - start       start collecting
+          - stop        stop collecting, display the breakdown of the phases and write the dumps
+          - breakdown   return the lines of the breakdown of the phases
+    """
+    __slots__ = ('kinds', 'directory', '_start', '_events', '_profile', '_lock')
+
+    def __init__(self, kinds=(), directory=PROFILE_DIR):
+        """A Profiler object
+
+        :param kinds: Dumps to write besides the breakdown, any of PROFILE_KINDS ('cprofile' and 'trace').
+        Default: ()
+        :param directory: Directory to write the dumps to. Default: PROFILE_DIR
+        """
+        self.kinds = tuple(kinds)
+        self.directory = Path(directory)
+        self._start = None
+        self._events = []
+        self._profile = None
+        self._lock = threading.Lock()
+        log.debug('Profiler created: %r', self)
+
+    def start(self):
+        """Start collecting the phase timings, and profiling the calling thread with cProfile if requested"""
+        self._start = time.perf_counter()
+        if 'trace' in self.kinds:
+            add_hook(self._trace)
+        if 'cprofile' in self.kinds:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        log.debug('Profiler started: %r', self)
+
+    def stop(self):
+        """Stop collecting, display the breakdown of the phases on stderr and write the requested dumps
+
+        :return: List of the paths written
+        """
+        if self._start is None:
+            return []
+        remove_hook(self._trace)
+        elapsed = time.perf_counter() - self._start
+        self._start = None
+        if self._profile is not None:
+            self._profile.disable()
+
+        print('\n'.join(self.breakdown(elapsed)), file=sys.stderr)
+        paths = []
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            if self._profile is not None:
+                paths.append(self.directory / f'profile-{stamp}.pstats')
+                self._profile.dump_stats(str(paths[-1]))
+            if 'trace' in self.kinds:
+                paths.append(self.directory / f'trace-{stamp}.json')
+                with self._lock, open(paths[-1], 'w') as f:
+                    json.dump({'traceEvents': self._events, 'displayTimeUnit': 'ms'}, f)
+        except OSError:
+            print(f'{Color.B_RED}No se pudieron escribir los perfiles en {self.directory}{Color.OFF}', file=sys.stderr)
+            log.exception(f'OSError on {__name__} module')
+        for path in paths:
+            print(f'{Color.CYAN}Perfil escrito en {Color.MAGENTA}{path}{Color.OFF}', file=sys.stderr)
+        log.debug('Profiler stopped after %.3f seconds: %s', elapsed, paths)
+        return paths
+
+    def breakdown(self, elapsed=None):
+        """Return the lines of the breakdown of the phases, the slowest first
+
+        :param elapsed: Optionally the seconds the whole run took. Default: None
+        """
+        phases = sorted(summary().items(), key=lambda item: item[1]['total'], reverse=True)
+        lines = [f'\n{"Fase":<32}{"Veces":>7}{"Total (s)":>12}{"Máx (s)":>12}']
+        for (source, phase), timing in phases:
+            name = f'{source} {phase}'
+            lines.append(f'{name:<32}{timing["count"]:>7}{timing["total"]:>12.3f}{timing["max"]:>12.3f}')
+        if elapsed is not None:
+            lines.append(f'{"Total":<32}{"":>7}{elapsed:>12.3f}')
+        return lines
+
+    def _trace(self, source, phase, seconds):
+        # Called when the phase ends, in the thread that ran it. Complete events take microseconds
+        end = time.perf_counter()
+        start = self._start
+        if start is None:
+            return
+        event = {'name': phase, 'cat': source, 'ph': 'X', 'ts': (end - seconds - start) * 1e6,
+                 'dur': seconds * 1e6, 'pid': os.getpid(), 'tid': threading.get_ident()}
+        with self._lock:
+            self._events.append(event)
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.kinds!r}', f'{str(self.directory)!r}']
+        return f'{class_name}({", ".join(args)})'
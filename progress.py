@@ -0,0 +1,42 @@
+"""progress module
+
+This module exports:
+  - report      function that reports progress events of the running operation e.g. addresses probed
+  - listen      context manager that receives the progress events reported by the current thread
+
+Events are counter increments keyed by name: 'total' and 'probed' addresses, 'up' hosts and pending 'vendors'
+lookups (decremented once resolved). A listener only receives the events reported by the thread that registered it,
+so a scan running in the background doesn't feed the progress displayed for another one.
+"""
+from contextlib import contextmanager
+import threading
+
+_listeners = {}
+
+
+def report(**counts):
+    """Report progress of the running operation to the listeners of the current thread
+
+    :param counts: Increment of each counter e.g. probed=1, vendors=-1
+    """
+    listeners = _listeners.get(threading.get_ident())
+    if listeners:
+        for listener in tuple(listeners):
+            listener(counts)
+
+
+@contextmanager
+def listen(listener):
+    """Call `listener` with the counts of every report made by the current thread within the block
+
+    :param listener: Function taking a dict mapping each counter name to its increment
+    """
+    ident = threading.get_ident()
+    _listeners.setdefault(ident, []).append(listener)
+    try:
+        yield
+    finally:
+        listeners = _listeners[ident]
+        listeners.remove(listener)
+        if not listeners:
+            del _listeners[ident]
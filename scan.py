@@ -3,13 +3,18 @@
 This module exports:
   - Host                dataclass containing host ip, mac, vendor and hostname
   - scan                function that returns a list of active hosts
+  - resolve_hosts       function that builds hosts from discovery results, resolving their vendors
 """
 from logger import create_logger
-from mac_vendor import get_vendor
+from backends import get_backend
+from inventory import get_inventory
+from mac_vendor import local_vendor, resolve_vendors
+from metrics import count, gauge, timed
+from progress import report
 from shutdown import shutdown
-from terminal_control import Color
+from contextlib import nullcontext
 from dataclasses import dataclass
-from nmap import nmap, PortScannerError
+from ipaddress import ip_network
 
 log = create_logger(__name__)
 
@@ -24,47 +29,103 @@ class Host:
     __slots__ = ('ip', 'mac', 'vendor', 'hostname')
 
 
-def scan(ip):
-    """Scan `ip` for active hosts with `nmap -sn` (no port scan)
+def scan(ip, engine='nmap', interface=None, on_host=None, store=None):
+    """Scan `ip` for active hosts with the backend of `engine`
 
-    :param ip: String specifying nmap targets e.g. 'scanme.nmap.org', '198.116.0-255.1-127', '216.163.128.20/20'
-    :return: List of active hosts with their respective ip, mac, vendor and hostname
-    :exception KeyError: If 'mac' is not in the 'addresses' dict. This happens with localhost and gets skipped
-    :exception PortScannerError: If nmap is not found in the path
+    :param ip: String specifying the targets e.g. 'scanme.nmap.org', '198.116.0-255.1-127', '216.163.128.20/20'.
+    Engines other than nmap only take a network in CIDR notation or IP addresses separated by spaces
+    :param engine: The discovery engine, one of ENGINES ('nmap', 'arp', 'icmp' or 'passive'). Default: 'nmap'
+    :param interface: The interface to scan from. Default: None
+    :param on_host: Optionally a function called with each Host and its latency in seconds (None if unknown)
+    as soon as it is complete. Default: None
+    :param store: Optionally the HostStateStore a PassiveMonitor feeds, reported by the passive engine instead of
+    sniffing on each scan. Default: None
+    :return: List of active hosts with their respective ip, mac, vendor and hostname.
+    Networks broader than SHARD_PREFIX are split into shards scanned concurrently and deduplicated by MAC address.
+    Hosts are completed as the engine reports them, vendors missing from the OUI index and the cache
+    are resolved concurrently once the scan ends. The hosts are recorded in the host inventory
+    :exception ScanError: If the backend can't scan e.g. nmap is not found in the path. Left to the caller,
+    since scans also run on background threads and in shard processes
     :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
     """
-    log.debug('Scan starting')
-    hosts = []
-    scanner = _get_scanner()
-    if scanner:
-        result_dict = _get_scan_result(scanner, ip)
-        for k, v in result_dict['scan'].items():
-            if v['status']['state'] == 'up':
-                log.debug(f'{v} is up')
-                try:
-                    mac = v['addresses']['mac']
-                except KeyError:
-                    log.debug(f'KeyError on {__name__} module. Localhost response.')
-                    continue
-                ip = v['addresses']['ipv4']
-                vendor = v['vendor'][mac] if v['vendor'] else get_vendor(mac)
-                hostname = v['hostnames'][0]['name'] or 'N/A'
-                hosts.append(Host(ip, mac, vendor, hostname))
-    return hosts
-
-
-def _get_scanner():
+    log.debug('Scan starting with %s engine', engine)
+    backend = get_backend(engine, store)
+    shards = _shards(ip) if backend.active else [ip]
     try:
-        return nmap.PortScanner()
-    except PortScannerError:
-        print(f'{Color.B_RED}No se encontró nmap instalado{Color.OFF}')
-        log.exception(f'PortScannerError on {__name__} module')
-        shutdown(True)
-
-
-def _get_scan_result(scanner, host):
-    try:
-        return scanner.scan(hosts=host, arguments='-sn')
+        if len(shards) > 1:
+            from sharding import sharded_stream
+            found = sharded_stream(engine, shards, interface)
+        else:
+            found = backend.stream(ip, interface)
+        hosts = resolve_hosts(found, on_host, engine)
+        count('scans', engine=engine)
+        count('hosts_found', len(hosts), engine=engine)
+        network = _network(ip)
+        if network:
+            gauge('hosts_up', len(hosts), network=network)
+        get_inventory().record(hosts, network)
+        return hosts
     except KeyboardInterrupt:
         log.debug(f'KeyboardInterrupt on {__name__} module')
         shutdown()
+
+
+def _network(ip):
+    # The network the hosts are recorded under in the inventory, None when scanning single addresses
+    try:
+        network = ip_network(ip, strict=False)
+    except ValueError:
+        return None
+    return str(network) if network.num_addresses > 1 else None
+
+
+def _shards(ip):
+    # Only networks broader than a shard are split, e.g. the /16 of a flat LAN
+    from sharding import split_network
+    return split_network(ip)
+
+
+def resolve_hosts(found, on_host=None, source=None):
+    """Return the Host objects of `found`, resolving the missing vendors concurrently
+
+    `found` is consumed as it is produced: hosts whose vendor is known or found locally are completed right away,
+    the vendors missing after that are looked up online all at once when `found` is exhausted.
+    The hosts up and the vendor lookups pending are reported with the progress module.
+
+    :param found: Iterable of (ip, mac, vendor, hostname, latency) tuples, vendor being None when unknown
+    :param on_host: Optionally a function called with each Host and its latency as soon as its vendor is known.
+    Default: None
+    :param source: Optionally the name to time the online vendor lookups under with the metrics module.
+    Default: None
+    :return: List of Host objects in the same order
+    """
+    order = []
+    hosts = {}
+    waiting = {}
+
+    def complete(entry, vendor):
+        ip, mac, _, hostname, latency = entry
+        hosts[ip] = Host(ip, mac, vendor, hostname)
+        if on_host:
+            on_host(hosts[ip], latency)
+
+    for entry in found:
+        order.append(entry[0])
+        report(up=1)
+        vendor = entry[2] or local_vendor(entry[1])
+        if vendor:
+            complete(entry, vendor)
+        else:
+            if entry[1] not in waiting:
+                report(vendors=1)
+            waiting.setdefault(entry[1], []).append(entry)
+
+    def vendor_known(mac, vendor):
+        report(vendors=-1)
+        for e in waiting[mac]:
+            complete(e, vendor)
+
+    if waiting:
+        with timed(source, 'vendor_resolve') if source else nullcontext():
+            resolve_vendors(waiting, on_vendor=vendor_known)
+    return [hosts[ip] for ip in order]
@@ -0,0 +1,102 @@
+"""sharding module
+
+This module exports:
+  - split_network       function that splits a network into shards of the same prefix length
+  - sharded_stream      generator that scans the shards of a network on a pool of processes
+
+Shards are handed to the pool no faster than SHARD_RATE addresses per second so a broad network
+(e.g. a /16 on a flat LAN) doesn't flood the interface and the switch with probes.
+"""
+from logger import create_logger
+from constants import SHARD_PREFIX, SHARD_RATE, SHARD_WORKERS
+from metrics import record
+from progress import report
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from ipaddress import ip_network
+import os
+import time
+
+log = create_logger(__name__)
+
+
+def split_network(ip, prefix=SHARD_PREFIX):
+    """Split the network `ip` into shards with a `prefix` length
+
+    :param ip: String specifying the targets, only a single network in CIDR notation gets split
+    :param prefix: The prefix length of the shards. Default: SHARD_PREFIX
+    :return: List of shards in CIDR notation, just [ip] if it isn't a network broader than `prefix`
+    """
+    try:
+        network = ip_network(ip, strict=False)
+    except ValueError:
+        return [ip]
+    if network.prefixlen >= prefix:
+        return [ip]
+    return [str(s) for s in network.subnets(new_prefix=prefix)]
+
+
+def sharded_stream(engine, shards, interface=None, workers=SHARD_WORKERS, rate=SHARD_RATE):
+    """Scan `shards` concurrently on a pool of processes and yield the hosts of each shard as it finishes
+
+    Hosts are deduplicated by MAC address, the first IP address found for a MAC address is kept.
+    The addresses of each shard are reported as probed with the progress module when it finishes.
+
+    :param engine: The discovery engine, one of ENGINES
+    :param shards: List of networks in CIDR notation e.g. from split_network
+    :param interface: The interface to scan from. Default: None
+    :param workers: Maximum processes, bounded by the number of cores. Default: SHARD_WORKERS
+    :param rate: Maximum addresses per second handed to the pool. Default: SHARD_RATE
+    :return: Generator of (ip, mac, vendor, hostname, latency) tuples
+    :exception ScanError: If the backend can't scan
+    """
+    workers = max(1, min(workers, os.cpu_count() or 1, len(shards)))
+    queue = deque(ip_network(s) for s in shards)
+    log.debug('Scanning %s shards on %s processes at %s addresses/s', len(shards), workers, rate)
+    seen = set()
+    # Future of each shard being scanned mapped to its number of addresses
+    pending = {}
+    sent = 0
+    start = time.monotonic()
+    report(total=sum(shard.num_addresses for shard in queue))
+    # Imported here so splitting a network doesn't load multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while queue or pending:
+            timeout = None
+            while queue and len(pending) < workers:
+                delay = sent / rate - (time.monotonic() - start)
+                if delay > 0:
+                    timeout = delay
+                    break
+                shard = queue.popleft()
+                pending[executor.submit(_scan_shard, engine, str(shard), interface)] = shard.num_addresses
+                sent += shard.num_addresses
+            if not pending:
+                time.sleep(timeout)
+                continue
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, seconds = future.result()
+                record(engine, 'shard', seconds)
+                report(probed=pending.pop(future))
+                for entry in found:
+                    mac = entry[1].upper()
+                    if mac not in seen:
+                        seen.add(mac)
+                        yield entry
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+    log.debug('Sharded scan finished in %.3f seconds', time.monotonic() - start)
+
+
+def _scan_shard(engine, shard, interface):
+    # Runs on a pool process
+    from backends import get_backend
+    start = time.perf_counter()
+    found = get_backend(engine).discover(shard, interface)
+    return found, time.perf_counter() - start
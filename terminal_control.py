@@ -1,6 +1,7 @@
 """terminal_control module
 
 This module exports:
+  - IS_TTY      Whether stdout is a terminal. Escape sequences are only output when it is
   - Color       Enumeration with ANSI escape sequences that set color screen attributes
   - Misc        Enumeration with ANSI escape sequences that control other screen attributes such as cursor and erasing
 
@@ -49,6 +50,8 @@ Cursor Control
 Erasing Text
     Erase Down      Esc[J
         Erases the screen from the current line down to the bottom of the screen.
+    Erase Line      Esc[K
+        Erases from the cursor to the end of the current line.
 
 More info:
     http://ascii-table.com/ansi-escape-sequences.php
@@ -57,6 +60,9 @@ More info:
 """
 
 from enum import Enum, unique
+import sys
+
+IS_TTY = sys.stdout.isatty()
 
 
 @unique
@@ -78,7 +84,7 @@ class Color(Enum):
     B_WHITE = '\33[1;97m'
 
     def __str__(self):
-        return self.value
+        return self.value if IS_TTY else ''
 
 
 @unique
@@ -88,6 +94,7 @@ class Misc(Enum):
     :raises: AttributeError
     """
     CLEAR = '\033[H\033[J'
+    ERASE_LINE = '\033[K'
 
     def __str__(self):
-        return self.value
+        return self.value if IS_TTY else ''
@@ -0,0 +1,93 @@
+from backends import PassiveCacheBackend, ScanError, get_backend
+from host_state import HostStateStore
+from scan import Host
+from unittest import mock
+import icmp_scan
+import os
+import struct
+import tempfile
+import time
+import unittest
+
+CIDR = '192.168.1.0/24'
+ARP_TABLE = ('IP address       HW type     Flags       HW address            Mask     Device\n'
+             '192.168.1.1      0x1         0x2         aa:bb:cc:00:00:01     *        eth0\n'
+             '192.168.1.20     0x1         0x0         00:00:00:00:00:00     *        eth0\n'
+             '192.168.1.30     0x1         0x6         aa:bb:cc:00:00:30     *        eth0\n')
+
+
+class TestIcmpScan(unittest.TestCase):
+    def test_checksum(self):
+        """
+        Test that echo requests carry the checksum that makes the one's complement sum of the message zero
+        """
+        request = icmp_scan._echo_request(0x1234, 7)
+        self.assertEqual(struct.unpack('!BBHHH', request)[::4], (icmp_scan.ECHO_REQUEST, 7))
+        self.assertEqual(icmp_scan._checksum(request), 0)
+        # Odd lengths are padded with a zero byte
+        self.assertEqual(icmp_scan._checksum(b'\x01'), icmp_scan._checksum(b'\x01\x00'))
+
+    def test_invalid_targets(self):
+        """
+        Test that targets that aren't networks or addresses raise ScanError before any packet is sent
+        """
+        with mock.patch('icmp_scan.socket.socket') as sock, self.assertRaises(ScanError):
+            get_backend('icmp').discover('192.168.1.1 192.168.1.500')
+        sock.assert_not_called()
+
+    def test_arp_table(self):
+        """
+        Test that only the complete entries of the kernel's ARP table are read
+        """
+        path = os.path.join(tempfile.mkdtemp(), 'arp')
+        with open(path, 'w') as f:
+            f.write(ARP_TABLE)
+        with mock.patch.object(icmp_scan, 'ARP_TABLE', path):
+            self.assertEqual(icmp_scan._arp_table(), {'192.168.1.1': 'aa:bb:cc:00:00:01',
+                                                      '192.168.1.30': 'aa:bb:cc:00:00:30'})
+
+
+class TestPassiveCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.store = HostStateStore(stale_after=60)
+        now = time.time()
+        self.store.see(CIDR, Host('192.168.1.10', 'AA:BB:CC:00:00:10', None, 'N/A'), when=now)
+        self.store.see(CIDR, Host('192.168.1.20', 'AA:BB:CC:00:00:20', None, 'phone'), when=now)
+        self.store.see(CIDR, Host('192.168.1.30', 'AA:BB:CC:00:00:30', None, 'N/A'), when=now - 120)
+
+    def test_get_backend(self):
+        """
+        Test that the passive engine gets the store of the session and the other engines ignore it
+        """
+        self.assertIs(get_backend('passive', self.store).store, self.store)
+        self.assertIsNone(get_backend('passive').store)
+        self.assertEqual(get_backend('arp', self.store).name, 'arp')
+
+    def test_store(self):
+        """
+        Test that the fresh hosts of the store within the targets are reported, as a network or several addresses
+        """
+        backend = PassiveCacheBackend(self.store, listen=0)
+        self.assertEqual([h[0] for h in backend.discover(CIDR)], ['192.168.1.10', '192.168.1.20'])
+        self.assertEqual(backend.discover('192.168.1.20 192.168.1.30'),
+                         [('192.168.1.20', 'AA:BB:CC:00:00:20', None, 'phone', None)])
+
+    def test_waits_for_monitor(self):
+        """
+        Test that the monitor is given time to see hosts of targets it knows nothing about
+        """
+        backend = PassiveCacheBackend(self.store, listen=0.2)
+        start = time.monotonic()
+        self.assertEqual(backend.discover('10.0.0.0/24'), [])
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_invalid_targets(self):
+        """
+        Test that targets that aren't networks or addresses raise ScanError
+        """
+        with self.assertRaises(ScanError):
+            PassiveCacheBackend(self.store, listen=0).discover('192.168.1.500')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from backends import ScanError
+from scan import Host
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import mock
+import unittest
+
+if find_spec('kamene'):
+    import block
+
+GATEWAY_IP = '192.168.1.1'
+GATEWAY_MAC = 'AA:BB:CC:00:00:01'
+TARGET = Host('192.168.1.10', 'AA:BB:CC:00:00:10', 'Vendor', 'N/A')
+
+
+@unittest.skipUnless(find_spec('kamene'), 'kamene not installed')
+class TestRestoreConnection(unittest.TestCase):
+    def setUp(self):
+        self.addresses = SimpleNamespace(interface=SimpleNamespace(name='eth0', mac='AA:BB:CC:00:00:FF'),
+                                         gateway=SimpleNamespace(ip=GATEWAY_IP, mac=GATEWAY_MAC))
+        self.sock = mock.Mock()
+        patches = [mock.patch('block.arp_packet', side_effect=lambda mac, *args: ('correction', mac)),
+                   mock.patch('block._arp_probe', return_value='arp probe'),
+                   mock.patch('block._icmp_probe', return_value='icmp probe'),
+                   mock.patch('block._evidence_filter', return_value=''),
+                   mock.patch('block.conf', L2socket=mock.Mock(return_value=self.sock)),
+                   mock.patch('block.sniff', return_value=[])]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_gateway_check_fails(self):
+        """
+        Test that the corrections are sent with the known gateway MAC when asking the gateway fails
+        """
+        for error in (OSError('Network is down'), ScanError('No se pudo escanear')):
+            with self.subTest(error=error):
+                self.sock.reset_mock()
+                backend = mock.Mock(**{'discover.side_effect': error})
+                with mock.patch('block.get_backend', return_value=backend):
+                    unrestored = block.restore_connection([TARGET], self.addresses, seconds=0.1, delay=0)
+                self.assertEqual(unrestored, [TARGET])
+                self.assertIn(mock.call(('correction', GATEWAY_MAC)), self.sock.send.call_args_list)
+                self.assertEqual(self.addresses.gateway.mac, GATEWAY_MAC)
+
+    def test_gateway_moved(self):
+        """
+        Test that the corrections carry the MAC the gateway answers with
+        """
+        backend = mock.Mock(**{'discover.return_value': [(GATEWAY_IP, 'AA:BB:CC:00:00:02', None, 'N/A', 0.01)]})
+        with mock.patch('block.get_backend', return_value=backend):
+            block.restore_connection([TARGET], self.addresses, seconds=0.1, delay=0)
+        self.assertIn(mock.call(('correction', 'AA:BB:CC:00:00:02')), self.sock.send.call_args_list)
+        self.assertEqual(self.addresses.gateway.mac, 'AA:BB:CC:00:00:02')
+
+
+if __name__ == '__main__':
+    unittest.main()
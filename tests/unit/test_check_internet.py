@@ -1,4 +1,7 @@
-from check_internet import is_connected
+from check_internet import Connectivity, _reachable, is_connected
+from http.client import RemoteDisconnected
+from unittest import mock
+import threading
 import unittest
 
 
@@ -16,5 +19,68 @@ class TestIsConnected(unittest.TestCase):
         self.assertFalse(is_connected(site='https://notadomaindomino.com'))
 
 
+class TestConnectivity(unittest.TestCase):
+    def test_cached(self):
+        """
+        Test that the connection is checked once while the result is fresh
+        """
+        with mock.patch('check_internet._reachable', return_value=True) as reachable:
+            connectivity = Connectivity(ttl=60)
+            self.assertTrue(connectivity.online())
+            self.assertTrue(connectivity.online())
+        self.assertEqual(reachable.call_count, 1)
+
+    def test_background(self):
+        """
+        Test that the check runs in the background, a stale result is kept while it is refreshed
+        """
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def blocked(request, timeout):
+            release.wait()
+            return False
+
+        with mock.patch('check_internet._reachable', return_value=True):
+            connectivity = Connectivity(ttl=0)
+            self.assertTrue(connectivity.online())
+        with mock.patch('check_internet._reachable', side_effect=blocked):
+            thread = connectivity.check()
+            self.assertTrue(connectivity.online())
+            release.set()
+            thread.join(5)
+        self.assertFalse(connectivity.online(wait=False))
+
+    def test_connection_errors(self):
+        """
+        Test that resets and broken responses are reported as unreachable
+        """
+        connectivity = Connectivity()
+        for error in (ConnectionResetError(), RemoteDisconnected('closed')):
+            with self.subTest(error=error), mock.patch('check_internet.urlopen', side_effect=error):
+                self.assertFalse(_reachable(connectivity._request, 1))
+
+    def test_failed_check(self):
+        """
+        Test that a check that raises doesn't keep the next checks from running
+        """
+        with mock.patch('check_internet._reachable', side_effect=RuntimeError):
+            connectivity = Connectivity(ttl=0)
+            connectivity.check().join(5)
+        with mock.patch('check_internet._reachable', return_value=True):
+            self.assertTrue(connectivity.online())
+
+    def test_disable(self):
+        """
+        Test that a disabled connection is offline and never checked
+        """
+        with mock.patch('check_internet._reachable', return_value=True) as reachable:
+            connectivity = Connectivity()
+            connectivity.disable()
+            self.assertIsNone(connectivity.check())
+            self.assertFalse(connectivity.online())
+        reachable.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
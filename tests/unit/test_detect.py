@@ -0,0 +1,77 @@
+from importlib.util import find_spec
+import unittest
+
+if find_spec('kamene'):
+    from detect import ArpSpoofDetector
+
+GATEWAY_IP = '192.168.1.1'
+GATEWAY_MAC = 'AA:BB:CC:00:00:01'
+MY_MAC = 'AA:BB:CC:00:00:FF'
+ATTACKER = 'DE:AD:BE:EF:00:01'
+
+
+@unittest.skipUnless(find_spec('kamene'), 'kamene not installed')
+class TestArpSpoofDetector(unittest.TestCase):
+    def setUp(self):
+        self.detector = ArpSpoofDetector(GATEWAY_IP, GATEWAY_MAC, MY_MAC, window=10, garp_limit=3, flips=2)
+
+    def kinds(self, *args, **kwargs):
+        return [a.kind for a in self.detector.inspect(*args, **kwargs)]
+
+    def test_gateway_spoof(self):
+        """
+        Test that only another MAC claiming the gateway IP is reported
+        """
+        self.assertEqual(self.kinds(GATEWAY_IP, GATEWAY_MAC.lower(), when=0), [])
+        self.assertIn('gateway_spoof', self.kinds(GATEWAY_IP, ATTACKER, when=1))
+
+    def test_gateway_spoof_once_per_window(self):
+        """
+        Test that a spoofing MAC is reported once per window however many packets it sends
+        """
+        kinds = [k for t in range(10) for k in self.kinds(GATEWAY_IP, ATTACKER, when=t)]
+        self.assertEqual(kinds, ['gateway_spoof'])
+        self.assertEqual(self.kinds(GATEWAY_IP, ATTACKER, when=12), ['gateway_spoof'])
+
+    def test_bounded_state(self):
+        """
+        Test that hosts quiet for a window are forgotten and no more than max_hosts are tracked
+        """
+        detector = ArpSpoofDetector(GATEWAY_IP, GATEWAY_MAC, MY_MAC, window=10, max_hosts=5)
+        for i in range(20):
+            detector.inspect(f'10.0.0.{i}', f'02:00:00:00:00:{i:02x}', f'10.0.0.{i}', when=0)
+        self.assertEqual(detector.stats()['hosts'], 5)
+        self.assertEqual(len(detector._garps), 5)
+        detector.inspect('192.168.1.50', 'AA:00:00:00:00:50', when=15)
+        self.assertEqual(detector.stats()['hosts'], 1)
+        self.assertEqual(detector._garps, {})
+
+    def test_ignores_own_packets(self):
+        """
+        Test that packets from our own interface (e.g. while blocking) are not reported
+        """
+        self.assertEqual(self.kinds(GATEWAY_IP, MY_MAC, GATEWAY_IP, when=0), [])
+        self.assertEqual(self.detector.stats()['packets'], 1)
+
+    def test_garp_flood(self):
+        """
+        Test that a gratuitous ARP flood is reported once per window
+        """
+        ip = '192.168.1.20'
+        kinds = [k for t in range(8) for k in self.kinds(ip, ATTACKER, ip, when=t)]
+        self.assertEqual(kinds, ['garp_flood'])
+        self.assertEqual(self.kinds(ip, ATTACKER, ip, when=20), [])
+
+    def test_flip_flop(self):
+        """
+        Test that an IP changing MAC back and forth is reported
+        """
+        ip = '192.168.1.30'
+        macs = ['AA:00:00:00:00:01', 'AA:00:00:00:00:02'] * 3
+        kinds = [k for t, mac in enumerate(macs) for k in self.kinds(ip, mac, when=t)]
+        self.assertEqual(kinds, ['flip_flop'])
+        self.assertEqual(self.detector.stats()['flip_flop'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
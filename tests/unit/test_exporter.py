@@ -0,0 +1,56 @@
+from exporter import MetricsExporter, render
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import metrics
+import unittest
+
+
+class TestExporter(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_render(self):
+        """
+        Test that counters and timings are rendered in the Prometheus text format with their labels escaped
+        """
+        metrics.count('scans', engine='arp')
+        metrics.count('hosts_found', 12, engine='arp')
+        metrics.count('vendor_lookups', source='a"b')
+        metrics.gauge('hosts_up', 12, network='10.0.0.0/24')
+        metrics.gauge('hosts_up', 9, network='10.0.0.0/24')
+        metrics.record('arp', 'probe', 0.2)
+        lines = render().splitlines()
+        self.assertIn('# TYPE diamond_hosts_up gauge', lines)
+        self.assertIn('diamond_hosts_up{network="10.0.0.0/24"} 9', lines)
+        self.assertIn('# TYPE diamond_scans_total counter', lines)
+        self.assertIn('diamond_scans_total{engine="arp"} 1', lines)
+        self.assertIn('diamond_hosts_found_total{engine="arp"} 12', lines)
+        self.assertIn('diamond_vendor_lookups_total{source="a\\"b"} 1', lines)
+        self.assertIn('# TYPE diamond_phase_seconds histogram', lines)
+        self.assertIn('diamond_phase_seconds_bucket{source="arp",phase="probe",le="0.1"} 0', lines)
+        self.assertIn('diamond_phase_seconds_bucket{source="arp",phase="probe",le="0.5"} 1', lines)
+        self.assertIn('diamond_phase_seconds_bucket{source="arp",phase="probe",le="+Inf"} 1', lines)
+        self.assertIn('diamond_phase_seconds_sum{source="arp",phase="probe"} 0.2', lines)
+        self.assertIn('diamond_phase_seconds_count{source="arp",phase="probe"} 1', lines)
+
+    def test_endpoint(self):
+        """
+        Test that the metrics are served at /metrics on a free port and anything else is not found
+        """
+        metrics.count('block_packets', 3)
+        exporter = MetricsExporter(0)
+        exporter.start()
+        try:
+            self.assertNotEqual(exporter.port, 0)
+            with urlopen(f'http://127.0.0.1:{exporter.port}/metrics', timeout=5) as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                self.assertIn('diamond_block_packets_total 3', response.read().decode().splitlines())
+            with self.assertRaises(HTTPError) as e:
+                urlopen(f'http://127.0.0.1:{exporter.port}/', timeout=5)
+            self.assertEqual(e.exception.code, 404)
+        finally:
+            exporter.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
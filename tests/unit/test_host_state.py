@@ -0,0 +1,70 @@
+from host_state import HostStateStore
+from scan import Host
+from unittest import mock
+import unittest
+
+CIDR = '192.168.1.0/24'
+
+
+class TestHostStateStore(unittest.TestCase):
+    def test_keeps_learned_data(self):
+        """
+        Test that a host seen again with the same MAC keeps its vendor and hostname
+        """
+        store = HostStateStore()
+        store.see(CIDR, Host('192.168.1.10', 'AA:BB:CC:00:00:01', 'Vendor', 'phone'), when=10)
+        record = store.see(CIDR, Host('192.168.1.10', 'aa:bb:cc:00:00:01', None, 'N/A'), when=20)
+        self.assertEqual(record.host.vendor, 'Vendor')
+        self.assertEqual(record.host.hostname, 'phone')
+        self.assertEqual((record.first_seen, record.last_seen), (10, 20))
+
+    def test_new_mac_resets_record(self):
+        """
+        Test that an IP taken by another MAC is recorded as a new host
+        """
+        store = HostStateStore()
+        store.see(CIDR, Host('192.168.1.10', 'AA:BB:CC:00:00:01', 'Vendor', 'phone'), when=10)
+        record = store.see(CIDR, Host('192.168.1.10', 'AA:BB:CC:00:00:02', None, 'N/A'), when=20)
+        self.assertIsNone(record.host.vendor)
+        self.assertEqual(record.first_seen, 20)
+
+    def test_stale_and_probe(self):
+        """
+        Test that only the hosts not seen recently are stale and the ones not answering a probe are forgotten
+        """
+        store = HostStateStore(stale_after=60)
+        store.see(CIDR, Host('192.168.1.10', 'AA:BB:CC:00:00:01', 'Vendor', 'N/A'), when=0)
+        store.see(CIDR, Host('192.168.1.2', 'AA:BB:CC:00:00:02', 'Vendor', 'N/A'), when=100)
+        with mock.patch('host_state.time.time', return_value=120):
+            self.assertEqual(store.stale(CIDR), ['192.168.1.10'])
+            store.update(CIDR, [], probed=['192.168.1.10'])
+        self.assertEqual([h.ip for h in store.hosts(CIDR)], ['192.168.1.2'])
+
+    def test_sweep_merges(self):
+        """
+        Test that a background sweep adds new hosts and forgets the ones that didn't answer
+        """
+        store = HostStateStore()
+        store.see(CIDR, Host('192.168.1.10', 'AA:BB:CC:00:00:01', 'Vendor', 'N/A'))
+        new = Host('192.168.1.20', 'AA:BB:CC:00:00:03', 'Vendor', 'N/A')
+        store.start_sweep(CIDR, lambda: [new]).join()
+        self.assertEqual(store.hosts(CIDR), [new])
+
+    def test_sweep_failure(self):
+        """
+        Test that a sweep that fails, even with SystemExit, keeps the known hosts and logs the error
+        """
+        store = HostStateStore()
+        known = Host('192.168.1.10', 'AA:BB:CC:00:00:01', 'Vendor', 'N/A')
+        store.see(CIDR, known)
+
+        def failing():
+            raise SystemExit(1)
+
+        with self.assertLogs('host_state', 'ERROR'):
+            store.start_sweep(CIDR, failing).join()
+        self.assertEqual(store.hosts(CIDR), [known])
+
+
+if __name__ == '__main__':
+    unittest.main()
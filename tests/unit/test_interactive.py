@@ -0,0 +1,141 @@
+from host_state import HostStateStore
+from scan import Host
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import mock
+import asyncio
+import threading
+import time
+import unittest
+
+if find_spec('kamene'):
+    import interactive
+
+CIDR = '192.168.1.0/24'
+GATEWAY = Host('192.168.1.1', 'AA:BB:CC:00:00:01', 'Vendor', 'router')
+KNOWN = Host('192.168.1.10', 'AA:BB:CC:00:00:10', 'Vendor', 'N/A')
+FOUND = Host('192.168.1.20', 'AA:BB:CC:00:00:20', 'Vendor', 'N/A')
+LATE = Host('192.168.1.30', 'AA:BB:CC:00:00:30', 'Vendor', 'N/A')
+
+
+def _answer(answer, until=lambda: True):
+    # An input() that answers once `until` holds, as a user reading the listing would
+    def answer_input():
+        deadline = time.monotonic() + 5
+        while not until() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return answer
+    return answer_input
+
+
+@unittest.skipUnless(find_spec('kamene'), 'kamene not installed')
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.addresses = SimpleNamespace(network=SimpleNamespace(cidr=CIDR), engine='arp',
+                                         interface=SimpleNamespace(name='eth0', mac='AA:BB:CC:00:00:FF'),
+                                         gateway=SimpleNamespace(ip=GATEWAY.ip, mac=GATEWAY.mac),
+                                         sync=lambda: None)
+        self.store = HostStateStore(stale_after=60)
+        self.scans = []
+        self.listed = []
+        self.blocked = []
+        self.blocking = threading.Event()
+        patches = [mock.patch('interactive.display_network_info'),
+                   mock.patch('display_scan.resolve_hosts', side_effect=lambda found: [Host(*h[:4]) for h in found]),
+                   mock.patch('interactive.display_host',
+                              side_effect=lambda i, h, last_seen=None: self.listed.append((i, h))),
+                   mock.patch('interactive.display_block', side_effect=self.block),
+                   mock.patch('interactive.shutdown', side_effect=SystemExit)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def block(self, targets, addresses, packets):
+        self.blocked.extend(targets)
+        self.blocking.set()
+
+    def run_session(self, sweep, answers, probed=(GATEWAY, KNOWN)):
+        def scan(ip, engine, interface, on_host=None, store=None):
+            self.scans.append(ip)
+            if ip == CIDR and on_host is not None:
+                return sweep(on_host)
+            return [h for h in probed if h.ip in ip.split() or ip == CIDR]
+
+        answers = iter(answers)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        with mock.patch('display_scan.scan', scan), \
+                mock.patch('interactive.input', lambda message: next(answers)(), create=True), \
+                self.assertRaises(SystemExit):
+            loop.run_until_complete(interactive._session(self.addresses, 60, self.store))
+
+    def recorded(self, host):
+        return host.ip in {h.ip for h in self.store.hosts(CIDR)}
+
+    def test_stable_numbering(self):
+        """
+        Test that known hosts are listed first, swept hosts are appended and numbers are kept when choosing targets
+        """
+        def sweep(on_host):
+            on_host(FOUND, 0.01)
+            # Found once the targets are chosen
+            self.blocking.wait(5)
+            on_host(LATE, 0.01)
+            return [GATEWAY, KNOWN, FOUND, LATE]
+
+        self.run_session(sweep, [_answer('b'), _answer('2', lambda: len(self.listed) == 3),
+                                 _answer('e', lambda: self.recorded(LATE))])
+        self.assertEqual(self.listed, [(0, GATEWAY), (1, KNOWN), (2, FOUND)])
+        self.assertEqual(self.blocked, [FOUND])
+        # Hosts found after the targets were chosen are only recorded in the store
+        self.assertTrue(self.recorded(LATE))
+
+    def test_stale_hosts(self):
+        """
+        Test that only the stale hosts are probed again and the ones that don't answer aren't listed
+        """
+        self.store.see(CIDR, GATEWAY)
+        self.store.see(CIDR, KNOWN, when=time.time() - 120)
+        self.store.see(CIDR, LATE, when=time.time() - 120)
+
+        self.run_session(lambda on_host: [GATEWAY, KNOWN], [_answer('b'), _answer('1'), _answer('e')])
+        # Probed once when the session starts, the network is only swept in the background
+        self.assertEqual([ip for ip in self.scans if ip != CIDR], [f'{KNOWN.ip} {LATE.ip}'])
+        self.assertEqual(self.listed, [(0, GATEWAY), (1, KNOWN)])
+        self.assertEqual(self.blocked, [KNOWN])
+        self.assertFalse(self.recorded(LATE))
+
+    def test_sweep_failure(self):
+        """
+        Test that a failing sweep is logged and the session goes on with the hosts already listed
+        """
+        def sweep(on_host):
+            raise RuntimeError('sweep failed')
+
+        with mock.patch('host_state.log.exception') as exception:
+            self.run_session(sweep, [_answer('b'), _answer('1', lambda: exception.called), _answer('e')])
+        self.assertEqual(self.blocked, [KNOWN])
+        exception.assert_called_once()
+
+
+@unittest.skipUnless(find_spec('kamene'), 'kamene not installed')
+class TestHostListing(unittest.TestCase):
+    def test_listing(self):
+        """
+        Test that hosts are numbered once in the order they are added and not after the listing is closed
+        """
+        listing = interactive._HostListing()
+        with mock.patch('interactive.display_host') as display_host:
+            # Found by the sweep before the known hosts are listed
+            listing.add(FOUND, 10)
+            listing.start([GATEWAY, KNOWN], {KNOWN.ip: 5})
+            listing.add(KNOWN)
+            listing.close()
+            listing.add(LATE)
+        self.assertEqual(listing.hosts, [GATEWAY, KNOWN, FOUND])
+        self.assertEqual(display_host.call_args_list, [mock.call(0, GATEWAY, None), mock.call(1, KNOWN, 5),
+                                                       mock.call(2, FOUND, 10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
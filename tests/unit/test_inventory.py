@@ -0,0 +1,55 @@
+from inventory import Inventory
+from scan import Host
+from unittest import mock
+import unittest
+
+ROUTER = Host('192.168.1.1', 'aa:bb:cc:00:00:01', 'Vendor', 'router.lan')
+PHONE = Host('192.168.1.10', 'AA:BB:CC:00:00:02', None, 'N/A')
+
+
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        self.inventory = Inventory(':memory:')
+        self.addCleanup(self.inventory.close)
+
+    def test_record(self):
+        """
+        Test that sightings of a host on the same IP are folded into one address
+        """
+        self.inventory.record([ROUTER, PHONE], '192.168.1.0/24', when=100)
+        self.inventory.record([ROUTER], when=200)
+        devices = self.inventory.devices(cidr='192.168.1.0/24')
+        self.assertEqual([(d.mac, d.first_seen, d.last_seen) for d in devices],
+                         [('AA:BB:CC:00:00:01', 100, 200), ('AA:BB:CC:00:00:02', 100, 100)])
+        self.assertEqual(self.inventory.addresses(ROUTER.mac), [('192.168.1.1', '192.168.1.0/24', 100, 200, 2)])
+
+    def test_changes(self):
+        """
+        Test that vendor and hostname changes are kept and unknown values don't replace known ones
+        """
+        self.inventory.record([ROUTER], when=100)
+        self.inventory.record([Host(ROUTER.ip, ROUTER.mac, 'N/A', 'gateway.lan')], when=200)
+        self.assertEqual(self.inventory.devices(mac=ROUTER.mac)[0].vendor, 'Vendor')
+        self.assertEqual(self.inventory.changes(ROUTER.mac),
+                         [('vendor', 'Vendor', 100), ('hostname', 'router.lan', 100), ('hostname', 'gateway.lan', 200)])
+
+    def test_new_devices(self):
+        """
+        Test that only the devices first seen within the period are new
+        """
+        self.inventory.record([ROUTER], when=0)
+        self.inventory.record([ROUTER, PHONE], when=100_000)
+        with mock.patch('inventory.time.time', return_value=100_000):
+            self.assertEqual([d.mac for d in self.inventory.new_devices(24 * 60 * 60)], ['AA:BB:CC:00:00:02'])
+
+    def test_multiple_ips(self):
+        """
+        Test that MAC addresses seen on more than one IP are reported with their IPs
+        """
+        self.inventory.record([ROUTER, PHONE], when=100)
+        self.inventory.record([Host('192.168.1.11', PHONE.mac, None, 'N/A')], when=200)
+        self.assertEqual(self.inventory.multiple_ips(), {'AA:BB:CC:00:00:02': ['192.168.1.10', '192.168.1.11']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+from journal import _alive, _process_start, clear_journal, heal, read_journal, write_journal
+from collections import namedtuple
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+import json
+import os
+import tempfile
+import unittest
+
+Host = namedtuple('Host', 'ip mac vendor hostname')
+ADDRESSES = SimpleNamespace(interface=SimpleNamespace(name='eth0', mac='AA:BB:CC:00:00:FF'),
+                            gateway=SimpleNamespace(ip='192.168.1.1', mac='AA:BB:CC:00:00:01'),
+                            network=SimpleNamespace(cidr='192.168.1.0/24'))
+TARGETS = [Host('192.168.1.10', 'AA:BB:CC:00:00:02', 'Vendor', 'phone')]
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'journal.json')
+
+    def test_round_trip(self):
+        """
+        Test that the journal records the targets and gateway and leaves no temporary file behind
+        """
+        write_journal(TARGETS, ADDRESSES, self.path)
+        session = read_journal(self.path)
+        self.assertEqual(session['targets'], [{'ip': '192.168.1.10', 'mac': 'AA:BB:CC:00:00:02'}])
+        self.assertEqual(session['gateway'], {'ip': '192.168.1.1', 'mac': 'AA:BB:CC:00:00:01'})
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['journal.json'])
+
+    def test_clear(self):
+        """
+        Test that a cleared or missing journal reads as None
+        """
+        write_journal(TARGETS, ADDRESSES, self.path)
+        clear_journal(self.path)
+        self.assertIsNone(read_journal(self.path))
+        clear_journal(self.path)
+
+    def test_corrupt(self):
+        """
+        Test that an unreadable journal reads as None and is moved aside
+        """
+        with open(self.path, 'w') as f:
+            f.write('{"targets": [')
+        self.assertIsNone(read_journal(self.path))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['journal.json.corrupt'])
+
+    def test_heal_live_session(self):
+        """
+        Test that the journal of a process that is still blocking is neither healed nor cleared
+        """
+        write_journal(TARGETS, ADDRESSES, self.path)
+        with mock.patch('os.getpid', return_value=0):
+            self.assertEqual(heal(self.directory), [])
+        self.assertIsNotNone(read_journal(self.path))
+
+    def test_heal_malformed(self):
+        """
+        Test that a session missing its targets is moved aside instead of healed
+        """
+        with open(self.path, 'w') as f:
+            json.dump({'pid': 1, 'interface': {'name': 'eth0', 'mac': 'AA:BB:CC:00:00:FF'}}, f)
+        self.assertEqual(heal(self.directory), [])
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['journal.json.corrupt'])
+
+    def test_concurrent_sessions(self):
+        """
+        Test that each process has its own journal, so clearing one session leaves the others
+        """
+        with mock.patch('journal.JOURNAL_DIR', Path(self.directory)):
+            for pid in (1001, 1002):
+                with mock.patch('os.getpid', return_value=pid):
+                    write_journal(TARGETS, ADDRESSES)
+            with mock.patch('os.getpid', return_value=1001):
+                clear_journal()
+                self.assertIsNone(read_journal())
+        self.assertEqual(os.listdir(self.directory), ['1002.json'])
+
+    @unittest.skipUnless(_process_start(os.getppid()), '/proc not available')
+    def test_reused_pid(self):
+        """
+        Test that a process is only taken for the session if it was started by it, on the same boot
+        """
+        pid = os.getppid()
+        write_journal(TARGETS, ADDRESSES, self.path)
+        boot_id = read_journal(self.path)['boot_id']
+        self.assertTrue(_alive(pid, boot_id, _process_start(pid)))
+        self.assertFalse(_alive(pid, boot_id, _process_start(pid) + 1))
+        self.assertFalse(_alive(pid, 'another boot', _process_start(pid)))
+        # Journals that didn't record them fall back to whether the process exists
+        self.assertTrue(_alive(pid))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
-from loading_animation import LoadingThread
+from loading_animation import LoadingThread, animate
+from progress import report
+from unittest import mock
+import threading
 import time
 import unittest
 
@@ -23,6 +26,30 @@ class TestLoadingAnimation(unittest.TestCase):
         time.sleep(0.5)
         self.assertFalse(animation.is_alive())
 
+    def test_update(self):
+        """
+        Test that the progress reported is added to the counters displayed
+        """
+        animation = LoadingThread('message')
+        animation.update({'total': 256, 'probed': 128})
+        animation.update({'up': 2, 'vendors': 1})
+        animation.update({'vendors': -1})
+        self.assertEqual(animation.counts, {'total': 256, 'probed': 128, 'up': 2, 'vendors': 0})
+
+    @mock.patch('loading_animation.IS_TTY', True)
+    def test_animate_error(self):
+        """
+        Test that the animation is stopped when the decorated function raises
+        """
+        @animate('message')
+        def fail():
+            report(probed=1)
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual([t for t in threading.enumerate() if isinstance(t, LoadingThread)], [])
+
 
 if __name__ == '__main__':
     unittest.main()
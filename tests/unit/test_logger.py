@@ -1,4 +1,4 @@
-from logger import create_logger
+from logger import create_logger, set_level
 import logging
 import unittest
 
@@ -24,6 +24,32 @@ class TestCreateLogger(unittest.TestCase):
                                      f'WARNING:{log.name}:warning message',
                                      f'ERROR:{log.name}:error message'])
 
+    def test_single_handler(self):
+        """
+        Test that every logger shares the same handler and gets it once
+        """
+        log = create_logger(__name__)
+        other = create_logger(f'{__name__}.other')
+        create_logger(__name__)
+        self.assertEqual(len(log.handlers), 1)
+        self.assertIs(log.handlers[0], other.handlers[0])
+
+    def test_lazy_formatting(self):
+        """
+        Test that the arguments of a disabled level are never formatted
+        """
+        class Packet:
+            formatted = False
+
+            def __repr__(self):
+                Packet.formatted = True
+                return 'Packet()'
+
+        log = create_logger(f'{__name__}.lazy')
+        set_level(log.name, logging.INFO)
+        log.debug('Packet created: %r', Packet())
+        self.assertFalse(Packet.formatted)
+
 
 if __name__ == '__main__':
     unittest.main()
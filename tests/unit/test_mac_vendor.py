@@ -1,4 +1,10 @@
-from mac_vendor import get_vendor
+from mac_vendor import get_vendor, resolve_vendors
+from oui import OuiIndex
+from vendor_cache import VendorCache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import threading
+import time
 import unittest
 
 
@@ -28,5 +34,141 @@ class TestGetVendor(unittest.TestCase):
         self.assertEqual(vendor, 'No vendor')
 
 
+class TestResolveVendors(unittest.TestCase):
+    def setUp(self):
+        patches = [mock.patch('mac_vendor.lookup_vendor', return_value=None),
+                   # aa:bb:ce is split into MA-S assignments
+                   mock.patch('mac_vendor.block_bits',
+                              side_effect=lambda mac: 36 if mac.startswith('aa:bb:ce') else 24),
+                   mock.patch('mac_vendor.get_cache', return_value=VendorCache(None)),
+                   mock.patch('mac_vendor.get_connectivity', return_value=mock.Mock(**{'online.return_value': True}))]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_dedupe_by_oui(self):
+        """
+        Test that MAC addresses sharing an OUI are requested once
+        """
+        with mock.patch('mac_vendor._request_vendor', return_value='Vendor') as request:
+            vendors = resolve_vendors(['aa:bb:cc:00:00:01', 'aa:bb:cc:00:00:02', 'aa:bb:cd:00:00:01'])
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(set(vendors.values()), {'Vendor'})
+        self.assertEqual(len(vendors), 3)
+
+    def test_split_oui(self):
+        """
+        Test that MAC addresses of different MA-S assignments of a split OUI are requested and cached apart
+        """
+        with mock.patch('mac_vendor._request_vendor', side_effect=lambda mac, timeout: mac[-5:]) as request:
+            vendors = resolve_vendors(['aa:bb:ce:00:10:01', 'aa:bb:ce:00:20:01', 'aa:bb:ce:00:20:02'])
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(vendors, {'aa:bb:ce:00:10:01': '10:01', 'aa:bb:ce:00:20:01': '20:01',
+                                   'aa:bb:ce:00:20:02': '20:01'})
+        with mock.patch('mac_vendor._request_vendor') as request:
+            self.assertEqual(resolve_vendors(['aa:bb:ce:00:10:ff'])['aa:bb:ce:00:10:ff'], '10:01')
+        request.assert_not_called()
+
+    def test_concurrent_requests(self):
+        """
+        Test that the requests run concurrently so the total time is set by the slowest one
+        """
+        def slow_request(mac, timeout):
+            time.sleep(0.2)
+            return mac
+
+        macs = [f'aa:bb:{i:02x}:00:00:00' for i in range(10)]
+        with mock.patch('mac_vendor._request_vendor', side_effect=slow_request):
+            start = time.monotonic()
+            vendors = resolve_vendors(macs)
+            elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 1)
+        self.assertEqual(vendors, {mac: mac for mac in macs})
+
+    def test_deadline(self):
+        """
+        Test that the lookups missing the deadline resolve to 'N/A'
+        """
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def blocked_request(mac, timeout):
+            release.wait()
+            return 'Vendor'
+
+        with mock.patch('mac_vendor._request_vendor', side_effect=blocked_request):
+            vendors = resolve_vendors(['aa:bb:cc:00:00:01'], deadline=0.1)
+        self.assertEqual(vendors, {'aa:bb:cc:00:00:01': 'N/A'})
+
+    def test_broken_answers(self):
+        """
+        Test that the lookups whose connection is dropped or whose answer is cut short resolve to 'N/A'
+        and the other MAC addresses keep their vendor
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                oui = self.path.rsplit('/', 1)[-1][:8]
+                if oui == 'aa:bb:01':
+                    # Dropped without an answer
+                    self.close_connection = True
+                    return
+                body = b'Vendor'
+                self.send_response(200)
+                # aa:bb:02 announces more than it sends
+                self.send_header('Content-Length', '100' if oui == 'aa:bb:02' else str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        macs = ['aa:bb:01:00:00:01', 'aa:bb:01:00:00:02', 'aa:bb:02:00:00:01', 'aa:bb:03:00:00:01']
+        with mock.patch('mac_vendor.MAC_VENDORS_API', f'http://127.0.0.1:{server.server_port}/'), \
+                mock.patch('mac_vendor.print', create=True):
+            vendors = resolve_vendors(macs, timeout=1)
+        self.assertEqual(vendors, {'aa:bb:01:00:00:01': 'N/A', 'aa:bb:01:00:00:02': 'N/A',
+                                   'aa:bb:02:00:00:01': 'N/A', 'aa:bb:03:00:00:01': 'Vendor'})
+
+    def test_offline(self):
+        """
+        Test that no request is made when online lookups are disabled
+        """
+        with mock.patch('mac_vendor._request_vendor') as request:
+            vendors = resolve_vendors(['aa:bb:cc:00:00:01'], online=False)
+        request.assert_not_called()
+        self.assertEqual(vendors, {'aa:bb:cc:00:00:01': 'No vendor'})
+
+    def test_unreachable(self):
+        """
+        Test that no request is made by default when the internet is unreachable
+        """
+        with mock.patch('mac_vendor.get_connectivity', return_value=mock.Mock(**{'online.return_value': False})), \
+                mock.patch('mac_vendor._request_vendor') as request:
+            vendors = resolve_vendors(['aa:bb:cc:00:00:01', 'aa:bb:cc:00:00:02'])
+        request.assert_not_called()
+        self.assertEqual(vendors, {'aa:bb:cc:00:00:01': 'No vendor', 'aa:bb:cc:00:00:02': 'No vendor'})
+
+
+class TestUnbuiltIndex(unittest.TestCase):
+    def test_dedupe_by_oui(self):
+        """
+        Test that MAC addresses sharing an OUI are requested and cached once when the OUI index was never built
+        """
+        cache = VendorCache(None)
+        with mock.patch('oui._index', OuiIndex()), \
+                mock.patch('mac_vendor.get_cache', return_value=cache), \
+                mock.patch('mac_vendor.get_connectivity', return_value=mock.Mock(**{'online.return_value': True})), \
+                mock.patch('mac_vendor._request_vendor', return_value='Vendor') as request:
+            vendors = resolve_vendors(['aa:bb:cc:00:00:01', 'aa:bb:cc:00:00:02', 'aa:bb:cd:00:00:01'])
+            self.assertEqual(resolve_vendors(['aa:bb:cc:ff:ff:ff']), {'aa:bb:cc:ff:ff:ff': 'Vendor'})
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(len(vendors), 3)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,77 @@
+import metrics
+import unittest
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_timed(self):
+        """
+        Test that timed blocks are recorded per source and phase, even when they raise
+        """
+        with metrics.timed('arp', 'probe'):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.timed('arp', 'probe'):
+                raise ValueError
+        summary = metrics.summary()
+        self.assertEqual(summary[('arp', 'probe')]['count'], 2)
+        self.assertGreaterEqual(summary[('arp', 'probe')]['total'], summary[('arp', 'probe')]['max'])
+
+    def test_hooks(self):
+        """
+        Test that hooks get every timing until they are removed
+        """
+        calls = []
+        hook = lambda *args: calls.append(args)  # noqa: E731
+        metrics.add_hook(hook)
+        metrics.record('nmap', 'spawn', 0.5)
+        metrics.remove_hook(hook)
+        metrics.record('nmap', 'spawn', 0.25)
+        self.assertEqual(calls, [('nmap', 'spawn', 0.5)])
+        self.assertEqual(metrics.summary()[('nmap', 'spawn')], {'count': 2, 'total': 0.75, 'max': 0.5})
+
+    def test_histograms(self):
+        """
+        Test that timings are counted in every bucket whose bound they don't exceed
+        """
+        metrics.record('vendor', 'request', 0.001)
+        metrics.record('vendor', 'request', 0.3)
+        metrics.record('vendor', 'request', 500)
+        histogram = metrics.histograms()[('vendor', 'request')]
+        self.assertEqual(histogram['count'], 3)
+        self.assertEqual(histogram['total'], 500.301)
+        self.assertEqual(dict(zip(metrics.BUCKETS, histogram['buckets']))[0.001], 1)
+        self.assertEqual(dict(zip(metrics.BUCKETS, histogram['buckets']))[0.5], 2)
+        self.assertEqual(histogram['buckets'][-1], 2)
+
+    def test_counters(self):
+        """
+        Test that counters add up per name and labels, whatever the order of the labels
+        """
+        metrics.count('scans', engine='arp')
+        metrics.count('scans', 2, engine='arp')
+        metrics.count('scans', engine='nmap')
+        metrics.count('restored_targets', 0, result='verified', extra='x')
+        self.assertEqual(metrics.counters(), {('scans', (('engine', 'arp'),)): 3,
+                                              ('scans', (('engine', 'nmap'),)): 1,
+                                              ('restored_targets', (('extra', 'x'), ('result', 'verified'))): 0})
+        metrics.reset()
+        self.assertEqual(metrics.counters(), {})
+
+    def test_gauges(self):
+        """
+        Test that gauges keep the last value set per name and labels
+        """
+        metrics.gauge('hosts_up', 12, network='10.0.0.0/24')
+        metrics.gauge('hosts_up', 9, network='10.0.0.0/24')
+        metrics.gauge('hosts_up', 3, network='10.0.1.0/24')
+        self.assertEqual(metrics.gauges(), {('hosts_up', (('network', '10.0.0.0/24'),)): 9,
+                                            ('hosts_up', (('network', '10.0.1.0/24'),)): 3})
+        metrics.reset()
+        self.assertEqual(metrics.gauges(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+from netlink import NetlinkMonitor
+from unittest import mock
+import unittest
+
+
+class TestNetlinkMonitor(unittest.TestCase):
+    def setUp(self):
+        self.monitor = NetlinkMonitor()
+        self.addCleanup(self.monitor.close)
+
+    def test_changed(self):
+        """
+        Test that only the first check reports a change when the kernel reports none
+        """
+        self.monitor._socket.close()
+        self.monitor._socket = mock.Mock(**{'recv.side_effect': BlockingIOError})
+        self.assertTrue(self.monitor.changed())
+        self.assertFalse(self.monitor.changed())
+
+    def test_message(self):
+        """
+        Test that a message from the kernel is reported as a change once
+        """
+        self.monitor._socket.close()
+        self.monitor._socket = mock.Mock(**{'recv.side_effect': [BlockingIOError, b'message', BlockingIOError,
+                                                                 BlockingIOError]})
+        self.monitor.changed()
+        self.assertTrue(self.monitor.changed())
+        self.assertFalse(self.monitor.changed())
+
+    def test_invalidate(self):
+        """
+        Test that the next check reports a change after invalidate
+        """
+        self.monitor.changed()
+        self.monitor.invalidate()
+        self.assertTrue(self.monitor.changed())
+
+    @mock.patch('socket.socket', side_effect=OSError)
+    def test_unavailable(self, _):
+        """
+        Test that every check reports a change when rtnetlink is not available
+        """
+        monitor = NetlinkMonitor()
+        self.assertTrue(monitor.changed())
+        self.assertTrue(monitor.changed())
+
+
+if __name__ == '__main__':
+    unittest.main()
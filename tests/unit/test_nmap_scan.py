@@ -0,0 +1,96 @@
+from nmap_scan import nmap_sweep
+from progress import listen
+from subprocess import CalledProcessError
+from unittest import mock
+import os
+import stat
+import tempfile
+import textwrap
+import unittest
+
+REPORT = '''<?xml version="1.0" encoding="UTF-8"?>
+<nmaprun scanner="nmap" args="nmap -sn -oX - 192.168.1.0/24">
+<host><status state="up" reason="arp-response"/>
+<address addr="192.168.1.1" addrtype="ipv4"/>
+<address addr="AA:BB:CC:00:00:01" addrtype="mac" vendor="Vendor"/>
+<hostnames><hostname name="router.lan" type="PTR"/></hostnames>
+<times srtt="1500" rttvar="5000" to="100000"/>
+</host>
+<host><status state="up" reason="localhost-response"/>
+<address addr="192.168.1.5" addrtype="ipv4"/>
+<hostnames/>
+</host>
+<host><status state="up" reason="arp-response"/>
+<address addr="192.168.1.10" addrtype="ipv4"/>
+<address addr="AA:BB:CC:00:00:02" addrtype="mac"/>
+<hostnames/>
+</host>
+<runstats><finished/><hosts up="3" down="253" total="256"/></runstats>
+</nmaprun>
+'''
+
+
+def fake_nmap(directory, script):
+    """Write an executable standing in for nmap and return its path"""
+    path = os.path.join(directory, 'nmap')
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\n' + textwrap.dedent(script))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+class TestNmapSweep(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'report.xml'), 'w') as f:
+            f.write(REPORT)
+
+    def sweep(self, script, ip='192.168.1.0/24'):
+        with mock.patch('nmap_scan._path', fake_nmap(self.directory, script)):
+            return list(nmap_sweep(ip))
+
+    def test_hosts(self):
+        """
+        Test that the hosts of the report are yielded with their vendor, hostname and latency, skipping localhost
+        """
+        hosts = self.sweep(f'cat {self.directory}/report.xml\n')
+        self.assertEqual(hosts, [('192.168.1.1', 'AA:BB:CC:00:00:01', 'Vendor', 'router.lan', 0.0015),
+                                 ('192.168.1.10', 'AA:BB:CC:00:00:02', None, 'N/A', None)])
+
+    def test_streams(self):
+        """
+        Test that a host is yielded before nmap finishes its report and nmap is killed when the generator is closed
+        """
+        script = f'''
+            head -n 9 {self.directory}/report.xml
+            sleep 30
+        '''
+        with mock.patch('nmap_scan._path', fake_nmap(self.directory, script)):
+            sweep = nmap_sweep('192.168.1.0/24')
+            self.assertEqual(next(sweep)[0], '192.168.1.1')
+            sweep.close()
+
+    def test_progress(self):
+        """
+        Test that the addresses probed are reported from the ping scan progress and the final count
+        """
+        script = f'''
+            echo '<nmaprun><taskprogress task="ARP Ping Scan" percent="50.00"/>'
+            sed 1,2d {self.directory}/report.xml
+        '''
+        received = []
+        with listen(received.append):
+            self.sweep(script)
+        self.assertEqual(received, [{'total': 256}, {'total': 0, 'probed': 128}, {'total': 0, 'probed': 128}])
+
+    def test_error(self):
+        """
+        Test that nmap exiting with an error raises CalledProcessError with its message
+        """
+        with self.assertRaises(CalledProcessError) as context:
+            self.sweep('echo "Failed to open device" >&2\nexit 1\n')
+        self.assertIn('Failed to open device', context.exception.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+from oui import OuiIndex, build_index, load_index, mac_to_int
+from pathlib import Path
+import tempfile
+import unittest
+
+CSV = ('Registry,Assignment,Organization Name,Organization Address\n'
+       'MA-L,087402,"Apple, Inc.",1 Infinite Loop Cupertino CA US 95014\n'
+       'MA-M,0874021,Small Vendor,Somewhere\n'
+       'MA-S,087402123,Tiny Vendor,Somewhere\n'
+       'MA-L,ZZZZZZ,Broken Row,Nowhere\n')
+
+
+class TestOuiIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = OuiIndex([(24, 0x087402, 'Apple, Inc.'),
+                               (28, 0x0874021, 'Small Vendor'),
+                               (36, 0x087402123, 'Tiny Vendor')])
+
+    def test_longest_prefix(self):
+        """
+        Test that the most specific assignment wins
+        """
+        self.assertEqual(self.index.lookup('08:74:02:12:34:56'), 'Tiny Vendor')
+        self.assertEqual(self.index.lookup('08:74:02:1F:00:00'), 'Small Vendor')
+        self.assertEqual(self.index.lookup('08:74:02:00:00:00'), 'Apple, Inc.')
+
+    def test_mac_formats(self):
+        """
+        Test that the common MAC address notations are accepted
+        """
+        self.assertEqual(mac_to_int('08-74-02-00-00-00'), 0x087402000000)
+        self.assertEqual(mac_to_int('0874.0200.0000'), 0x087402000000)
+        self.assertIsNone(mac_to_int(''))
+        self.assertIsNone(mac_to_int('08:74:02:00:00:0G'))
+
+    def test_block_bits(self):
+        """
+        Test that only the OUIs the index knows to be split are taken as more specific than the OUI
+        """
+        index = OuiIndex([(24, 0x087402, 'Apple, Inc.'),
+                          (24, 0x70B3D5, 'IEEE Registration Authority'),
+                          (24, 0x001BC5, 'IEEE Registration Authority'),
+                          (28, 0x001BC51, 'Medium Vendor'),
+                          (36, 0x70B3D5001, 'Tiny Vendor')])
+        self.assertEqual(index.block_bits('08:74:02:00:00:00'), 24)
+        self.assertEqual(index.block_bits('00:1B:C5:20:00:00'), 28)
+        self.assertEqual(index.block_bits('70:B3:D5:00:20:00'), 36)
+        self.assertEqual(index.block_bits('70:B3:D5:00:10:00'), 36)
+        self.assertEqual(self.index.block_bits('08:74:02:00:00:00'), 36)
+        # OUIs the index doesn't know
+        self.assertEqual(index.block_bits('12:13:14:00:00:45'), 24)
+        self.assertEqual(OuiIndex().block_bits('08:74:02:00:00:00'), 24)
+        self.assertEqual(index.block_bits('not a mac'), 24)
+
+    def test_unknown_mac(self):
+        """
+        Test that it returns None when the mac is not assigned or not valid
+        """
+        self.assertIsNone(self.index.lookup('12:13:14:00:00:45'))
+        self.assertIsNone(self.index.lookup('not a mac'))
+
+    def test_build_and_load(self):
+        """
+        Test that an index rebuilt from a CSV file can be loaded back
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / 'oui.csv'
+            csv_path.write_text(CSV, encoding='utf-8')
+            index_path = Path(tmp) / 'oui.tsv'
+            built = build_index([csv_path], index_path)
+            loaded = load_index(index_path)
+        self.assertEqual(len(built), 3)
+        self.assertEqual(list(loaded.entries()), list(built.entries()))
+        self.assertEqual(loaded.lookup('08:74:02:12:34:56'), 'Tiny Vendor')
+
+    def test_malformed_lines(self):
+        """
+        Test that lines of the index file that aren't a prefix and a vendor are skipped
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = Path(tmp) / 'oui.tsv'
+            index_path.write_text('087402\tApple, Inc.\n\nZZZZZZ\tBroken\n0874\tShort\n0874021\n'
+                                  '087402123\tTiny Vendor\n', encoding='utf-8')
+            loaded = load_index(index_path)
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(loaded.lookup('08:74:02:12:34:56'), 'Tiny Vendor')
+        self.assertEqual(loaded.lookup('08:74:02:1F:00:00'), 'Apple, Inc.')
+
+    def test_missing_index(self):
+        """
+        Test that a missing index file loads as an empty index
+        """
+        self.assertEqual(len(load_index(Path(tempfile.gettempdir()) / 'missing_oui.tsv')), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
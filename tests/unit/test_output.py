@@ -0,0 +1,97 @@
+from output import FIELDS, HostWriter, create_writer
+from display_scan import stream_scan
+from inventory import Inventory
+from collections import namedtuple
+from types import SimpleNamespace
+from unittest import mock
+import csv
+import io
+import json
+import unittest
+
+Host = namedtuple('Host', 'ip mac vendor hostname')
+HOSTS = [Host('192.168.1.1', 'AA:BB:CC:00:00:01', 'Vendor', 'router'),
+         Host('192.168.1.10', 'AA:BB:CC:00:00:02', 'No vendor', 'N/A')]
+
+
+def _write(output_format, hosts):
+    stream = io.StringIO()
+    writer = create_writer(output_format, stream)
+    for host in hosts:
+        writer.write(host, 0.0123456789, 0, 60)
+    writer.close()
+    return stream.getvalue()
+
+
+class TestWriters(unittest.TestCase):
+    def test_ndjson(self):
+        """
+        Test that each host is written as a JSON object on its own line
+        """
+        lines = _write('ndjson', HOSTS).splitlines()
+        self.assertEqual(len(lines), len(HOSTS))
+        record = json.loads(lines[0])
+        self.assertEqual(tuple(record), FIELDS)
+        self.assertEqual(record['ip'], '192.168.1.1')
+        self.assertEqual(record['latency'], 0.012346)
+        self.assertEqual(record['first_seen'], '1970-01-01T00:00:00+00:00')
+        self.assertEqual(record['last_seen'], '1970-01-01T00:01:00+00:00')
+
+    def test_json(self):
+        """
+        Test that the hosts are written as a valid JSON array, empty or not
+        """
+        self.assertEqual([r['ip'] for r in json.loads(_write('json', HOSTS))], [h.ip for h in HOSTS])
+        self.assertEqual(json.loads(_write('json', [])), [])
+
+    def test_csv(self):
+        """
+        Test that the hosts are written as CSV rows after a header
+        """
+        rows = list(csv.DictReader(io.StringIO(_write('csv', HOSTS))))
+        self.assertEqual(len(rows), len(HOSTS))
+        self.assertEqual(rows[1]['mac'], 'AA:BB:CC:00:00:02')
+
+    def test_abstract(self):
+        """
+        Test that a writer must implement _write
+        """
+        with self.assertRaises(TypeError):
+            HostWriter(io.StringIO())
+
+
+class TestStreamScan(unittest.TestCase):
+    def test_first_seen(self):
+        """
+        Test that hosts known to the inventory keep when they were first seen and new ones are first seen now
+        """
+        inventory = Inventory(':memory:')
+        self.addCleanup(inventory.close)
+        inventory.record(HOSTS[:1], when=0)
+
+        def fake_scan(cidr, engine, interface, on_host):
+            for host in HOSTS:
+                on_host(host, 0.01)
+            return HOSTS
+
+        addresses = SimpleNamespace(network=SimpleNamespace(cidr='192.168.1.0/24'), engine='arp',
+                                    interface=SimpleNamespace(name='eth0'))
+        stream = io.StringIO()
+        with mock.patch('display_scan.scan', fake_scan), \
+                mock.patch('display_scan.get_inventory', return_value=inventory), \
+                mock.patch('display_scan.time.time', return_value=60):
+            stream_scan(addresses, 'ndjson', stream)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([r['first_seen'] for r in records], ['1970-01-01T00:00:00+00:00', '1970-01-01T00:01:00+00:00'])
+        self.assertEqual({r['last_seen'] for r in records}, {'1970-01-01T00:01:00+00:00'})
+
+    def test_unknown_format(self):
+        """
+        Test that an unknown format raises KeyError
+        """
+        with self.assertRaises(KeyError):
+            create_writer('xml', io.StringIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import mock
+import unittest
+
+if find_spec('kamene'):
+    import passive
+
+
+@unittest.skipUnless(find_spec('kamene'), 'kamene not installed')
+class TestPassiveMonitor(unittest.TestCase):
+    def test_sniff_fails(self):
+        """
+        Test that sniffing is logged and retried when the interface fails instead of ending the thread
+        """
+        addresses = SimpleNamespace(interface=SimpleNamespace(name='eth0', mac='AA:BB:CC:00:00:FF'),
+                                    network=SimpleNamespace(cidr='192.168.1.0/24'))
+        monitor = passive.PassiveMonitor(addresses, mock.Mock())
+        rounds = iter([OSError('Network is down'), passive.Kamene_Exception('No such device'), None])
+
+        def sniff(**kwargs):
+            error = next(rounds)
+            if error is not None:
+                raise error
+            monitor.stop()
+
+        with mock.patch('passive.sniff', side_effect=sniff) as sniffed, mock.patch('passive.RETRY_DELAY', 0), \
+                mock.patch('passive.log.exception') as exception:
+            monitor.run()
+        self.assertEqual(sniffed.call_count, 3)
+        self.assertEqual(exception.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
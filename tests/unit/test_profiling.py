@@ -0,0 +1,51 @@
+from profiling import Profiler
+from contextlib import redirect_stderr
+import io
+import json
+import metrics
+import pstats
+import tempfile
+import unittest
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.directory = tempfile.mkdtemp()
+
+    def test_dumps(self):
+        """
+        Test that the phases recorded while running become trace events and the cProfile dump is written
+        """
+        metrics.record('nmap', 'spawn', 0.1)
+        profiler = Profiler(('cprofile', 'trace'), self.directory)
+        profiler.start()
+        with metrics.timed('nmap', 'probe'):
+            pass
+        with redirect_stderr(io.StringIO()):
+            trace, profile = sorted(profiler.stop(), key=lambda p: p.suffix)
+        with open(trace) as f:
+            events = json.load(f)['traceEvents']
+        self.assertEqual([(e['cat'], e['name'], e['ph']) for e in events], [('nmap', 'probe', 'X')])
+        self.assertGreaterEqual(events[0]['ts'], 0)
+        pstats.Stats(str(profile))
+
+    def test_breakdown(self):
+        """
+        Test that the breakdown lists every phase, the slowest first, and no dump is written by default
+        """
+        metrics.record('nmap', 'spawn', 0.1)
+        metrics.record('vendor', 'request', 0.5)
+        profiler = Profiler(directory=self.directory)
+        profiler.start()
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(profiler.stop(), [])
+        lines = stderr.getvalue().splitlines()
+        self.assertTrue(lines[2].startswith('vendor request'))
+        self.assertTrue(lines[3].startswith('nmap spawn'))
+        self.assertTrue(lines[4].startswith('Total'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+from progress import listen, report
+import threading
+import unittest
+
+
+class TestProgress(unittest.TestCase):
+    def test_listen(self):
+        """
+        Test that a listener receives the reports of its block only
+        """
+        received = []
+        with listen(received.append):
+            report(probed=1)
+            report(up=1, vendors=1)
+        report(probed=1)
+        self.assertEqual(received, [{'probed': 1}, {'up': 1, 'vendors': 1}])
+
+    def test_thread(self):
+        """
+        Test that a listener doesn't receive the reports of other threads
+        """
+        received = []
+        with listen(received.append):
+            thread = threading.Thread(target=report, kwargs={'probed': 1})
+            thread.start()
+            thread.join()
+        self.assertEqual(received, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
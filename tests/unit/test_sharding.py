@@ -0,0 +1,53 @@
+from backends import BACKENDS, ScannerBackend
+from sharding import sharded_stream, split_network
+from ipaddress import ip_network
+from unittest import mock
+import time
+import unittest
+
+
+class FakeBackend(ScannerBackend):
+    """Backend answering with two addresses of each shard from the same MAC address"""
+    __slots__ = ()
+    name = 'fake'
+
+    def discover(self, ip, interface=None):
+        first = ip_network(ip).network_address + 1
+        mac = f'AA:BB:CC:00:{first.packed[2]:02X}:01'
+        return [(str(first), mac, None, 'N/A', None), (str(first + 1), mac.lower(), None, 'N/A', None)]
+
+
+class TestSplitNetwork(unittest.TestCase):
+    def test_split(self):
+        """
+        Test that only networks broader than the shard prefix are split
+        """
+        self.assertEqual(split_network('10.0.0.0/23', 24), ['10.0.0.0/24', '10.0.1.0/24'])
+        self.assertEqual(split_network('10.0.0.0/24', 24), ['10.0.0.0/24'])
+        self.assertEqual(split_network('10.0.0.1 10.0.0.2', 24), ['10.0.0.1 10.0.0.2'])
+
+
+class TestShardedStream(unittest.TestCase):
+    @mock.patch.dict(BACKENDS, {'fake': FakeBackend})
+    def test_merge(self):
+        """
+        Test that the hosts of every shard are merged and deduplicated by MAC address
+        """
+        shards = split_network('10.0.0.0/22', 24)
+        found = list(sharded_stream('fake', shards, workers=2, rate=10_000))
+        self.assertEqual(len(found), len(shards))
+        self.assertEqual(len({entry[1].upper() for entry in found}), len(shards))
+
+    @mock.patch.dict(BACKENDS, {'fake': FakeBackend})
+    def test_rate(self):
+        """
+        Test that shards are handed out no faster than the rate
+        """
+        start = time.monotonic()
+        list(sharded_stream('fake', split_network('10.0.0.0/23', 24), workers=2, rate=1024))
+        # The second shard of 256 addresses waits 0.25 seconds
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
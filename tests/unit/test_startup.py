@@ -0,0 +1,74 @@
+from pathlib import Path
+import subprocess
+import sys
+import unittest
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Modules that must not be imported by each CLI option
+OPTIONS = {
+    '--version': ('kamene', 'nmap_scan', 'netifaces', 'urllib.request', 'addresses'),
+    '--help': ('kamene', 'nmap_scan', 'netifaces', 'urllib.request', 'addresses'),
+}
+# Modules imported to enter each mode, and modules that must not be imported by them
+MODES = {
+    'scan': (('addresses', 'display_scan'), ('interactive', 'non_interactive', 'passive')),
+    'target': (('addresses', 'non_interactive'), ('interactive', 'display_scan', 'passive')),
+    'interactive': (('addresses', 'interactive'), ('non_interactive', 'passive', 'arp_scan')),
+}
+# Stands in for the third-party packages, so the modules of a mode can be imported without them
+STUBS = '''
+import sys, types
+class Stub(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Stub(name)
+for name in ('kamene', 'kamene.config', 'kamene.layers', 'kamene.layers.inet', 'kamene.layers.l2',
+             'kamene.sendrecv', 'kamene.utils', 'netifaces', 'nmap'):
+    sys.modules[name] = Stub(name)
+'''
+
+
+def import_times(*args):
+    """Run python with -X importtime and return a dict mapping each imported module to its own import time (us)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode:
+        raise AssertionError(result.stderr[-2000:])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(own)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_cli_options(self):
+        """
+        Test that --version and --help start without loading the heavy dependencies
+        """
+        for option, absent in OPTIONS.items():
+            with self.subTest(option=option):
+                times = import_times('diamond.py', option)
+                self.assertIn('argparse', times)
+                for module in absent:
+                    self.assertNotIn(module, times)
+
+    def test_modes(self):
+        """
+        Test that each mode only loads its own modules
+        """
+        for mode, (modules, absent) in MODES.items():
+            with self.subTest(mode=mode):
+                times = import_times('-c', f'{STUBS}\nimport {", ".join(modules)}')
+                for module in modules:
+                    self.assertIn(module, times)
+                for module in absent:
+                    self.assertNotIn(module, times)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+from vendor_cache import VendorCache
+from pathlib import Path
+from unittest import mock
+import tempfile
+import unittest
+
+
+class TestVendorCache(unittest.TestCase):
+    def test_hit_by_oui(self):
+        """
+        Test that MAC addresses sharing the OUI share the cached vendor
+        """
+        cache = VendorCache(None)
+        cache.put('08:74:02:00:00:01', 'Apple, Inc.')
+        self.assertEqual(cache.get('08:74:02:AA:BB:CC'), 'Apple, Inc.')
+        self.assertIsNone(cache.get('12:13:14:00:00:45'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_split_oui(self):
+        """
+        Test that vendors cached by MA-S prefix aren't shared with the rest of the OUI
+        """
+        cache = VendorCache(None)
+        cache.put('70:B3:D5:00:10:01', 'Small Vendor', bits=36)
+        cache.put('70:B3:D5:00:20:01', 'Other Vendor', bits=36)
+        self.assertEqual(cache.get('70:B3:D5:00:1F:FF'), 'Small Vendor')
+        self.assertEqual(cache.get('70:B3:D5:00:20:FF'), 'Other Vendor')
+        self.assertIsNone(cache.get('70:B3:D5:00:30:01'))
+
+    def test_negative_ttl(self):
+        """
+        Test that negative results are counted apart and expire before positive ones
+        """
+        cache = VendorCache(None)
+        with mock.patch('vendor_cache.time.time', return_value=0):
+            cache.put('12:13:14:00:00:45', 'No vendor')
+            cache.put('08:74:02:00:00:01', 'Apple, Inc.')
+            self.assertEqual(cache.get('12:13:14:00:00:45'), 'No vendor')
+        self.assertEqual(cache.stats()['negative_hits'], 1)
+        with mock.patch('vendor_cache.time.time', return_value=2 * 24 * 60 * 60):
+            self.assertIsNone(cache.get('12:13:14:00:00:45'))
+            self.assertEqual(cache.get('08:74:02:00:00:01'), 'Apple, Inc.')
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used entry is evicted from memory
+        """
+        cache = VendorCache(None, max_size=2)
+        cache.put('00:00:01:00:00:00', 'One')
+        cache.put('00:00:02:00:00:00', 'Two')
+        cache.get('00:00:01:00:00:00')
+        cache.put('00:00:03:00:00:00', 'Three')
+        self.assertIsNone(cache.get('00:00:02:00:00:00'))
+        self.assertEqual(cache.get('00:00:01:00:00:00'), 'One')
+
+    def test_persistence(self):
+        """
+        Test that cached vendors are shared across cache instances through the sqlite file
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'vendors.sqlite3'
+            cache = VendorCache(path)
+            cache.put('08:74:02:00:00:01', 'Apple, Inc.')
+            cache.close()
+            cache = VendorCache(path)
+            self.assertEqual(cache.get('08:74:02:00:00:01'), 'Apple, Inc.')
+            self.assertEqual(cache.stats()['disk_hits'], 1)
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+from scan import Host
+from watch import UnixSocketSink, Watcher
+from types import SimpleNamespace
+from unittest import mock
+import json
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+ADDRESSES = SimpleNamespace(network=SimpleNamespace(cidr='192.168.1.0/24'), engine='arp',
+                            interface=SimpleNamespace(name='eth0'))
+ROUTER = Host('192.168.1.1', 'AA:BB:CC:00:00:01', 'Vendor', 'router')
+PHONE = Host('192.168.1.10', 'AA:BB:CC:00:00:02', 'Vendor', 'phone')
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.watcher = Watcher(ADDRESSES, self.events.append, misses=2)
+
+    def kinds(self):
+        return [(e['event'], e['ip']) for e in self.events]
+
+    def test_join(self):
+        """
+        Test that the hosts of the first scan join and an unchanged rescan reports nothing
+        """
+        self.assertEqual(self.watcher.rescan([ROUTER, PHONE]), 2)
+        self.assertEqual(self.watcher.rescan([ROUTER, PHONE]), 0)
+        self.assertEqual(self.kinds(), [('join', ROUTER.ip), ('join', PHONE.ip)])
+
+    def test_leave_after_misses(self):
+        """
+        Test that a host leaves only after missing `misses` scans in a row
+        """
+        self.watcher.rescan([ROUTER, PHONE])
+        self.assertEqual(self.watcher.rescan([ROUTER]), 0)
+        self.assertEqual(self.watcher.rescan([ROUTER, PHONE]), 0)
+        self.watcher.rescan([ROUTER])
+        self.assertEqual(self.watcher.rescan([ROUTER]), 1)
+        self.assertEqual(self.events[-1]['event'], 'leave')
+        self.assertEqual(self.events[-1]['ip'], PHONE.ip)
+
+    def test_mac_change(self):
+        """
+        Test that an IP answering from another MAC is reported with the previous MAC
+        """
+        self.watcher.rescan([ROUTER])
+        self.watcher.rescan([Host(ROUTER.ip, 'DE:AD:BE:EF:00:01', None, 'N/A')])
+        self.assertEqual(self.events[-1]['event'], 'mac_change')
+        self.assertEqual(self.events[-1]['previous_mac'], ROUTER.mac)
+
+    def test_follows_network(self):
+        """
+        Test that the addresses are synced before each scan, the new network is scanned when it changes
+        and a cycle whose sync fails is skipped
+        """
+        addresses = SimpleNamespace(network=SimpleNamespace(cidr='192.168.1.0/24'), engine='arp',
+                                    interface=SimpleNamespace(name='eth0'))
+        networks = iter([KeyError('gateway'), '192.168.1.0/24', '10.0.0.0/24'])
+
+        def sync():
+            network = next(networks)
+            if isinstance(network, Exception):
+                raise network
+            addresses.network.cidr = network
+
+        scanned = []
+
+        def scan(cidr, engine, interface, on_host=None):
+            scanned.append(cidr)
+            if len(scanned) == 2:
+                watcher.stop()
+            return [ROUTER] if cidr == '192.168.1.0/24' else []
+
+        addresses.sync = sync
+        watcher = Watcher(addresses, self.events.append, min_interval=0.01)
+        with mock.patch('watch.scan', scan), mock.patch('watch.log.exception') as exception:
+            watcher.run()
+        exception.assert_called_once()
+        self.assertEqual(scanned, ['192.168.1.0/24', '10.0.0.0/24'])
+        self.assertEqual(self.kinds(), [('join', ROUTER.ip)])
+
+
+class TestUnixSocketSink(unittest.TestCase):
+    def test_sends_events(self):
+        """
+        Test that connected clients get each event as a JSON line and the socket is removed on close
+        """
+        path = os.path.join(tempfile.mkdtemp(), 'watch.sock')
+        sink = UnixSocketSink(path)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        # Wait for the sink to accept the client
+        for _ in range(100):
+            if sink._clients:
+                break
+            time.sleep(0.01)
+        sink({'event': 'join', 'ip': ROUTER.ip})
+        line = client.makefile().readline()
+        self.assertEqual(json.loads(line), {'event': 'join', 'ip': ROUTER.ip})
+        client.close()
+        sink.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_refuses_files(self):
+        """
+        Test that a path holding something other than a socket is neither replaced nor removed
+        """
+        path = os.path.join(tempfile.mkdtemp(), 'passwd')
+        with open(path, 'w') as f:
+            f.write('root:x:0:0')
+        with self.assertRaises(OSError):
+            UnixSocketSink(path)
+        with open(path) as f:
+            self.assertEqual(f.read(), 'root:x:0:0')
+
+    def test_drops_stalled_clients(self):
+        """
+        Test that a client that doesn't read is dropped once its buffer fills instead of blocking the events
+        """
+        path = os.path.join(tempfile.mkdtemp(), 'watch.sock')
+        sink = UnixSocketSink(path)
+        self.addCleanup(sink.close)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(client.close)
+        client.connect(path)
+        for _ in range(100):
+            if sink._clients:
+                break
+            time.sleep(0.01)
+        start = time.monotonic()
+        for _ in range(1000):
+            sink({'event': 'join', 'ip': ROUTER.ip, 'padding': 'x' * 4096})
+            if not sink._clients:
+                break
+        self.assertEqual(sink._clients, [])
+        self.assertLess(time.monotonic() - start, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""vendor_cache module
+
+This module exports:
+  - CACHE_PATH      default location of the on-disk vendor cache
+  - VendorCache     class that caches vendor names by MAC address prefix in memory (LRU) and on disk (sqlite)
+  - get_cache       function that returns the cache shared by the whole process
+"""
+
+from logger import create_logger
+from constants import VENDOR_CACHE_SIZE, VENDOR_CACHE_TTL, VENDOR_ERROR_TTL, VENDOR_NEGATIVE_TTL
+from oui import PREFIX_LENGTHS, oui_of
+from collections import OrderedDict
+from pathlib import Path
+import atexit
+import sqlite3
+import threading
+import time
+
+log = create_logger(__name__)
+
+CACHE_PATH = Path(__file__).resolve().parent / 'cache' / 'vendors.sqlite3'
+
+# Vendor names that are cached as negative results, each with its own TTL
+NEGATIVE_TTLS = {'No vendor': VENDOR_NEGATIVE_TTL, 'N/A': VENDOR_ERROR_TTL}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class VendorCache:
+    """Cache vendor names by MAC address prefix: the OUI (the first 24 bits) or the 28 or 36 bits of
+        the MA-M or MA-S assignment, so vendors sharing a split OUI aren't mixed up
+
+        Lookups hit an in-process LRU first and the sqlite store second, so results are shared across runs.
+        Negative results ('No vendor', 'N/A') are cached with their own shorter TTLs.
+        If the sqlite store can't be used the cache keeps working in memory only.
+
+        Public methods:
+          - get         return the cached vendor of a MAC address or None
+          - put         cache the vendor of a MAC address
+          - stats       return the hit/miss counters
+          - close       close the sqlite store
+    """
+    __slots__ = ('path', 'max_size', 'hits', 'negative_hits', 'disk_hits', 'misses', '_lru', '_db', '_lock')
+
+    def __init__(self, path=CACHE_PATH, max_size=VENDOR_CACHE_SIZE):
+        """A VendorCache object backed by the sqlite file at `path`
+
+        :param path: Path of the sqlite file or None for a memory only cache. Default: CACHE_PATH
+        :param max_size: Maximum entries kept in memory. Default: VENDOR_CACHE_SIZE
+        """
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.negative_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._db = None
+        self._lock = threading.Lock()
+        if path:
+            self._open()
+        log.debug('VendorCache created: %r', self)
+
+    def get(self, mac):
+        """Return the cached vendor of `mac` or None if it is not cached or expired
+
+        The most specific cached prefix of `mac` wins.
+
+        :param mac: The MAC address
+        """
+        if oui_of(mac) is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            keys = [oui_of(mac, bits) for bits in PREFIX_LENGTHS]
+            key = next((k for k in keys if k in self._lru), None)
+            from_disk = key is None
+            if from_disk:
+                key, entry = self._disk_get(keys)
+                if entry is not None:
+                    self._remember(key, entry)
+            else:
+                entry = self._lru[key]
+                self._lru.move_to_end(key)
+
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return None
+
+            if from_disk:
+                self.disk_hits += 1
+            vendor = entry[0]
+            if vendor in NEGATIVE_TTLS:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return vendor
+
+    def put(self, mac, vendor, bits=24):
+        """Cache the `vendor` of `mac` for the MAC addresses sharing its first `bits` bits
+
+        :param mac: The MAC address
+        :param vendor: The vendor name. 'No vendor' and 'N/A' are cached as negative results
+        :param bits: The prefix length of the assignment of `mac`, 24, 28 or 36. Default: 24
+        """
+        key = oui_of(mac, bits)
+        if key is None:
+            return
+
+        entry = (vendor, time.time() + NEGATIVE_TTLS.get(vendor, VENDOR_CACHE_TTL))
+        with self._lock:
+            self._remember(key, entry)
+            self._disk_put(key, entry)
+
+    def stats(self):
+        """Return a dict with the hit/miss counters"""
+        with self._lock:
+            return {'hits': self.hits, 'negative_hits': self.negative_hits,
+                    'disk_hits': self.disk_hits, 'misses': self.misses, 'size': len(self._lru)}
+
+    def close(self):
+        """Close the sqlite store. The cache keeps working in memory only"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _open(self):
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            with self._db:
+                self._db.execute('CREATE TABLE IF NOT EXISTS vendors '
+                                 '(oui TEXT PRIMARY KEY, vendor TEXT NOT NULL, expires REAL NOT NULL)')
+                self._db.execute('DELETE FROM vendors WHERE expires <= ?', (time.time(),))
+        except (OSError, sqlite3.Error):
+            log.exception(f'Could not open vendor cache {self.path}. Using memory only')
+            self._db = None
+
+    def _remember(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def _disk_get(self, keys):
+        if self._db is None:
+            return None, None
+        try:
+            placeholders = ', '.join('?' * len(keys))
+            row = self._db.execute(f'SELECT oui, vendor, expires FROM vendors WHERE oui IN ({placeholders}) '
+                                   'ORDER BY length(oui) DESC LIMIT 1', keys).fetchone()
+        except sqlite3.Error:
+            log.exception(f'sqlite3.Error on {__name__} module')
+            return None, None
+        return (None, None) if row is None else (row[0], row[1:])
+
+    def _disk_put(self, key, entry):
+        if self._db is None:
+            return
+        try:
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO vendors VALUES (?, ?, ?)', (key, *entry))
+        except sqlite3.Error:
+            log.exception(f'sqlite3.Error on {__name__} module')
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{str(self.path)!r}', f'{self.max_size!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+def get_cache():
+    """Return the VendorCache shared by the whole process, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = VendorCache()
+                atexit.register(_close_cache, _cache)
+    return _cache
+
+
+def _close_cache(cache):
+    log.debug('Vendor cache stats: %s', cache.stats())
+    cache.close()
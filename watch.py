@@ -0,0 +1,299 @@
+"""watch module
+
+This module exports:
+  - Watcher             class that rescans the network on an adaptive interval and reports the changes
+  - StreamSink          class that writes the events as NDJSON to a text stream
+  - UnixSocketSink      class that sends the events as NDJSON to the clients of a unix socket
+  - watch               function that watches the network until interrupted
+
+Events are dicts with the event type ('join', 'leave' or 'mac_change'), the time it was detected
+and the host fields written by the output module. 'mac_change' events also carry the previous MAC address.
+"""
+from logger import create_logger
+from backends import ScanError
+from constants import WATCH_MAX_INTERVAL, WATCH_MIN_INTERVAL, WATCH_MISSES
+from host_state import HostStateStore
+from output import host_dict
+from scan import scan
+from shutdown import shutdown
+from terminal_control import Color
+from datetime import datetime, timezone
+import errno
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+
+log = create_logger(__name__)
+
+
+class Watcher:
+    """Rescan the network of an Addresses object on an adaptive interval and report the changes
+
+        The interval starts at `min_interval` and doubles after each scan without changes up to `max_interval`,
+        so an idle network costs one scan every `max_interval` seconds. Any change resets it.
+        A host leaves after missing `misses` scans in a row so a lost reply doesn't make it flap.
+
+        Public methods:
+          - run         scan until stopped
+          - stop        stop scanning
+          - rescan      scan once and report the changes
+    """
+    __slots__ = ('addresses', 'emit', 'store', 'min_interval', 'max_interval', 'misses', 'interval',
+                 '_missed', '_stopped')
+
+    def __init__(self, addresses, emit, min_interval=WATCH_MIN_INTERVAL, max_interval=WATCH_MAX_INTERVAL,
+                 misses=WATCH_MISSES, store=None):
+        """A Watcher object
+
+        :param addresses: An Addresses object
+        :param emit: Function called with each event dict
+        :param min_interval: Seconds between scans while the network changes. Default: WATCH_MIN_INTERVAL
+        :param max_interval: Maximum seconds between scans of an idle network. Default: WATCH_MAX_INTERVAL
+        :param misses: Scans in a row a host must miss to leave. Default: WATCH_MISSES
+        :param store: The HostStateStore keeping the known hosts. Default: None (a new one)
+        """
+        self.addresses = addresses
+        self.emit = emit
+        self.store = store if store is not None else HostStateStore()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.misses = misses
+        self.interval = min_interval
+        self._missed = {}
+        self._stopped = threading.Event()
+        log.debug('Watcher created: %r', self)
+
+    def run(self):
+        """Scan until stopped, waiting the adaptive interval between scans
+
+        The addresses are synced before each scan, so the watch follows the network when it changes.
+        A cycle whose sync fails is skipped and tried again after `min_interval` seconds.
+        """
+        while not self._stopped.is_set():
+            if not self._sync():
+                self._stopped.wait(self.min_interval)
+                continue
+            changes = self.rescan()
+            if changes:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * 2, self.max_interval)
+            log.debug('%s changes, next scan in %s seconds', changes, self.interval)
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        """Stop scanning, interrupting the wait for the next scan"""
+        self._stopped.set()
+
+    def rescan(self, hosts=None):
+        """Scan the network once and emit an event for each change
+
+        :param hosts: Optionally the scan result to use instead of scanning. Default: None
+        :return: Number of events emitted
+        """
+        cidr = self.addresses.network.cidr
+        latencies = {}
+
+        def on_host(host, latency):
+            latencies[host.ip] = latency
+
+        if hosts is None:
+            hosts = scan(cidr, self.addresses.engine, self.addresses.interface.name, on_host)
+        known = {r.host.ip: r.host for r in self.store.records(cidr)}
+        self.store.update(cidr, hosts)
+        events = 0
+
+        for host in hosts:
+            self._missed.pop(host.ip, None)
+            previous = known.get(host.ip)
+            if previous is None:
+                self._emit('join', cidr, host, latencies.get(host.ip))
+                events += 1
+            elif previous.mac.upper() != host.mac.upper():
+                self._emit('mac_change', cidr, host, latencies.get(host.ip), previous_mac=previous.mac)
+                events += 1
+
+        answered = {host.ip for host in hosts}
+        gone = []
+        for ip in known.keys() - answered:
+            self._missed[ip] = self._missed.get(ip, 0) + 1
+            if self._missed[ip] >= self.misses:
+                del self._missed[ip]
+                gone.append(ip)
+                self._emit('leave', cidr, known[ip])
+                events += 1
+        if gone:
+            self.store.update(cidr, [], gone)
+        return events
+
+    def _sync(self):
+        cidr = self.addresses.network.cidr
+        try:
+            self.addresses.sync()
+        except (KeyError, IndexError, StopIteration, OSError) as e:
+            # e.g. the link is down and there is no default gateway
+            log.exception(f'{e.__class__.__name__} on {__name__} module')
+            return False
+        if self.addresses.network.cidr != cidr:
+            log.info('Network changed from %s to %s', cidr, self.addresses.network.cidr)
+            # Misses of the hosts of the previous network don't count on the new one
+            self._missed.clear()
+        return True
+
+    def _emit(self, kind, cidr, host, latency=None, **extra):
+        record = next((r for r in self.store.records(cidr) if r.host.ip == host.ip), None)
+        first_seen, last_seen = (record.first_seen, record.last_seen) if record else (None, None)
+        event = {'event': kind, 'time': datetime.now(timezone.utc).isoformat()}
+        event.update(host_dict(host, latency, first_seen, last_seen))
+        event.update(extra)
+        log.debug('Event: %s', event)
+        self.emit(event)
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        args = [f'{self.addresses!r}', f'{self.emit!r}', f'{self.min_interval!r}', f'{self.max_interval!r}',
+                f'{self.misses!r}']
+        return f'{class_name}({", ".join(args)})'
+
+
+class StreamSink:
+    """Write the events as NDJSON to a text stream, flushing after each one"""
+    __slots__ = ('stream',)
+
+    def __init__(self, stream=None):
+        """A StreamSink object
+
+        :param stream: A text stream. Default: None (sys.stdout)
+        """
+        self.stream = stream or sys.stdout
+
+    def __call__(self, event):
+        self.stream.write(json.dumps(event) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        """Flush the stream"""
+        self.stream.flush()
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        return f'{class_name}({self.stream!r})'
+
+
+class UnixSocketSink:
+    """Send the events as NDJSON to every client connected to a unix socket
+
+        Clients connect at any time and get the events from then on.
+        Clients that disconnect, or don't read fast enough for an event to fit in their socket buffer, are dropped,
+        so a stalled client never holds up the watch.
+
+        Public methods:
+          - close       stop accepting clients and remove the socket
+    """
+    __slots__ = ('path', '_server', '_clients', '_lock')
+
+    def __init__(self, path):
+        """A UnixSocketSink object listening on `path`
+
+        :param path: The path of the unix socket. A stale socket left there is replaced
+        :exception OSError: If the socket can't be created, or something other than a socket is at `path`
+        """
+        self.path = path
+        _remove_socket(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._clients = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+        log.debug('UnixSocketSink created: %r', self)
+
+    def __call__(self, event):
+        line = (json.dumps(event) + '\n').encode()
+        with self._lock:
+            clients = list(self._clients)
+        dropped = []
+        for client in clients:
+            try:
+                # Non-blocking, a full socket buffer raises instead of waiting for the client
+                client.sendall(line)
+            except OSError:
+                log.debug('Client disconnected from %s or too slow', self.path)
+                dropped.append(client)
+        if dropped:
+            with self._lock:
+                for client in dropped:
+                    if client in self._clients:
+                        self._clients.remove(client)
+                    client.close()
+
+    def close(self):
+        """Disconnect the clients, stop accepting new ones and remove the socket"""
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+        self._server.close()
+        try:
+            _remove_socket(self.path)
+        except OSError:
+            log.exception(f'OSError on {__name__} module')
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                # The server socket was closed
+                return
+            log.debug('Client connected to %s', self.path)
+            client.setblocking(False)
+            with self._lock:
+                self._clients.append(client)
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        return f'{class_name}({self.path!r})'
+
+
+def _remove_socket(path):
+    # Runs as root on a path given by the user, so nothing but a socket is ever removed
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, 'Not a socket', path)
+    os.unlink(path)
+
+
+def watch(addresses, socket_path=None, stream=None):
+    """Watch the network of `addresses` until interrupted, reporting joins, leaves and MAC changes as NDJSON
+
+    :param addresses: An Addresses object
+    :param socket_path: Optionally the path of a unix socket to send the events to instead of `stream`.
+    Default: None
+    :param stream: The text stream to write the events to. Default: None (sys.stdout)
+    :exception KeyboardInterrupt: If the user interrupts the program (⌃C)
+    """
+    try:
+        sink = UnixSocketSink(socket_path) if socket_path else StreamSink(stream)
+    except OSError:
+        print(f'{Color.B_RED}No se pudo crear el socket {socket_path}{Color.OFF}')
+        log.exception(f'OSError on {__name__} module')
+        shutdown(True)
+    log.debug('Watching %s, events to %r', addresses.network.cidr, sink)
+    started = time.time()
+    try:
+        Watcher(addresses, sink).run()
+    except ScanError as e:
+        print(f'{Color.B_RED}{e}{Color.OFF}')
+        log.exception(f'ScanError on {__name__} module')
+        shutdown(True)
+    finally:
+        sink.close()
+        log.debug('Watched for %.0f seconds', time.time() - started)